@@ -8,10 +8,102 @@ load_dotenv()
 # Configurable base URL and API key
 TEMENOS_BASE_URL = os.getenv("TEMENOS_BASE_URL", "https://api.temenos.com")
 TEMENOS_API_KEY = os.getenv("TEMENOS_API_KEY")
+# Upstream HTTP client: seconds per read/write (0 = no timeout), seconds to connect, pool size
+TEMENOS_TIMEOUT = float(os.getenv("TEMENOS_TIMEOUT", "120"))
+TEMENOS_CONNECT_TIMEOUT = float(os.getenv("TEMENOS_CONNECT_TIMEOUT", "10"))
+TEMENOS_MAX_CONNECTIONS = int(os.getenv("TEMENOS_MAX_CONNECTIONS", "100"))
+TEMENOS_MAX_KEEPALIVE = int(os.getenv("TEMENOS_MAX_KEEPALIVE", "20"))
 
 # Tool contract path (defaulting to schema/tool_contract)
 TOOL_CONTRACT_DIR = Path(os.getenv("TOOL_CONTRACT_DIR", "schema/tool_contract"))
 
+# Admission control for tools/call across all transports
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "8"))
+MCP_MAX_QUEUE = int(os.getenv("MCP_MAX_QUEUE", "64"))
+MCP_QUEUE_TIMEOUT = float(os.getenv("MCP_QUEUE_TIMEOUT", "30"))
+
+# JSON-RPC batch arrays: max members per batch and how many run at once
+MCP_MAX_BATCH_SIZE = int(os.getenv("MCP_MAX_BATCH_SIZE", "50"))
+MCP_BATCH_PARALLELISM = int(os.getenv("MCP_BATCH_PARALLELISM", "4"))
+
+# Seconds of SSE silence before a keep-alive comment is sent
+MCP_SSE_HEARTBEAT = float(os.getenv("MCP_SSE_HEARTBEAT", "15"))
+
+# Max JSON-RPC messages processed concurrently on one WebSocket connection
+MCP_WS_MAX_INFLIGHT = int(os.getenv("MCP_WS_MAX_INFLIGHT", "8"))
+
+# tools/call response shaping: "summary", "steps" or "full" when the caller doesn't ask
+MCP_DEFAULT_RESPONSE_MODE = os.getenv("MCP_DEFAULT_RESPONSE_MODE", "full")
+
+# Responses smaller than this (bytes) are never compressed
+MCP_COMPRESSION_MIN_SIZE = int(os.getenv("MCP_COMPRESSION_MIN_SIZE", "1000"))
+
+# Session store: "memory" (single worker only), "sqlite", "shm" (SQLite on /dev/shm) or "diskcache"
+MCP_SESSION_BACKEND = os.getenv("MCP_SESSION_BACKEND", "memory")
+# SQLite file or diskcache directory; each backend has a default when unset
+MCP_SESSION_PATH = os.getenv("MCP_SESSION_PATH") or None
+# Idle sessions expire after this many seconds
+MCP_SESSION_TTL = float(os.getenv("MCP_SESSION_TTL", "3600"))
+
+# LLM backend: "ollama_http", "ollama_subprocess" or "fake" (canned plans/summaries for load tests)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama_http")
+# Fake backend: seconds per generation, and optional JSON file with {"planner": ..., "summary": ...}
+LLM_FAKE_LATENCY = float(os.getenv("LLM_FAKE_LATENCY", "0"))
+LLM_FAKE_RESPONSES = os.getenv("LLM_FAKE_RESPONSES") or None
+
+# Ollama model and HTTP API settings
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:latest")
+# How long Ollama keeps the model loaded after a request (duration string, or -1 for forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+# Fall back to spawning `ollama run` when the HTTP API is unreachable
+OLLAMA_SUBPROCESS_FALLBACK = os.getenv("OLLAMA_SUBPROCESS_FALLBACK", "true").lower() == "true"
+
+# Seconds an LLM call may take, per call site (0 = no deadline); an expired call is cancelled
+LLM_DEADLINE_PLANNER = float(os.getenv("LLM_DEADLINE_PLANNER", "90"))
+LLM_DEADLINE_STEP_SUMMARY = float(os.getenv("LLM_DEADLINE_STEP_SUMMARY", "30"))
+LLM_DEADLINE_FINAL_SUMMARY = float(os.getenv("LLM_DEADLINE_FINAL_SUMMARY", "60"))
+LLM_DEADLINE_DEFAULT = float(os.getenv("LLM_DEADLINE_DEFAULT", "120"))
+# Smaller/faster model an expired call is retried on, with the same deadline (empty = no retry)
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")
+
+# Persistent LLM response cache (diskcache), keyed by model + prompt hash
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "data/llm_cache")
+LLM_CACHE_SIZE_LIMIT = int(os.getenv("LLM_CACHE_SIZE_LIMIT", str(256 * 1024 * 1024)))
+# Seconds a cached response lives, per call site; other call sites use LLM_CACHE_TTL_DEFAULT
+LLM_CACHE_TTL_PLANNER = float(os.getenv("LLM_CACHE_TTL_PLANNER", "86400"))
+LLM_CACHE_TTL_SUMMARY = float(os.getenv("LLM_CACHE_TTL_SUMMARY", "900"))
+LLM_CACHE_TTL_DEFAULT = float(os.getenv("LLM_CACHE_TTL_DEFAULT", "3600"))
+
+# Planner prompt lists only the top-k registry tools matching the goal (BM25 shortlist)
+PLANNER_TOP_K = int(os.getenv("PLANNER_TOP_K", "8"))
+# tiktoken encoding used to measure prompt sizes
+PROMPT_TOKEN_ENCODING = os.getenv("PROMPT_TOKEN_ENCODING", "cl100k_base")
+# Extra planner generations allowed when the output is not valid plan JSON even after repair
+PLANNER_MAX_RETRIES = int(os.getenv("PLANNER_MAX_RETRIES", "1"))
+
+# Plans cached by normalized intent (IDs/numbers slotted out); cleared when contracts or registry change
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+PLAN_CACHE_DIR = os.getenv("PLAN_CACHE_DIR", "data/plan_cache")
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "86400"))
+
+# Keyword fast-path planner: plans single-tool requests without the LLM at or above this confidence
+FAST_PLANNER_ENABLED = os.getenv("FAST_PLANNER_ENABLED", "true").lower() == "true"
+FAST_PLANNER_THRESHOLD = float(os.getenv("FAST_PLANNER_THRESHOLD", "0.8"))
+
+# How tool results are summarized: per_step (one LLM call per step, then the final summary),
+# batched (every step and the final summary in one call, per_step if the reply can't be parsed)
+# or deterministic (summary_template in each tool contract, no LLM); requests may override it
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "per_step")
+# Step summaries generated concurrently in per_step mode; match the Ollama server's OLLAMA_NUM_PARALLEL
+SUMMARY_PARALLELISM = int(os.getenv("SUMMARY_PARALLELISM", os.getenv("OLLAMA_NUM_PARALLEL", "4")))
+
+# Startup warm-up (model preload, contracts, upstream connection); /health is 503 until it finishes
+MCP_WARMUP_ENABLED = os.getenv("MCP_WARMUP_ENABLED", "true").lower() == "true"
+MCP_WARMUP_TIMEOUT = float(os.getenv("MCP_WARMUP_TIMEOUT", "300"))
+
 def build_auth_headers():
     """
     Dynamically builds headers. Sends only what's provided in .env.
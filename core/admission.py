@@ -0,0 +1,89 @@
+# core/admission.py
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when a request cannot be admitted (queue full or queue wait timed out)."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded wait queue, shared by every transport.
+
+    At most `max_concurrency` requests run process_user_request at once; up to
+    `max_queue` more wait for a slot (for at most `queue_timeout` seconds).
+    Anything beyond that is rejected immediately with OverloadedError.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @asynccontextmanager
+    async def admit(self):
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            logger.warning(f"🚦 Rejecting request: {self._active} active, {self._waiting} queued")
+            raise OverloadedError("Server overloaded: request queue is full", retry_after=self._retry_after())
+
+        self._waiting += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            logger.warning(f"🚦 Request timed out after {self.queue_timeout}s in admission queue")
+            raise OverloadedError("Server overloaded: timed out waiting for a worker slot",
+                                  retry_after=self._retry_after())
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - start
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def _retry_after(self) -> int:
+        # Rough hint: the average queue wait so far, at least one second
+        avg = self._total_wait / self._admitted if self._admitted else 0.0
+        return max(1, int(round(avg)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self._active,
+            "queue_depth": self._waiting,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "avg_wait_ms": round(1000 * self._total_wait / self._admitted, 2) if self._admitted else 0.0,
+            "max_wait_ms": round(1000 * self._max_wait, 2),
+        }
@@ -1,7 +1,14 @@
+import asyncio
+import contextvars
 import json
 import re
 import logging
-from typing import Any, Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.json_repair import loads_lenient
+from core.llm_cache import call_site
 
 # Load your tool contracts however you do in your project
 # For this snippet, pass TOOL_CONTRACTS to the aggregate() function
@@ -9,6 +16,13 @@ from typing import Any, Callable, Dict, List
 
 logger = logging.getLogger(__name__)
 
+# per_step: one LLM call per step + final; batched: one LLM call; deterministic: contract templates, no LLM
+SUMMARY_MODES = ("per_step", "batched", "deterministic")
+
+# {name} or {name:field} placeholders in a contract's summary_template
+_PLACEHOLDER = re.compile(r"\{(\w+)(?::([\w.]+))?\}")
+_DATE_FORMATS = ("%Y-%m-%d", "%d %b %Y", "%Y%m%d")
+
 def clean(text: str) -> str:
     """Remove code block markers and extra whitespace from LLM output."""
     return re.sub(r"```(?:json|text)?", "", text, flags=re.IGNORECASE).strip()
@@ -27,13 +41,8 @@ def extract_error(result: dict) -> str:
         return f"Error: {err}"
     return ""
 
-def is_no_data(result: dict, tool_contract: dict = None) -> bool:
-    """
-    Detect if a tool result contains no data, using tool_contract for the main data key.
-    """
-    if not isinstance(result, dict) or not result:
-        return True
-
+def response_data_key(tool_contract: dict = None) -> str:
+    """Key of the main data in a tool response, from the tool contract."""
     response_data_key = None
     # Try to get the main data key from the tool contract
     if tool_contract:
@@ -44,10 +53,16 @@ def is_no_data(result: dict, tool_contract: dict = None) -> bool:
                 if k in tool_contract["response_schema"].get("properties", {}):
                     response_data_key = k
                     break
-    if not response_data_key:
-        response_data_key = "body"  # Sensible fallback
+    return response_data_key or "body"  # Sensible fallback
 
-    val = result.get(response_data_key)
+def is_no_data(result: dict, tool_contract: dict = None) -> bool:
+    """
+    Detect if a tool result contains no data, using tool_contract for the main data key.
+    """
+    if not isinstance(result, dict) or not result:
+        return True
+
+    val = result.get(response_data_key(tool_contract))
     if isinstance(val, list) and len(val) == 0:
         return True
     if isinstance(val, dict) and not val:
@@ -65,86 +80,437 @@ def make_key(tool: str, api_inputs: Dict[str, Any]) -> str:
     # Remove duplicate underscores, spaces, and non-alphanum (except _)
     return re.sub(r'[^a-zA-Z0-9_]', '', key)
 
-def summarize_step(
-    step_id: str,
-    step_result: dict,
-    local_filters: dict,
-    llm_call: Callable[[str], str],
-    tool_contract: dict = None
-) -> str:
-    """
-    Summarize the result of a tool step, handling empty results and errors before calling LLM.
-    Pass the tool_contract for correct no-data detection.
-    """
+def step_inputs(step: dict) -> Dict[str, Any]:
+    """API inputs of a step: "inputs" in plan steps from core.mcp, "api_inputs" in older callers."""
+    return step.get("inputs") or step.get("api_inputs") or {}
+
+def precheck_step(step_result: dict, tool_contract: dict = None) -> str:
+    """Return a canned summary for errors/empty results, or "" if the LLM is needed."""
     error_msg = extract_error(step_result)
     if error_msg:
         return f"{error_msg}"
     if is_no_data(step_result, tool_contract=tool_contract):
         return "No data found for this query."
+    return ""
+
+def build_step_prompt(step_id: str, step_result: dict, local_filters: dict) -> str:
     filters_desc = f" Filters applied locally: {json.dumps(local_filters)}." if local_filters else ""
-    step_prompt = (
+    return (
         f"You are a banking assistant. Summarize the result below for step {step_id} in 1-2 lines in plain English."
         f"{filters_desc}\n\n"
         f"{json.dumps(step_result, indent=2)}\n\n"
         "Avoid technical jargon. Keep it simple."
     )
+
+def build_final_prompt(pretty_steps: List[str], expected_outcome: str) -> str:
+    full_context = "\n".join(pretty_steps)
+    return (
+        f"You are an aggregator providing a response to a MCP requestor, who is usually an AI agent.\n"
+        f"Based on the following tool outputs:\n\n"
+        f"{full_context}\n\n"
+        f"Please summarize the information in 2 concise and friendly sentences aligned with this goal: {expected_outcome}.\n"
+        f"Focus on being clear and informative, and mention if any local filtering was applied.\n"
+        f"Do not ask for further inputs or mention uploading documents."
+    )
+
+def build_batched_prompt(tool_outputs: List[dict], canned: List[str], expected_outcome: str) -> str:
+    """
+    One prompt for every step plus the final summary. Steps with a canned
+    summary (errors, no data) are shown as already summarized.
+    """
+    blocks = []
+    for i, step in enumerate(tool_outputs):
+        key = make_key(step.get("tool", "unknown_tool"), step_inputs(step))
+        filters = step.get("local_filters")
+        filters_desc = f" Filters applied locally: {json.dumps(filters)}." if filters else ""
+        body = f"Already summarized: {canned[i]}" if canned[i] else json.dumps(step.get("result", {}), indent=2)
+        blocks.append(f"step{i+1} ({key}).{filters_desc}\n{body}")
+    wanted = [f"step{i+1}" for i, summary in enumerate(canned) if not summary]
+    reply = json.dumps({"steps": {step_id: "..." for step_id in wanted}, "summary": "..."})
+    return (
+        f"You are a banking assistant providing a response to a MCP requestor, who is usually an AI agent.\n"
+        f"Here are the tool outputs:\n\n"
+        + "\n\n".join(blocks) +
+        f"\n\nSummarize each step that is not already summarized in 1-2 lines in plain English, "
+        f"then summarize all steps in 2 concise and friendly sentences aligned with this goal: {expected_outcome}.\n"
+        f"Mention if any local filtering was applied. Avoid technical jargon. "
+        f"Do not ask for further inputs or mention uploading documents.\n"
+        f"Reply with JSON only, in this shape: {reply}"
+    )
+
+def parse_batched_summary(text: str, wanted: List[str]) -> Tuple[Dict[str, str], str]:
+    """Step summaries and final summary from a batched reply; ValueError if any is missing."""
+    data = loads_lenient(text)
+    if not isinstance(data, dict):
+        raise ValueError("Batched summary is not a JSON object")
+    steps = data.get("steps") or {}
+    summary = data.get("summary")
+    if not isinstance(steps, dict) or not isinstance(summary, str) or not summary.strip():
+        raise ValueError("Batched summary has no final summary")
+    missing = [step_id for step_id in wanted if not isinstance(steps.get(step_id), str) or not steps[step_id].strip()]
+    if missing:
+        raise ValueError(f"Batched summary has no summary for {', '.join(missing)}")
+    return {step_id: clean(steps[step_id]) for step_id in wanted}, summary.strip()
+
+def _amount(value: Any) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+def _date(value: Any) -> Optional[datetime]:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def _by_date(values: List[Any]) -> List[Any]:
+    """Values sorted chronologically when they all parse as dates, else as text."""
+    dates = [_date(v) for v in values]
+    if all(dates):
+        return [v for _, v in sorted(zip(dates, values), key=lambda pair: pair[0])]
+    return sorted(values, key=str)
+
+def render_template(template: str, context: Dict[str, Any]) -> str:
+    """
+    Fill a contract summary template from a step's response. Placeholders:
+    {count}, {noun}, {summary}, {sum:f}, {earliest:f}, {latest:f}, {distinct:f}
+    over the response items, {header:f} from header.data and {input:p} from
+    the API inputs. Raises KeyError if a value isn't in the response.
+    """
+    items = context.get("items", [])
+
+    def values(field):
+        found = [item[field] for item in items if isinstance(item, dict) and item.get(field) not in (None, "")]
+        if not found:
+            raise KeyError(field)
+        return found
+
+    def fill(match):
+        name, field = match.group(1), match.group(2)
+        if field is None:
+            return str(context[name])
+        if name == "sum":
+            amounts = [_amount(v) for v in values(field)]
+            if None in amounts:
+                raise KeyError(field)
+            return f"{sum(amounts):,.2f}"
+        if name in ("earliest", "latest"):
+            ordered = _by_date(values(field))
+            return str(ordered[0] if name == "earliest" else ordered[-1])
+        if name == "distinct":
+            return ", ".join(dict.fromkeys(str(v) for v in values(field)))
+        if name == "header":
+            return str(context["header"][field])
+        if name == "input":
+            return str(context["inputs"][field])
+        raise KeyError(name)
+
+    return _PLACEHOLDER.sub(fill, template)
+
+def _template_context(step_result: dict, tool_contract: dict, api_inputs: dict) -> Dict[str, Any]:
+    spec = (tool_contract or {}).get("summary_template", {})
+    data = step_result.get(response_data_key(tool_contract))
+    items = data if isinstance(data, list) else [data] if data else []
+    singular, plural = spec.get("noun", ["record", "records"])
+    header = step_result.get("header") if isinstance(step_result.get("header"), dict) else {}
+    return {
+        "items": items,
+        "count": len(items),
+        "noun": singular if len(items) == 1 else plural,
+        "header": header.get("data") or {},
+        "inputs": api_inputs or {},
+    }
+
+def deterministic_step_summary(step_result: dict, local_filters: dict, tool_contract: dict = None,
+                               api_inputs: dict = None) -> str:
+    """Step summary from the contract's summary_template.step, without the LLM."""
+    canned = precheck_step(step_result, tool_contract)
+    if canned:
+        return canned
+    context = _template_context(step_result, tool_contract, api_inputs)
+    template = (tool_contract or {}).get("summary_template", {}).get("step", "{count} {noun} returned")
+    try:
+        summary = render_template(template, context)
+    except KeyError as e:
+        logger.debug(f"Summary template field {e} missing from response; using record count")
+        summary = render_template("{count} {noun} returned", context)
+    if local_filters:
+        summary += f" (filtered locally by {', '.join(local_filters)})"
+    return summary + "."
+
+def deterministic_final_summary(tool_outputs: List[dict], summaries: List[str], TOOL_CONTRACTS: Dict[str, dict]) -> str:
+    """One line per step from the contract's summary_template.final (default: the step summary)."""
+    lines = []
+    for step, summary in zip(tool_outputs, summaries):
+        tool_contract = TOOL_CONTRACTS.get(step.get("tool")) or {}
+        template = tool_contract.get("summary_template", {}).get("final", "{summary}")
+        try:
+            lines.append(render_template(template, {"summary": summary, "inputs": step_inputs(step)}))
+        except KeyError:
+            lines.append(summary)
+    return " ".join(lines)
+
+def unavailable_summary(fallback: str) -> str:
+    """What callers get when the LLM failed or timed out: the template summary of the raw data."""
+    return f"Summary unavailable. {fallback}"
+
+def summarize_step(
+    step_id: str,
+    step_result: dict,
+    local_filters: dict,
+    llm_call: Callable[[str], str],
+    tool_contract: dict = None
+) -> str:
+    """
+    Summarize the result of a tool step, handling empty results and errors before calling LLM.
+    Pass the tool_contract for correct no-data detection.
+    """
+    canned = precheck_step(step_result, tool_contract)
+    if canned:
+        return canned
+    step_prompt = build_step_prompt(step_id, step_result, local_filters)
     try:
         response = llm_call(step_prompt)
         return clean(response)
     except Exception as e:
         logger.error(f"Error summarizing step {step_id}: {e}")
-        return "Summary unavailable."
+        return unavailable_summary(deterministic_step_summary(step_result, local_filters, tool_contract))
+
+async def summarize_step_async(
+    step_id: str,
+    step_result: dict,
+    local_filters: dict,
+    llm_call: Callable[[str], Awaitable[str]],
+    tool_contract: dict = None
+) -> str:
+    """Async counterpart of summarize_step; llm_call must be a coroutine function."""
+    canned = precheck_step(step_result, tool_contract)
+    if canned:
+        return canned
+    step_prompt = build_step_prompt(step_id, step_result, local_filters)
+    try:
+        response = await llm_call(step_prompt)
+        return clean(response)
+    except Exception as e:
+        logger.error(f"Error summarizing step {step_id}: {e}")
+        return unavailable_summary(deterministic_step_summary(step_result, local_filters, tool_contract))
+
+def _step_fields(i: int, step: dict, TOOL_CONTRACTS: Dict[str, dict]):
+    tool = step.get("tool", "unknown_tool")
+    api_inputs = step_inputs(step)
+    local_filters = step.get("local_filters", {})
+    output = step.get("result", {})
+    tool_contract = TOOL_CONTRACTS.get(tool)
+    key = make_key(tool, api_inputs)
+    return tool, local_filters, output, tool_contract, key
+
+def _record_step(i, tool, key, output, summary, result_summary, result_texts, pretty_steps):
+    result_summary.setdefault(tool, {})[f"step{i+1}"] = output
+    result_texts.setdefault(tool, {})[f"step{i+1}"] = summary
+    pretty_steps.append(f"{key}: {summary}")
+
+    logger.info(f"[Aggregator] Step {i+1} - {key}: {summary}")
+
+def _batched_request(tool_outputs: List[dict], expected_outcome: str, TOOL_CONTRACTS: Dict[str, dict]):
+    canned = [precheck_step(step.get("result", {}), TOOL_CONTRACTS.get(step.get("tool"))) for step in tool_outputs]
+    wanted = [f"step{i+1}" for i, summary in enumerate(canned) if not summary]
+    return build_batched_prompt(tool_outputs, canned, expected_outcome), canned, wanted
+
+def _batched_result(tool_outputs, TOOL_CONTRACTS, canned, step_summaries, final_summary) -> dict:
+    result_summary = {}
+    result_texts = {}
+    pretty_steps = []
+    for i, step in enumerate(tool_outputs):
+        tool, _, output, _, key = _step_fields(i, step, TOOL_CONTRACTS)
+        summary = canned[i] or step_summaries[f"step{i+1}"]
+        _record_step(i, tool, key, output, summary, result_summary, result_texts, pretty_steps)
+    return {
+        "summary": final_summary,
+        "steps": pretty_steps,
+        "raw_result": result_summary,
+        "raw_text": result_texts
+    }
+
+def _deterministic_result(tool_outputs: List[dict], TOOL_CONTRACTS: Dict[str, dict]) -> dict:
+    result_summary = {}
+    result_texts = {}
+    pretty_steps = []
+    summaries = []
+    for i, step in enumerate(tool_outputs):
+        tool, local_filters, output, tool_contract, key = _step_fields(i, step, TOOL_CONTRACTS)
+        summary = deterministic_step_summary(output, local_filters, tool_contract, step_inputs(step))
+        summaries.append(summary)
+        _record_step(i, tool, key, output, summary, result_summary, result_texts, pretty_steps)
+    return {
+        "summary": deterministic_final_summary(tool_outputs, summaries, TOOL_CONTRACTS),
+        "steps": pretty_steps,
+        "raw_result": result_summary,
+        "raw_text": result_texts
+    }
+
+def _summarize_steps(tool_outputs, llm_call, TOOL_CONTRACTS, parallelism: int) -> List[str]:
+    """Step summaries in step order, up to `parallelism` LLM calls at a time."""
+    def run(i, step):
+        _, local_filters, output, tool_contract, _ = _step_fields(i, step, TOOL_CONTRACTS)
+        return summarize_step(f"Step {i+1}", output, local_filters, llm_call=llm_call, tool_contract=tool_contract)
+
+    if parallelism <= 1 or len(tool_outputs) <= 1:
+        return [run(i, step) for i, step in enumerate(tool_outputs)]
+    with ThreadPoolExecutor(max_workers=min(parallelism, len(tool_outputs))) as pool:
+        # copy_context() carries the caller's call site / output format into the worker threads
+        futures = [pool.submit(contextvars.copy_context().run, run, i, step) for i, step in enumerate(tool_outputs)]
+        return [future.result() for future in futures]
+
+async def _summarize_steps_async(tool_outputs, llm_call, TOOL_CONTRACTS, parallelism: int, on_event) -> List[str]:
+    """
+    Async counterpart of _summarize_steps. on_event gets each step_summary
+    as soon as it is ready, so with parallelism > 1 they may arrive out of order.
+    """
+    limit = asyncio.Semaphore(max(1, parallelism))
+
+    async def run(i, step):
+        tool, local_filters, output, tool_contract, _ = _step_fields(i, step, TOOL_CONTRACTS)
+        async with limit:
+            summary = await summarize_step_async(
+                f"Step {i+1}", output, local_filters, llm_call=llm_call, tool_contract=tool_contract
+            )
+        if on_event:
+            await on_event("step_summary", {"step": f"step{i+1}", "tool": tool, "summary": summary})
+        return summary
+
+    return list(await asyncio.gather(*(run(i, step) for i, step in enumerate(tool_outputs))))
 
 def aggregate(
     tool_outputs: List[dict],
     expected_outcome: str,
     llm_call: Callable[[str], str],
-    TOOL_CONTRACTS: Dict[str, dict]
+    TOOL_CONTRACTS: Dict[str, dict],
+    summary_mode: str = "per_step",
+    parallelism: int = 1
 ) -> dict:
     """
     Aggregate multiple tool outputs and return a summary with details.
     TOOL_CONTRACTS: dict mapping tool name to its contract, must have 'response_data_key'.
+    summary_mode "batched" asks for every step summary and the final summary
+    in one LLM call, and falls back to "per_step" if the reply can't be parsed.
+    In "per_step" mode up to `parallelism` step summaries run concurrently.
+    "deterministic" fills each contract's summary_template and never calls the LLM.
     """
+    if summary_mode == "deterministic":
+        return _deterministic_result(tool_outputs, TOOL_CONTRACTS)
+    if summary_mode == "batched":
+        prompt, canned, wanted = _batched_request(tool_outputs, expected_outcome, TOOL_CONTRACTS)
+        try:
+            with call_site("final_summary"):
+                reply = llm_call(prompt)
+            step_summaries, final_summary = parse_batched_summary(reply, wanted)
+        except Exception as e:
+            logger.warning(f"Batched summary failed ({e}); falling back to per-step summaries")
+        else:
+            return _batched_result(tool_outputs, TOOL_CONTRACTS, canned, step_summaries, final_summary)
+
     result_summary = {}
     result_texts = {}
     pretty_steps = []
 
+    with call_site("step_summary"):
+        summaries = _summarize_steps(tool_outputs, llm_call, TOOL_CONTRACTS, parallelism)
     for i, step in enumerate(tool_outputs):
-        tool = step.get("tool", "unknown_tool")
-        api_inputs = step.get("api_inputs", {})
-        local_filters = step.get("local_filters", {})
-        output = step.get("result", {})
-
-        tool_contract = TOOL_CONTRACTS.get(tool)
-        key = make_key(tool, api_inputs)
-        summary = summarize_step(
-            f"Step {i+1}",
-            output,
-            local_filters,
-            llm_call=llm_call,
-            tool_contract=tool_contract
-        )
-        result_summary.setdefault(tool, {})[f"step{i+1}"] = output
-        result_texts.setdefault(tool, {})[f"step{i+1}"] = summary
-        pretty_steps.append(f"{key}: {summary}")
-
-        logger.info(f"[Aggregator] Step {i+1} - {key}: {summary}")
+        tool, _, output, _, key = _step_fields(i, step, TOOL_CONTRACTS)
+        _record_step(i, tool, key, output, summaries[i], result_summary, result_texts, pretty_steps)
 
     # Final summary using LLM, but provide fallback if LLM fails
-    full_context = "\n".join(pretty_steps)
-    prompt = (
-        f"You are an aggregator providing a response to a MCP requestor, who is usually an AI agent.\n"
-        f"Based on the following tool outputs:\n\n"
-        f"{full_context}\n\n"
-        f"Please summarize the information in 2 concise and friendly sentences aligned with this goal: {expected_outcome}.\n"
-        f"Focus on being clear and informative, and mention if any local filtering was applied.\n"
-        f"Do not ask for further inputs or mention uploading documents."
-    )
+    prompt = build_final_prompt(pretty_steps, expected_outcome)
+    try:
+        with call_site("final_summary"):
+            final_summary = llm_call(prompt).strip()
+    except Exception as e:
+        logger.error(f"Error generating final summary: {e}")
+        final_summary = unavailable_summary(_deterministic_result(tool_outputs, TOOL_CONTRACTS)["summary"])
+
+    return {
+        "summary": final_summary,
+        "steps": pretty_steps,  # For easy frontend rendering
+        "raw_result": result_summary,
+        "raw_text": result_texts
+    }
+
+async def _stream_final_summary(prompt, llm_stream, on_event) -> str:
+    parts = []
+    async for delta in llm_stream(prompt):
+        parts.append(delta)
+        await on_event("partial_summary", {"delta": delta})
+    return "".join(parts)
+
+async def aggregate_async(
+    tool_outputs: List[dict],
+    expected_outcome: str,
+    llm_call: Callable[[str], Awaitable[str]],
+    TOOL_CONTRACTS: Dict[str, dict],
+    on_event: Callable[[str, dict], Awaitable[None]] = None,
+    llm_stream: Callable[[str], AsyncIterator[str]] = None,
+    summary_mode: str = "per_step",
+    parallelism: int = 1
+) -> dict:
+    """
+    Async counterpart of aggregate(); llm_call must be a coroutine function.
+    on_event, if given, is awaited with ("step_summary", {...}) after each step
+    and ("summary", {...}) once the final summary is ready.
+    When both on_event and llm_stream are given, the final summary is streamed
+    and each fragment is sent as ("partial_summary", {"delta": ...}); in
+    "batched" mode the reply is JSON, so nothing is streamed.
+    """
+    if summary_mode == "deterministic":
+        result = _deterministic_result(tool_outputs, TOOL_CONTRACTS)
+        if on_event:
+            for i, step in enumerate(tool_outputs):
+                tool = step.get("tool", "unknown_tool")
+                await on_event("step_summary", {"step": f"step{i+1}", "tool": tool, "summary": result["raw_text"][tool][f"step{i+1}"]})
+            await on_event("summary", {"summary": result["summary"]})
+        return result
+    if summary_mode == "batched":
+        prompt, canned, wanted = _batched_request(tool_outputs, expected_outcome, TOOL_CONTRACTS)
+        try:
+            with call_site("final_summary"):
+                reply = await llm_call(prompt)
+            step_summaries, final_summary = parse_batched_summary(reply, wanted)
+        except Exception as e:
+            logger.warning(f"Batched summary failed ({e}); falling back to per-step summaries")
+        else:
+            result = _batched_result(tool_outputs, TOOL_CONTRACTS, canned, step_summaries, final_summary)
+            if on_event:
+                for i, step in enumerate(tool_outputs):
+                    tool = step.get("tool", "unknown_tool")
+                    summary = result["raw_text"][tool][f"step{i+1}"]
+                    await on_event("step_summary", {"step": f"step{i+1}", "tool": tool, "summary": summary})
+                await on_event("summary", {"summary": final_summary})
+            return result
+
+    result_summary = {}
+    result_texts = {}
+    pretty_steps = []
+
+    with call_site("step_summary"):
+        summaries = await _summarize_steps_async(tool_outputs, llm_call, TOOL_CONTRACTS, parallelism, on_event)
+    for i, step in enumerate(tool_outputs):
+        tool, _, output, _, key = _step_fields(i, step, TOOL_CONTRACTS)
+        _record_step(i, tool, key, output, summaries[i], result_summary, result_texts, pretty_steps)
+
+    prompt = build_final_prompt(pretty_steps, expected_outcome)
     try:
-        final_summary = llm_call(prompt).strip()
+        with call_site("final_summary"):
+            if on_event and llm_stream:
+                final_summary = (await _stream_final_summary(prompt, llm_stream, on_event)).strip()
+            else:
+                final_summary = (await llm_call(prompt)).strip()
     except Exception as e:
         logger.error(f"Error generating final summary: {e}")
-        final_summary = "Summary unavailable."
+        final_summary = unavailable_summary(_deterministic_result(tool_outputs, TOOL_CONTRACTS)["summary"])
+    if on_event:
+        await on_event("summary", {"summary": final_summary})
 
     return {
         "summary": final_summary,
@@ -0,0 +1,106 @@
+# core/catalog.py
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+TOOL_REGISTRY_PATH = Path("schema/tool_registry_llm.json")
+
+MCP_VERSION = "1.0.0"
+
+TRANSPORTS = [
+    {"type": "REST", "path": "/process"},
+    {"type": "JSON-RPC", "path": "/mcp"},
+    {"type": "SSE", "path": "/mcp/stream"},
+    {"type": "WebSocket", "path": "/ws/mcp"},
+]
+
+
+class CatalogSnapshot(NamedTuple):
+    """One immutable build of the catalogue; swapped atomically on reload."""
+    signature: Optional[tuple]
+    tools: List[Dict[str, Any]]
+    capabilities: Dict[str, Any]
+    capabilities_body: bytes
+    etag: str
+
+
+class ToolCatalog:
+    """
+    In-memory tool catalogue built from the LLM tool registry file.
+
+    The registry is parsed once and the /capabilities response is serialized
+    once per build. Each access only stat()s the file and rebuilds when its
+    mtime or size changed, e.g. after tools/build_tool_registry.py reruns.
+    """
+
+    def __init__(self, path: Path = TOOL_REGISTRY_PATH):
+        self.path = Path(path)
+        self._snapshot = self._build(None, [])
+        self.refresh()
+
+    def _signature(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _build(self, signature: Optional[tuple], tools: List[Dict[str, Any]]) -> CatalogSnapshot:
+        capabilities = {
+            "mcp_version": MCP_VERSION,
+            "transports": TRANSPORTS,
+            "tools": tools,
+        }
+        body = json.dumps(capabilities, separators=(",", ":")).encode("utf-8")
+        # Weak: CompressionMiddleware may send the same body as identity, gzip or br,
+        # and a strong validator would have to differ per content-coding
+        etag = 'W/"' + hashlib.sha1(body).hexdigest() + '"'
+        return CatalogSnapshot(signature, tools, capabilities, body, etag)
+
+    def refresh(self) -> CatalogSnapshot:
+        """Rebuild the catalogue if the registry file changed since the last build."""
+        signature = self._signature()
+        if signature == self._snapshot.signature:
+            return self._snapshot
+
+        try:
+            with open(self.path, "r") as f:
+                tools = json.load(f)
+            logger.info(f"🧰 Tool catalogue built with {len(tools)} tools from {self.path}")
+        except Exception as ex:
+            logger.warning(f"Could not load tool registry: {ex}")
+            tools = []
+
+        self._snapshot = self._build(signature, tools)
+        return self._snapshot
+
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        return self.refresh().tools
+
+    def initialize_result(self) -> Dict[str, Any]:
+        return self.refresh().capabilities
+
+    def capabilities(self):
+        """Return (serialized /capabilities body, ETag) for the current build."""
+        snapshot = self.refresh()
+        return snapshot.capabilities_body, snapshot.etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value matches the given ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    return any(c.removeprefix("W/") == etag.removeprefix("W/") for c in candidates)
+
+
+TOOL_CATALOG = ToolCatalog()
@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from tools.run_tool import run_tool
+from tools.run_tool import run_tool, run_tool_async
 from core.utils import load_tool_contracts_from_folder
 
 logger = logging.getLogger(__name__)
@@ -24,31 +24,58 @@ def resolve_tool_name(requested_name: str) -> str:
     logger.warning(f"⚠️ No match found for tool name: {requested_name}")
     return None
 
+def _prepare_step(idx, step):
+    raw_tool_name = step.get("tool")
+    step_key = f"step{idx+1}"
+
+    resolved_tool_name = resolve_tool_name(raw_tool_name)
+    if not resolved_tool_name:
+        logger.error(f"❌ Tool contract not found for tool: {raw_tool_name}")
+        raise ValueError(f"Tool contract not found for tool: {raw_tool_name}")
+
+    logger.debug(f"🔧 [PLAN] Running {step_key} → resolved tool: {resolved_tool_name}")
+
+    tool_contract = TOOL_CONTRACTS[resolved_tool_name]
+    logger.debug(f"📄 Loaded contract for {resolved_tool_name}")
+    logger.debug(f"🔗 Endpoint: {tool_contract.get('endpoint')}")
+    logger.debug(f"📥 Required Inputs: {tool_contract.get('required_inputs')}")
+    logger.debug(f"🔎 Filtering Rules: {tool_contract.get('filtering_rules')}")
+
+    inputs = step.get("inputs", {})
+    logger.debug(f"⚙️ Executing {resolved_tool_name} with inputs: {inputs}")
+    return step_key, resolved_tool_name, tool_contract, inputs
+
 def execute_plan(plan):
     results = {}
 
     for idx, step in enumerate(plan):
-        raw_tool_name = step.get("tool")
-        step_key = f"step{idx+1}"
+        step_key, resolved_tool_name, tool_contract, inputs = _prepare_step(idx, step)
+
+        try:
+            response = run_tool(
+                tool_contract,
+                inputs,
+                request_schema=tool_contract.get("request_schema"),
+                response_schema=tool_contract.get("response_schema")
+            )
+            logger.debug(f"✅ Response from {resolved_tool_name}: {response}")
+        except Exception as e:
+            logger.error(f"🚨 Error executing {resolved_tool_name}: {e}")
+            raise
 
-        resolved_tool_name = resolve_tool_name(raw_tool_name)
-        if not resolved_tool_name:
-            logger.error(f"❌ Tool contract not found for tool: {raw_tool_name}")
-            raise ValueError(f"Tool contract not found for tool: {raw_tool_name}")
+        results[step_key] = response
 
-        logger.debug(f"🔧 [PLAN] Running {step_key} → resolved tool: {resolved_tool_name}")
+    return results
 
-        tool_contract = TOOL_CONTRACTS[resolved_tool_name]
-        logger.debug(f"📄 Loaded contract for {resolved_tool_name}")
-        logger.debug(f"🔗 Endpoint: {tool_contract.get('endpoint')}")
-        logger.debug(f"📥 Required Inputs: {tool_contract.get('required_inputs')}")
-        logger.debug(f"🔎 Filtering Rules: {tool_contract.get('filtering_rules')}")
+async def execute_plan_async(plan):
+    """Async variant of execute_plan; upstream calls are awaited instead of blocking."""
+    results = {}
 
-        inputs = step.get("inputs", {})
-        logger.debug(f"⚙️ Executing {resolved_tool_name} with inputs: {inputs}")
+    for idx, step in enumerate(plan):
+        step_key, resolved_tool_name, tool_contract, inputs = _prepare_step(idx, step)
 
         try:
-            response = run_tool(
+            response = await run_tool_async(
                 tool_contract,
                 inputs,
                 request_schema=tool_contract.get("request_schema"),
@@ -0,0 +1,143 @@
+# core/fast_planner.py
+
+import logging
+import re
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from core.tool_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Account/arrangement/customer IDs: standalone numbers of 5+ digits
+ID_PATTERN = re.compile(r"\b\d{5,}\b")
+
+# Words around an ID list after the input's noun: "accounts 105929, 108596 and 109213", "account no. 105929"
+_ID_LIST = r"(?:\s*(?:ids?|numbers?|no\.?|#|:))*\s*(\d{5,}(?:\s*(?:,|and|&|or)\s*\d{5,})*)\b"
+
+# Requests that exclude something ("not", "except", ...) need the LLM
+NEGATION_PATTERN = re.compile(r"\b(?:not|except|excluding|exclude|without|neither|nor)\b|n't\b", re.IGNORECASE)
+
+# Range and comparison wording. The contracts declare which fields can be
+# filtered (filtering_rules, optional_inputs) but not how a range is phrased.
+RANGE_CUES = {
+    "between", "since", "before", "after", "from", "until", "last", "recent", "latest", "close",
+    "above", "below", "over", "under", "more", "less", "greater", "than", "around", "near",
+    "month", "year", "week", "day", "today", "yesterday", "jan", "feb", "mar", "apr", "may", "jun",
+    "jul", "aug", "sep", "oct", "nov", "dec", "january", "february", "march", "april", "june", "july",
+    "august", "september", "october", "november", "december",
+}
+
+# Description words worth less than name words when matching an intent
+DESCRIPTION_WEIGHT = 0.5
+
+
+class FastPlan(NamedTuple):
+    tool: Optional[str]
+    confidence: float
+    plan: List[dict]
+    missing: List[str]
+    reason: str
+
+
+class FastPlanner:
+    """
+    Keyword intent matcher built from the tool registry and contracts.
+
+    Each tool is described by the words only it has: words from its name
+    (weight 1) and from its description (weight DESCRIPTION_WEIGHT). A
+    request that clearly names a single tool, and needs nothing except that
+    tool's required inputs, gets a plan without calling the LLM.
+
+    The planner declines (returns to the LLM) when the request mentions a
+    field any contract can filter on, uses range or negation wording, or
+    has a number that isn't an ID right after the required input's noun.
+    """
+
+    def __init__(self, registry: List[Dict[str, Any]], contracts: Dict[str, dict], threshold: float = 0.8):
+        self.contracts = contracts
+        self.threshold = threshold
+        name_tokens = {t["name"]: set(tokenize(t["name"].removeprefix("tool_"))) for t in registry}
+        desc_tokens = {t["name"]: set(tokenize(t.get("description", ""))) for t in registry}
+        name_df = Counter(tok for toks in name_tokens.values() for tok in toks)
+        desc_df = Counter(tok for toks in desc_tokens.values() for tok in toks)
+
+        self.keywords: Dict[str, Dict[str, float]] = {}
+        for tool in registry:
+            name = tool["name"]
+            weights = {tok: DESCRIPTION_WEIGHT for tok in desc_tokens[name] if desc_df[tok] == 1}
+            weights.update({tok: 1.0 for tok in name_tokens[name] if name_df[tok] == 1})
+            self.keywords[name] = weights
+
+        filter_tokens = set()
+        for contract in contracts.values():
+            params = [rule.get("input_param", "") for rule in contract.get("filtering_rules", [])]
+            params += contract.get("optional_inputs", [])
+            filter_tokens.update(tok for param in params for tok in tokenize(param))
+        # A tool's own name words and its required inputs' nouns are how it is asked for, not filters
+        self.filter_cues: Dict[str, set] = {}
+        for tool in registry:
+            name = tool["name"]
+            required = contracts.get(name, {}).get("required_inputs", [])
+            own = name_tokens[name] | {tok for param in required for tok in tokenize(param)}
+            self.filter_cues[name] = (filter_tokens - own) | RANGE_CUES
+
+    @staticmethod
+    def bound_ids(text: str, param: str) -> List[str]:
+        """IDs written right after param's noun ("account" for accountId), in order."""
+        nouns = tokenize(param)
+        if not nouns:
+            return []
+        pattern = re.compile(r"\b" + r"\s+".join(f"{noun}s?" for noun in nouns) + _ID_LIST, re.IGNORECASE)
+        return [value for match in pattern.finditer(text) for value in ID_PATTERN.findall(match.group(1))]
+
+    def scores(self, text: str) -> Dict[str, float]:
+        terms = set(tokenize(text))
+        return {name: sum(w for tok, w in kw.items() if tok in terms) for name, kw in self.keywords.items()}
+
+    def match(self, goal: str, objective: str, expected_outcome: str, memory: dict) -> FastPlan:
+        """Best single-tool plan for the request, with a confidence in [0, 1]."""
+        text = f"{goal} {objective} {expected_outcome}"
+        ranked = sorted(self.scores(text).items(), key=lambda kv: -kv[1])
+        if not ranked or ranked[0][1] < 1.0:
+            return FastPlan(None, 0.0, [], [], "no tool keyword")
+        (tool, best), second = ranked[0], (ranked[1][1] if len(ranked) > 1 else 0.0)
+        confidence = best / (best + second)
+
+        cues = self.filter_cues.get(tool, RANGE_CUES).intersection(tokenize(text))
+        if cues:
+            return FastPlan(tool, 0.0, [], [], f"needs filters: {', '.join(sorted(cues))}")
+        negation = NEGATION_PATTERN.search(text)
+        if negation:
+            return FastPlan(tool, 0.0, [], [], f"negation: {negation.group(0)}")
+
+        contract = self.contracts.get(tool, {})
+        required = contract.get("required_inputs", [])
+        unfilled = [p for p in required if p not in memory]
+        if len(unfilled) > 1 or (unfilled and not unfilled[0].lower().endswith("id")):
+            return FastPlan(tool, 0.0, [], [], f"cannot extract {', '.join(unfilled)}")
+        ids = self.bound_ids(text, unfilled[0]) if unfilled else []
+        leftover = [n for n in re.findall(r"\d+", text) if n not in ids]
+        if leftover:
+            return FastPlan(tool, 0.0, [], [], f"unexplained numbers: {', '.join(leftover)}")
+
+        base = {p: memory[p] for p in required if p in memory}
+        if not unfilled:
+            plan = [{"tool": tool, "inputs": base}]
+            missing = []
+        elif ids:
+            plan = [{"tool": tool, "inputs": {**base, unfilled[0]: value}} for value in dict.fromkeys(ids)]
+            missing = []
+        else:
+            plan = [{"tool": tool, "inputs": {**base, unfilled[0]: f"<{unfilled[0]}>"}}]
+            missing = unfilled
+
+        return FastPlan(tool, confidence, plan, missing, "matched")
+
+    def plan(self, goal: str, objective: str, expected_outcome: str, memory: dict) -> Optional[FastPlan]:
+        """The fast plan if it clears the confidence threshold, otherwise None (use the LLM)."""
+        result = self.match(goal, objective, expected_outcome, memory)
+        if result.plan and result.confidence >= self.threshold:
+            logger.info(f"⚡ Fast-path plan: {result.tool} (confidence {result.confidence:.2f})")
+            return result
+        return None
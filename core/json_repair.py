@@ -0,0 +1,88 @@
+# core/json_repair.py
+
+import json
+from typing import Any
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def strip_fences(text: str) -> str:
+    """Remove a surrounding ```json ... ``` markdown fence, if any."""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned[3:]
+        cleaned = cleaned[4:] if cleaned.lower().startswith("json") else cleaned
+        cleaned = cleaned.rsplit("```", 1)[0] if "```" in cleaned else cleaned
+    return cleaned.strip()
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort fix-up of almost-JSON from an LLM, without another model call:
+    drops text before the first "{" and after the matching close, removes
+    trailing commas, closes an unterminated string and any open brackets
+    (output cut off by the token limit).
+    """
+    cleaned = strip_fences(text)
+    start = cleaned.find("{")
+    if start < 0:
+        return cleaned
+
+    out = []
+    stack = []
+    in_string = escaped = False
+    for ch in cleaned[start:]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if not stack or stack[-1] != ch:
+                break
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            continue
+        out.append(ch)
+
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    _drop_trailing_comma(out)
+    tail = "".join(out).rstrip()
+    if tail.endswith(":"):
+        tail += " null"
+    return tail + "".join(reversed(stack))
+
+
+def _drop_trailing_comma(out: list) -> None:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i:]
+
+
+def loads_lenient(text: str) -> Any:
+    """json.loads, retried once on the repaired text; raises the original error if both fail."""
+    cleaned = strip_fences(text)
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        try:
+            return json.loads(repair_json(cleaned))
+        except json.JSONDecodeError:
+            raise e
@@ -1,13 +1,280 @@
 # core/llm.py
 
-import subprocess
+import asyncio
+import hashlib
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional, Tuple
+
+from config.config import (
+    LLM_BACKEND, LLM_FAKE_LATENCY, LLM_FAKE_RESPONSES,
+    OLLAMA_HOST, OLLAMA_MODEL, OLLAMA_KEEP_ALIVE, OLLAMA_TIMEOUT, OLLAMA_SUBPROCESS_FALLBACK,
+    LLM_DEADLINE_PLANNER, LLM_DEADLINE_STEP_SUMMARY, LLM_DEADLINE_FINAL_SUMMARY, LLM_DEADLINE_DEFAULT,
+    LLM_FALLBACK_MODEL,
+    LLM_CACHE_ENABLED, LLM_CACHE_DIR, LLM_CACHE_SIZE_LIMIT,
+    LLM_CACHE_TTL_PLANNER, LLM_CACHE_TTL_SUMMARY, LLM_CACHE_TTL_DEFAULT,
+)
+from core.llm_backends import LLMTimeoutError, create_llm_backend
+from core.llm_cache import CALL_SITE, LLMCache
+from core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+BACKEND_SETTINGS = dict(
+    host=OLLAMA_HOST,
+    keep_alive=OLLAMA_KEEP_ALIVE,
+    timeout=OLLAMA_TIMEOUT,
+    subprocess_fallback=OLLAMA_SUBPROCESS_FALLBACK,
+    fake_latency=LLM_FAKE_LATENCY,
+    fake_responses=LLM_FAKE_RESPONSES,
+)
+
+# The model behind every call_gemma3* call; see core/llm_backends.py
+BACKEND = create_llm_backend(LLM_BACKEND, model=OLLAMA_MODEL, **BACKEND_SETTINGS)
+logger.info(f"🧠 LLM backend: {BACKEND.name} ({BACKEND.model})")
+
+# Smaller/faster model a call is retried on when BACKEND misses the deadline
+FALLBACK_BACKEND = create_llm_backend(LLM_BACKEND, model=LLM_FALLBACK_MODEL, **BACKEND_SETTINGS) if LLM_FALLBACK_MODEL else None
+
+# Seconds each call site's generation may take; 0 means no deadline
+DEADLINES = {
+    "planner": LLM_DEADLINE_PLANNER,
+    "step_summary": LLM_DEADLINE_STEP_SUMMARY,
+    "final_summary": LLM_DEADLINE_FINAL_SUMMARY,
+}
+
+# Per call site: generations that missed their deadline, and answers served by FALLBACK_BACKEND instead
+DEADLINE_STATS = {"timeouts": Counter(), "fallbacks": Counter()}
+
+LLM_CACHE = LLMCache(
+    LLM_CACHE_DIR,
+    size_limit=LLM_CACHE_SIZE_LIMIT,
+    ttls={
+        "planner": LLM_CACHE_TTL_PLANNER,
+        "step_summary": LLM_CACHE_TTL_SUMMARY,
+        "final_summary": LLM_CACHE_TTL_SUMMARY,
+    },
+    default_ttl=LLM_CACHE_TTL_DEFAULT,
+) if LLM_CACHE_ENABLED else None
+
+# Identical prompts awaited concurrently share one generation
+LLM_FLIGHTS = SingleFlight()
+
+# Conversation state ({"context": [...]}) the current call continues and updates; see conversation()
+CONVERSATION: ContextVar[Optional[dict]] = ContextVar("llm_conversation", default=None)
+
+
+@contextmanager
+def conversation(state: dict):
+    """
+    Continue the generation whose context is stored in state (a session's
+    dict), and store the new context there afterwards. Calls that continue a
+    context bypass the response cache, since their output depends on it.
+    """
+    token = CONVERSATION.set(state)
+    try:
+        yield state
+    finally:
+        CONVERSATION.reset(token)
+
+
+# JSON schema the current call's output must follow (Ollama "format"); see output_format()
+OUTPUT_FORMAT: ContextVar[Optional[dict]] = ContextVar("llm_output_format", default=None)
+
+
+@contextmanager
+def output_format(schema: dict):
+    """Constrain every generation inside the block to JSON matching schema."""
+    token = OUTPUT_FORMAT.set(schema)
+    try:
+        yield
+    finally:
+        OUTPUT_FORMAT.reset(token)
+
+
+def _variant() -> str:
+    schema = OUTPUT_FORMAT.get()
+    return json.dumps(schema, sort_keys=True) if schema else ""
+
+
+def discard_cached(prompt: str) -> None:
+    """Forget the cached response to prompt (under the current output format)."""
+    if LLM_CACHE is not None:
+        LLM_CACHE.discard(BACKEND.model, prompt, _variant())
+
+
+def _continues_context() -> bool:
+    state = CONVERSATION.get()
+    return bool(state and state.get("context"))
+
+
+def deadline() -> Optional[float]:
+    """Seconds the current call site's generation may take, or None for no limit."""
+    seconds = DEADLINES.get(CALL_SITE.get(), LLM_DEADLINE_DEFAULT)
+    return seconds if seconds > 0 else None
+
+
+def deadline_stats() -> dict:
+    return {
+        "deadlines": {**DEADLINES, "default": LLM_DEADLINE_DEFAULT},
+        "fallback_model": FALLBACK_BACKEND.model if FALLBACK_BACKEND is not None else None,
+        "timeouts": dict(DEADLINE_STATS["timeouts"]),
+        "fallbacks": dict(DEADLINE_STATS["fallbacks"]),
+    }
+
+
+def _timed_out(seconds: Optional[float], error: Exception) -> None:
+    """
+    Book a missed deadline. Raises LLMTimeoutError unless the call can be
+    retried on FALLBACK_BACKEND; calls continuing a conversation can't, since
+    the fallback model doesn't share the primary model's context.
+    """
+    site = CALL_SITE.get()
+    DEADLINE_STATS["timeouts"][site] += 1
+    if FALLBACK_BACKEND is None or _continues_context():
+        logger.warning(f"⏱️ LLM call ({site}) missed its {seconds}s deadline")
+        raise LLMTimeoutError(f"LLM call ({site}) missed its {seconds}s deadline") from error
+    logger.warning(f"⏱️ LLM call ({site}) missed its {seconds}s deadline; retrying on {FALLBACK_BACKEND.model}")
+
+
+def _fallback_answered() -> None:
+    DEADLINE_STATS["fallbacks"][CALL_SITE.get()] += 1
+
+
+def _generate(prompt: str) -> Tuple[str, bool]:
+    """Completion for prompt, and whether it may be cached (only BACKEND's answers are)."""
+    seconds = deadline()
+    try:
+        return BACKEND.generate(
+            prompt, conversation=CONVERSATION.get(), output_format=OUTPUT_FORMAT.get(), timeout=seconds
+        ), True
+    except LLMTimeoutError as e:
+        _timed_out(seconds, e)
+    try:
+        response = FALLBACK_BACKEND.generate(prompt, output_format=OUTPUT_FORMAT.get(), timeout=seconds)
+    except LLMTimeoutError:
+        DEADLINE_STATS["timeouts"][CALL_SITE.get()] += 1
+        raise
+    _fallback_answered()
+    return response, False
+
+
+async def _fallback_async(prompt: str, seconds: Optional[float]) -> str:
+    try:
+        response = await asyncio.wait_for(
+            FALLBACK_BACKEND.generate_async(prompt, output_format=OUTPUT_FORMAT.get()), seconds
+        )
+    except (asyncio.TimeoutError, LLMTimeoutError) as e:
+        DEADLINE_STATS["timeouts"][CALL_SITE.get()] += 1
+        raise LLMTimeoutError(f"Fallback model {FALLBACK_BACKEND.model} missed the {seconds}s deadline") from e
+    _fallback_answered()
+    return response
+
+
+async def _generate_async(prompt: str) -> Tuple[str, bool]:
+    """
+    Async counterpart of _generate. On the deadline the awaited generation is
+    cancelled, which kills the subprocess or closes the HTTP request.
+    """
+    seconds = deadline()
+    try:
+        return await asyncio.wait_for(
+            BACKEND.generate_async(prompt, conversation=CONVERSATION.get(), output_format=OUTPUT_FORMAT.get()),
+            seconds
+        ), True
+    except (asyncio.TimeoutError, LLMTimeoutError) as e:
+        _timed_out(seconds, e)
+    return await _fallback_async(prompt, seconds), False
+
 
 def call_gemma3(prompt: str) -> str:
-    result = subprocess.run(
-        ["ollama", "run", "gemma3:latest"],
-        input=prompt,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    return result.stdout.strip()
+    """
+    Generate a completion for prompt with the configured backend, served
+    from LLM_CACHE when the same prompt was answered before. Wrap calls in
+    core.llm_cache.call_site() to pick the cache TTL and the deadline for
+    that part of the pipeline. Raises LLMTimeoutError if neither the model
+    nor FALLBACK_BACKEND answers in time.
+    """
+    if _continues_context():
+        return _generate(prompt)[0]
+    if LLM_CACHE is not None:
+        cached = LLM_CACHE.get(BACKEND.model, prompt, _variant())
+        if cached is not None:
+            return cached
+    response, cacheable = _generate(prompt)
+    if LLM_CACHE is not None and cacheable:
+        LLM_CACHE.set(BACKEND.model, prompt, response, _variant())
+    return response
+
+
+def flight_key(prompt: str) -> str:
+    """Identity of a generation: model, prompt and every generation option sent to the backend."""
+    identity = BACKEND.request_identity(prompt, output_format=OUTPUT_FORMAT.get())
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+async def _generate_and_cache_async(prompt: str) -> str:
+    response, cacheable = await _generate_async(prompt)
+    if LLM_CACHE is not None and cacheable:
+        LLM_CACHE.set(BACKEND.model, prompt, response, _variant())
+    return response
+
+
+async def call_gemma3_async(prompt: str) -> str:
+    """
+    Non-blocking variant of call_gemma3. Concurrent calls with the same
+    model, prompt and options wait on a single generation.
+    """
+    if _continues_context():
+        return (await _generate_async(prompt))[0]
+    if LLM_CACHE is not None:
+        cached = LLM_CACHE.get(BACKEND.model, prompt, _variant())
+        if cached is not None:
+            return cached
+    return await LLM_FLIGHTS.do(flight_key(prompt), lambda: _generate_and_cache_async(prompt))
+
+
+async def stream_gemma3_async(prompt: str) -> AsyncIterator[str]:
+    """
+    Streaming variant of call_gemma3_async: yields text fragments as they are
+    generated. A cached response is yielded as a single fragment, and the
+    complete text is cached once the stream finishes.
+
+    The call site's deadline covers the whole stream. If it passes before
+    the first fragment, FALLBACK_BACKEND's answer is yielded in one piece;
+    once fragments were sent, LLMTimeoutError is raised instead.
+    """
+    if LLM_CACHE is not None:
+        cached = LLM_CACHE.get(BACKEND.model, prompt)
+        if cached is not None:
+            yield cached
+            return
+
+    seconds = deadline()
+    loop = asyncio.get_running_loop()
+    ends = loop.time() + seconds if seconds else None
+    stream = BACKEND.stream_async(prompt)
+    parts = []
+    try:
+        while True:
+            remaining = None if ends is None else max(0.0, ends - loop.time())
+            try:
+                fragment = await asyncio.wait_for(stream.__anext__(), remaining)
+            except StopAsyncIteration:
+                break
+            parts.append(fragment)
+            yield fragment
+    except (asyncio.TimeoutError, LLMTimeoutError) as e:
+        await stream.aclose()
+        if parts:
+            DEADLINE_STATS["timeouts"][CALL_SITE.get()] += 1
+            raise LLMTimeoutError(f"LLM stream ({CALL_SITE.get()}) missed its {seconds}s deadline") from e
+        _timed_out(seconds, e)
+        yield await _fallback_async(prompt, seconds)
+        return
+
+    if LLM_CACHE is not None:
+        LLM_CACHE.set(BACKEND.model, prompt, "".join(parts).strip())
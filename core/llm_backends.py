@@ -0,0 +1,298 @@
+# core/llm_backends.py
+
+import asyncio
+import json
+import logging
+import subprocess
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTimeoutError(TimeoutError):
+    """A generation ran past its deadline and was stopped."""
+
+
+class LLMBackend:
+    """
+    One way of turning a prompt into a completion. core.llm puts the
+    response cache and in-flight coalescing in front of whichever backend
+    LLM_BACKEND selects.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def generate(self, prompt: str, conversation: Optional[dict] = None, output_format: Optional[dict] = None,
+                 timeout: Optional[float] = None) -> str:
+        """
+        conversation, when given, is a dict whose "context" the call continues
+        and is updated with the new context. output_format is a JSON schema the
+        output must match. Backends that support neither ignore them.
+        After timeout seconds the generation is stopped and LLMTimeoutError raised.
+        """
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str, conversation: Optional[dict] = None,
+                             output_format: Optional[dict] = None) -> str:
+        raise NotImplementedError
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the completion in fragments; by default as a single one."""
+        yield await self.generate_async(prompt)
+
+    async def preload_async(self) -> None:
+        """Get the model loaded before the first real request, with a tiny prompt."""
+        await self.generate_async("Hi")
+
+    def request_identity(self, prompt: str, output_format: Optional[dict] = None) -> dict:
+        """Everything that determines the output for prompt (used to coalesce identical calls)."""
+        return {"backend": self.name, "model": self.model, "prompt": prompt, "format": output_format}
+
+
+class OllamaSubprocessBackend(LLMBackend):
+    """Spawns `ollama run <model>` per prompt. Slow; kept as a fallback."""
+
+    name = "ollama_subprocess"
+
+    def __init__(self, model: str):
+        super().__init__(model)
+        self.command = ["ollama", "run", model]
+
+    def generate(self, prompt, conversation=None, output_format=None, timeout=None):
+        try:
+            result = subprocess.run(
+                self.command,
+                input=prompt,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=timeout
+            )
+        except subprocess.TimeoutExpired as e:
+            # subprocess.run has already killed the child
+            raise LLMTimeoutError(f"{self.model} did not answer within {timeout}s") from e
+        return result.stdout.strip()
+
+    async def generate_async(self, prompt, conversation=None, output_format=None):
+        """
+        Awaits the subprocess on the event loop.
+        If the awaiting task is cancelled (client went away), the subprocess is killed.
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, _ = await proc.communicate(prompt.encode())
+        except asyncio.CancelledError:
+            if proc.returncode is None:
+                logger.info(f"🛑 Killing cancelled ollama generation (pid {proc.pid})")
+                proc.kill()
+                await proc.wait()
+            raise
+        return stdout.decode().strip()
+
+
+class OllamaHTTPBackend(LLMBackend):
+    """
+    Ollama /api/generate over shared keep-alive connections, asking Ollama to
+    keep the model resident for keep_alive. If the API is unreachable and a
+    fallback backend is given, the call is retried there.
+    """
+
+    name = "ollama_http"
+
+    def __init__(self, model: str, host: str, keep_alive: str, timeout: float,
+                 fallback: Optional[LLMBackend] = None):
+        super().__init__(model)
+        self.host = host
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.fallback = fallback
+        self._client = None
+        self._async_client = None
+
+    def get_client(self) -> httpx.Client:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.Client(base_url=self.host, timeout=self.timeout)
+        return self._client
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(base_url=self.host, timeout=self.timeout)
+        return self._async_client
+
+    def generate_body(self, prompt: str, stream: bool = False, conversation: Optional[dict] = None,
+                      output_format: Optional[dict] = None) -> dict:
+        body = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }
+        if conversation and conversation.get("context"):
+            body["context"] = conversation["context"]
+        if output_format:
+            body["format"] = output_format
+        return body
+
+    @staticmethod
+    def _completion(resp: httpx.Response, conversation: Optional[dict]) -> str:
+        resp.raise_for_status()
+        data = resp.json()
+        if conversation is not None:
+            conversation["context"] = data.get("context")
+        return data.get("response", "").strip()
+
+    def request_identity(self, prompt, output_format=None):
+        return self.generate_body(prompt, output_format=output_format)
+
+    def _unreachable(self, e: Exception) -> None:
+        if self.fallback is None:
+            raise e
+        logger.warning(f"⚠️ Ollama API unreachable at {self.host} ({e}); falling back to {self.fallback.name}")
+
+    def generate(self, prompt, conversation=None, output_format=None, timeout=None):
+        body = self.generate_body(prompt, conversation=conversation, output_format=output_format)
+        try:
+            resp = self.get_client().post(
+                "/api/generate", json=body, timeout=timeout if timeout else httpx.USE_CLIENT_DEFAULT
+            )
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(f"{self.model} did not answer in time") from e
+        except httpx.TransportError as e:
+            self._unreachable(e)
+            return self.fallback.generate(prompt, timeout=timeout)
+        return self._completion(resp, conversation)
+
+    async def generate_async(self, prompt, conversation=None, output_format=None):
+        """Cancelling the awaiting task closes the request, which makes Ollama stop generating."""
+        body = self.generate_body(prompt, conversation=conversation, output_format=output_format)
+        try:
+            resp = await self.get_async_client().post("/api/generate", json=body)
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(f"{self.model} did not answer in time") from e
+        except httpx.TransportError as e:
+            self._unreachable(e)
+            return await self.fallback.generate_async(prompt)
+        return self._completion(resp, conversation)
+
+    async def preload_async(self):
+        """An empty prompt makes Ollama load the model (for keep_alive) without generating."""
+        resp = await self.get_async_client().post("/api/generate", json=self.generate_body(""))
+        resp.raise_for_status()
+
+    async def stream_async(self, prompt):
+        body = self.generate_body(prompt, stream=True)
+        started = False
+        try:
+            async with self.get_async_client().stream("POST", "/api/generate", json=body) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        started = True
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(f"{self.model} did not answer in time") from e
+        except httpx.TransportError as e:
+            if started:
+                raise
+            self._unreachable(e)
+            yield await self.fallback.generate_async(prompt)
+
+
+# Marker every planner prompt asks the model to fill in
+PLANNER_MARKER = '"tool_chain"'
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Deterministic stand-in for load-testing everything except the model.
+
+    Planner prompts get a canned plan and every other prompt a canned
+    summary, after `latency` seconds. Without a responses file the plan
+    calls the first registry tool with its required inputs as <param>
+    placeholders, so they resolve from session memory like a real plan.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, responses: Optional[Dict[str, str]] = None,
+                 registry_path: str = "schema/tool_registry_llm.json"):
+        super().__init__("fake")
+        self.latency = latency
+        self.responses = responses or {}
+        self.registry_path = registry_path
+
+    def default_plan(self) -> str:
+        with open(self.registry_path, "r") as f:
+            tool = json.load(f)[0]
+        required = tool.get("parameters", {}).get("required", [])
+        return json.dumps({
+            "goal": "fake plan",
+            "fallback_response": "",
+            "tool_chain": [{"tool": tool["name"], "inputs": {p: f"<{p}>" for p in required}}],
+        })
+
+    def respond(self, prompt: str) -> str:
+        if PLANNER_MARKER in prompt:
+            return self.responses.get("planner") or self.default_plan()
+        return self.responses.get("summary") or f"Fake summary ({len(prompt)} prompt characters)."
+
+    def generate(self, prompt, conversation=None, output_format=None, timeout=None):
+        if timeout and self.latency > timeout:
+            time.sleep(timeout)
+            raise LLMTimeoutError(f"fake backend did not answer within {timeout}s")
+        time.sleep(self.latency)
+        return self.respond(prompt)
+
+    async def generate_async(self, prompt, conversation=None, output_format=None):
+        await asyncio.sleep(self.latency)
+        return self.respond(prompt)
+
+    async def stream_async(self, prompt):
+        words = self.respond(prompt).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            yield word if i == 0 else " " + word
+
+
+def load_fake_responses(path: Optional[str]) -> Dict[str, str]:
+    """Read {"planner": <plan JSON or string>, "summary": <text>} for FakeLLMBackend."""
+    if not path:
+        return {}
+    with open(path, "r") as f:
+        responses = json.load(f)
+    if isinstance(responses.get("planner"), dict):
+        responses["planner"] = json.dumps(responses["planner"])
+    return responses
+
+
+def create_llm_backend(name: str, **settings) -> LLMBackend:
+    """
+    Build a backend by name: ollama_http | ollama_subprocess | fake.
+    settings are the OLLAMA_* / LLM_FAKE_* values from config.config.
+    """
+    if name == "ollama_subprocess":
+        return OllamaSubprocessBackend(settings["model"])
+    if name == "ollama_http":
+        fallback = OllamaSubprocessBackend(settings["model"]) if settings.get("subprocess_fallback") else None
+        return OllamaHTTPBackend(
+            settings["model"], settings["host"], settings["keep_alive"], settings["timeout"], fallback=fallback
+        )
+    if name == "fake":
+        return FakeLLMBackend(settings.get("fake_latency", 0.0), load_fake_responses(settings.get("fake_responses")))
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,85 @@
+# core/llm_cache.py
+
+import hashlib
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+# Which part of the pipeline is calling the LLM ("planner", "summary", ...).
+# Set with call_site(); selects the TTL and the counters a cached response is booked under.
+CALL_SITE: ContextVar[str] = ContextVar("llm_call_site", default="default")
+
+
+@contextmanager
+def call_site(name: str):
+    """Tag every LLM call made inside the block (including awaited ones) with `name`."""
+    token = CALL_SITE.set(name)
+    try:
+        yield
+    finally:
+        CALL_SITE.reset(token)
+
+
+def cache_key(model: str, prompt: str, variant: str = "") -> str:
+    """variant distinguishes calls whose output differs for the same prompt (e.g. a format schema)."""
+    return f"{model}:{hashlib.sha256((variant + prompt).encode()).hexdigest()}"
+
+
+class LLMCache:
+    """
+    Persistent prompt → response cache shared by all workers on the host.
+
+    Entries expire per call site (planner plans may live longer than data
+    summaries) and the least recently used ones are evicted once the cache
+    grows past size_limit bytes.
+    """
+
+    def __init__(self, directory: str, size_limit: int, ttls: Dict[str, float], default_ttl: float):
+        self._cache = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def ttl_for(self, site: str) -> float:
+        return self.ttls.get(site, self.default_ttl)
+
+    def get(self, model: str, prompt: str, variant: str = "") -> Optional[str]:
+        site = CALL_SITE.get()
+        value = self._cache.get(cache_key(model, prompt, variant))
+        if value is None:
+            self.misses[site] += 1
+        else:
+            self.hits[site] += 1
+            logger.debug(f"💾 LLM cache hit ({site})")
+        return value
+
+    def set(self, model: str, prompt: str, response: str, variant: str = "") -> None:
+        # Empty output means the generation failed; never pin that
+        if response:
+            self._cache.set(cache_key(model, prompt, variant), response, expire=self.ttl_for(CALL_SITE.get()))
+
+    def discard(self, model: str, prompt: str, variant: str = "") -> None:
+        """Drop an entry the caller found unusable (e.g. unparseable plan JSON)."""
+        self._cache.delete(cache_key(model, prompt, variant))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        sites = sorted(set(self.hits) | set(self.misses))
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "entries": len(self._cache),
+            "size_bytes": self._cache.volume(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "by_call_site": {site: {"hits": self.hits[site], "misses": self.misses[site]} for site in sites},
+        }
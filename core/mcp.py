@@ -1,14 +1,17 @@
+import asyncio
 import logging
 import json
 import copy
-from typing import Dict, Any, List
+from typing import Any, Awaitable, Callable, Dict, List
 from pathlib import Path
 
-from core.executioner import execute_plan
-from core.aggregator import aggregate
-from core.planner import plan
-from core.llm import call_gemma3
+from core.executioner import execute_plan, execute_plan_async
+from core.aggregator import aggregate, aggregate_async
+from core.planner import plan, plan_async
+from core.llm import call_gemma3, call_gemma3_async, conversation, stream_gemma3_async
 from core.utils import load_tool_contracts_from_folder
+from core.session_store import create_session_backend
+from config.config import MCP_SESSION_BACKEND, MCP_SESSION_PATH, MCP_SESSION_TTL, SUMMARY_MODE, SUMMARY_PARALLELISM
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +19,18 @@ logger = logging.getLogger(__name__)
 TOOL_CONTRACT_DIR = Path("schema/tool_contract")
 TOOL_CONTRACTS = load_tool_contracts_from_folder(TOOL_CONTRACT_DIR)
 
-SESSION_STORE: Dict[str, Dict[str, Any]] = {}
+# Session contexts live in a backend shared by all workers (see core/session_store.py)
+SESSION_STORE = create_session_backend(MCP_SESSION_BACKEND, MCP_SESSION_PATH, MCP_SESSION_TTL)
+
+# Only these response keys are needed to resume a session on the next turn
+SESSION_RESPONSE_KEYS = ("next_action", "is_final", "missing")
+
+# response_mode → top-level keys dropped from a process_user_request response
+RESPONSE_MODES = {
+    "summary": {"plan", "raw_result", "raw_text", "memory_passed"},
+    "steps": {"raw_result"},
+    "full": set(),
+}
 
 def extract_values_from_result(result: Dict[str, Any], key: str) -> List[Any]:
     """Extract values for 'account', 'accountId', or 'arrangementId' from a step result."""
@@ -59,15 +73,19 @@ def replace_placeholders(inputs: Dict[str, Any], replacements: Dict[str, Any]) -
                 new_inputs[k] = replacements[key]
     return new_inputs
 
-def process_user_request(input_contract: Dict[str, Any], session_id: str) -> Dict[str, Any]:
-    """Main MCP session handler."""
-    session_context = SESSION_STORE.setdefault(session_id, {
+def _open_session(input_contract: Dict[str, Any], session_id: str):
+    """
+    Load (or create) the session and work out goal/objective/outcome for this turn.
+    Works on a copy, so the stored session only changes when _save_session runs
+    (the in-memory backend would otherwise hand out the stored dict itself).
+    """
+    session_context = copy.deepcopy(SESSION_STORE.get(session_id)) or {
         "memory": {},
         "last_response": {},
         "original_goal": None,
         "original_objective": None,
         "original_expected_outcome": None,
-    })
+    }
 
     last_response = session_context.get("last_response", {})
     memory = session_context.get("memory", {})
@@ -87,109 +105,219 @@ def process_user_request(input_contract: Dict[str, Any], session_id: str) -> Dic
         session_context["original_goal"] = goal
         session_context["original_objective"] = objective
         session_context["original_expected_outcome"] = expected_outcome
+        # A new goal starts a new planner conversation
+        session_context["planner_llm"] = {}
 
     session_context["memory"] = memory
+    return session_context, goal, objective, expected_outcome, memory
 
-    try:
-        plan_steps, missing = plan(goal, objective, expected_outcome, memory)
+def _save_session(session_id: str, session_context: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """Persist the session with a trimmed copy of this turn's response (no raw upstream bodies)."""
+    session_context["last_response"] = {k: response[k] for k in SESSION_RESPONSE_KEYS if k in response}
+    SESSION_STORE.set(session_id, session_context)
+
+def _apply_memory(plan_steps: List[Dict[str, Any]], memory: Dict[str, Any]) -> None:
+    # Populate memory for each step, if any values are already known
+    for step in plan_steps:
+        for key, val in memory.items():
+            step.setdefault("inputs", {}).setdefault(key, val)
+
+def _ask_user_response(missing: List[str], memory: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+    return {
+        "plan": [],
+        "next_action": "ask_user",
+        "prompt": f"Please provide {missing[0]}",
+        "missing": missing,
+        "fallback_response": "Could you help me with the required detail?",
+        "is_final": False,
+        "memory_passed": memory,
+        "session_id": session_id
+    }
+
+def _prepare_step(i: int, step: Dict[str, Any], all_results: Dict[str, Any]) -> str:
+    """Resolve placeholders in step i from the previous step's result; returns the step key."""
+    step_key = f"step{i+1}"
+
+    if i > 0:
+        prev_step_result = all_results.get(f"step{i}", {})
+
+        if isinstance(prev_step_result, str):
+            try:
+                prev_step_result = json.loads(prev_step_result)
+            except json.JSONDecodeError:
+                logger.error(f"Failed to parse string JSON from {step_key}")
+                prev_step_result = {}
+
+        replacements = {}
+        extracted_accounts = extract_values_from_result(prev_step_result, "accountId")
+        if extracted_accounts:
+            replacements["willbepopulated"] = extracted_accounts[0]
+        logger.info(f"🔄 Placeholder replacements for {step_key}: {replacements}")
+        step["inputs"] = replace_placeholders(step.get("inputs", {}), replacements)
+
+    logger.info(f"⚙️ Running {step_key}: {step['tool']} with inputs {step['inputs']}")
+    return step_key
+
+def _store_step_result(step_key: str, result: Any, all_results: Dict[str, Any]) -> None:
+    if isinstance(result, str):
+        try:
+            result = json.loads(result)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse result from execute_plan at {step_key}")
+            result = {}
 
-        # Populate memory for each step, if any values are already known
-        for step in plan_steps:
-            for key, val in memory.items():
-                step.setdefault("inputs", {}).setdefault(key, val)
+    logger.info(f"📦 Raw result of {step_key}: {result}")
+    logger.info(f"📦 Type of result: {type(result)}")
+
+    if isinstance(result, dict):
+        # execute_plan runs one step at a time, so its result is always keyed "step1"
+        all_results[step_key] = result.get(step_key, result.get("step1", result))
+    else:
+        logger.warning(f"Unexpected result format at {step_key}. Defaulting to empty.")
+        all_results[step_key] = {}
+
+def _enrich_steps(plan_steps: List[Dict[str, Any]], all_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Attach results to the steps
+    return [
+        {**step, "result": all_results.get(f"step{i+1}", {})}
+        for i, step in enumerate(plan_steps)
+    ]
+
+def _final_response(plan_steps, summary_obj, memory, session_id) -> Dict[str, Any]:
+    logger.info(f"✅ [MCP] Final Summary:\n{summary_obj.get('summary')}")
+
+    return {
+        "plan": plan_steps,
+        "next_action": "respond_with_result",
+        "final_summary": summary_obj.get("summary", "No summary available."),
+        "raw_result": summary_obj.get("raw_result", {}),
+        "raw_text": summary_obj.get("raw_text", {}),
+        "is_final": True,
+        "memory_passed": memory,
+        "session_id": session_id
+    }
+
+def _error_response(e: Exception, session_id: str) -> Dict[str, Any]:
+    logger.error(f"[MCP ERROR] Planner failure: {e}")
+    return {
+        "status": "error",
+        "message": f"Planner failure: {e}",
+        "session_id": session_id
+    }
+
+def shape_response(response: Dict[str, Any], mode: str = "full") -> Dict[str, Any]:
+    """
+    Trim a response to the requested response_mode:
+    summary → final summary and control fields only,
+    steps   → plus the plan and per-step summaries (raw_text),
+    full    → everything, including every upstream body in raw_result.
+    """
+    drop = RESPONSE_MODES[mode]
+    if not drop:
+        return response
+    return {k: v for k, v in response.items() if k not in drop}
+
+def process_user_request(input_contract: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+    """Main MCP session handler."""
+    session_context, goal, objective, expected_outcome, memory = _open_session(input_contract, session_id)
+
+    try:
+        with conversation(session_context.setdefault("planner_llm", {})):
+            plan_steps, missing = plan(goal, objective, expected_outcome, memory)
+        _apply_memory(plan_steps, memory)
 
         # If required params are missing, ask user for more info
         if missing:
-            response = {
-                "plan": [],
-                "next_action": "ask_user",
-                "prompt": f"Please provide {missing[0]}",
-                "missing": missing,
-                "fallback_response": "Could you help me with the required detail?",
-                "is_final": False,
-                "memory_passed": memory,
-                "session_id": session_id
-            }
-            session_context["last_response"] = response
-            SESSION_STORE[session_id] = session_context
+            response = _ask_user_response(missing, memory, session_id)
+            _save_session(session_id, session_context, response)
             return response
 
         all_results = {}
         for i, step in enumerate(plan_steps):
-            step_key = f"step{i+1}"
-
-            if i > 0:
-                prev_step_result = all_results.get(f"step{i}", {})
-
-                if isinstance(prev_step_result, str):
-                    try:
-                        prev_step_result = json.loads(prev_step_result)
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse string JSON from {step_key}")
-                        prev_step_result = {}
-
-                replacements = {}
-                extracted_accounts = extract_values_from_result(prev_step_result, "accountId")
-                if extracted_accounts:
-                    replacements["willbepopulated"] = extracted_accounts[0]
-                logger.info(f"🔄 Placeholder replacements for {step_key}: {replacements}")
-                step["inputs"] = replace_placeholders(step.get("inputs", {}), replacements)
-
-            logger.info(f"⚙️ Running {step_key}: {step['tool']} with inputs {step['inputs']}")
+            step_key = _prepare_step(i, step, all_results)
             result = execute_plan([step])
-
-            if isinstance(result, str):
-                try:
-                    result = json.loads(result)
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse result from execute_plan at {step_key}")
-                    result = {}
-
-            logger.info(f"📦 Raw result of {step_key}: {result}")
-            logger.info(f"📦 Type of result: {type(result)}")
-
-            if isinstance(result, dict):
-                all_results[step_key] = result.get(step_key, result)
-            else:
-                logger.warning(f"Unexpected result format at {step_key}. Defaulting to empty.")
-                all_results[step_key] = {}
-
-        # Attach results to the steps
-        enriched_steps = [
-            {**step, "result": all_results.get(f"step{i+1}", {})}
-            for i, step in enumerate(plan_steps)
-        ]
+            _store_step_result(step_key, result, all_results)
 
         # ✅ Pass TOOL_CONTRACTS here!
         summary_obj = aggregate(
-            tool_outputs=enriched_steps,
+            tool_outputs=_enrich_steps(plan_steps, all_results),
             expected_outcome=expected_outcome,
             llm_call=call_gemma3,
-            TOOL_CONTRACTS=TOOL_CONTRACTS
+            TOOL_CONTRACTS=TOOL_CONTRACTS,
+            summary_mode=input_contract.get("summary_mode") or SUMMARY_MODE,
+            parallelism=SUMMARY_PARALLELISM
         )
+        response = _final_response(plan_steps, summary_obj, memory, session_id)
+
+    except Exception as e:
+        return _error_response(e, session_id)
+
+    _save_session(session_id, session_context, response)
+
+    return response
+
+async def _emit(on_event, stage: str, data: Dict[str, Any]) -> None:
+    if on_event:
+        await on_event(stage, data)
+
+async def process_user_request_async(
+    input_contract: Dict[str, Any],
+    session_id: str,
+    on_event: Callable[[str, Dict[str, Any]], Awaitable[None]] = None
+) -> Dict[str, Any]:
+    """
+    Async MCP session handler used by the transports in main.py.
+    Same flow as process_user_request, but every LLM and upstream call is awaited,
+    so a long plan never blocks the event loop for other sessions.
+
+    on_event, if given, is awaited with progress stages as they happen:
+    plan, step_started, step_finished, step_summary, partial_summary
+    (final-summary tokens as they are generated) and summary.
 
-        logger.info(f"✅ [MCP] Final Summary:\n{summary_obj.get('summary')}")
+    Cancelling the calling task (client disconnected) propagates into the
+    planner, upstream and summary calls and skips everything after them;
+    the session is left as it was before this turn's result.
+    """
+    session_context, goal, objective, expected_outcome, memory = _open_session(input_contract, session_id)
 
-        response = {
-            "plan": plan_steps,
-            "next_action": "respond_with_result",
-            "final_summary": summary_obj.get("summary", "No summary available."),
-            "raw_result": summary_obj.get("raw_result", {}),
-            "raw_text": summary_obj.get("raw_text", {}),
-            "is_final": True,
-            "memory_passed": memory,
-            "session_id": session_id
-        }
+    try:
+        with conversation(session_context.setdefault("planner_llm", {})):
+            plan_steps, missing = await plan_async(goal, objective, expected_outcome, memory)
+        _apply_memory(plan_steps, memory)
+        await _emit(on_event, "plan", {"session_id": session_id, "plan": plan_steps, "missing": missing})
+
+        if missing:
+            response = _ask_user_response(missing, memory, session_id)
+            _save_session(session_id, session_context, response)
+            return response
+
+        all_results = {}
+        for i, step in enumerate(plan_steps):
+            step_key = _prepare_step(i, step, all_results)
+            await _emit(on_event, "step_started", {"step": step_key, "tool": step["tool"], "inputs": step["inputs"]})
+            result = await execute_plan_async([step])
+            _store_step_result(step_key, result, all_results)
+            await _emit(on_event, "step_finished", {"step": step_key, "tool": step["tool"], "result": all_results[step_key]})
+
+        summary_obj = await aggregate_async(
+            tool_outputs=_enrich_steps(plan_steps, all_results),
+            expected_outcome=expected_outcome,
+            llm_call=call_gemma3_async,
+            TOOL_CONTRACTS=TOOL_CONTRACTS,
+            on_event=on_event,
+            llm_stream=stream_gemma3_async,
+            summary_mode=input_contract.get("summary_mode") or SUMMARY_MODE,
+            parallelism=SUMMARY_PARALLELISM
+        )
+        response = _final_response(plan_steps, summary_obj, memory, session_id)
+
+    except asyncio.CancelledError:
+        logger.info(f"🛑 [MCP] Request cancelled for session {session_id}")
+        raise
 
     except Exception as e:
-        logger.error(f"[MCP ERROR] Planner failure: {e}")
-        return {
-            "status": "error",
-            "message": f"Planner failure: {e}",
-            "session_id": session_id
-        }
-
-    session_context["last_response"] = response
-    SESSION_STORE[session_id] = session_context
+        return _error_response(e, session_id)
+
+    _save_session(session_id, session_context, response)
 
     return response
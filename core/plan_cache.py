@@ -0,0 +1,175 @@
+# core/plan_cache.py
+
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+# Numbers, account/arrangement IDs, dates: any word containing a digit.
+# Slots end on a word character so trailing punctuation stays in the template.
+SLOT_PATTERN = re.compile(r"[A-Za-z]*\d(?:[\w\-./]*\w)?")
+
+
+def normalize_intent(goal: str, objective: str, expected_outcome: str) -> Tuple[str, List[str]]:
+    """
+    Template of a request with every ID/number replaced by <1>, <2>, ... in
+    order of appearance, plus the values that were slotted out.
+    "balances for accounts 105996, 106194" → ("balances for accounts <1>, <2>", ["105996", "106194"])
+    Only the template is lowercased; slot values keep their case, since they
+    are sent to the API as-is.
+    """
+    slots: List[str] = []
+
+    def slot(match):
+        slots.append(match.group(0))
+        return f"<{len(slots)}>"
+
+    parts = []
+    for text in (goal, objective, expected_outcome):
+        collapsed = " ".join((text or "").split())
+        parts.append(SLOT_PATTERN.sub(slot, collapsed).lower())
+    return " | ".join(parts), slots
+
+
+def _has_digit(value: str) -> bool:
+    return any(ch.isdigit() for ch in value)
+
+
+def templatize(value: Any, slots: List[str], params: Dict[str, Any]):
+    """
+    Replace concrete values in plan inputs with references to request slots
+    or known parameters. Returns (template, ok); ok is False when a value
+    with digits can't be traced back, since it may not hold for other requests.
+    A slotted int/float keeps its type as "$type", so it replays as a number.
+    """
+    if isinstance(value, dict):
+        out, ok = {}, True
+        for k, v in value.items():
+            out[k], item_ok = templatize(v, slots, params)
+            ok = ok and item_ok
+        return out, ok
+    if isinstance(value, list):
+        items = [templatize(v, slots, params) for v in value]
+        return [t for t, _ in items], all(ok for _, ok in items)
+    text = str(value)
+    for name, param in params.items():
+        if value == param:
+            return {"$param": name}, True
+    for i, slotted in enumerate(slots):
+        if text.lower() == slotted.lower():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return {"$slot": i, "$type": type(value).__name__}, True
+            return {"$slot": i}, True
+    return value, not (isinstance(value, (str, int, float)) and _has_digit(text))
+
+
+_SLOT_TYPES = {"int": int, "float": float}
+
+
+def instantiate(template: Any, slots: List[str], params: Dict[str, Any]):
+    """Inverse of templatize; raises ValueError if a slot can't be cast back to its type."""
+    if isinstance(template, dict):
+        if set(template) == {"$slot"}:
+            return slots[template["$slot"]]
+        if set(template) == {"$slot", "$type"}:
+            return _SLOT_TYPES[template["$type"]](slots[template["$slot"]])
+        if set(template) == {"$param"}:
+            return params[template["$param"]]
+        return {k: instantiate(v, slots, params) for k, v in template.items()}
+    if isinstance(template, list):
+        return [instantiate(v, slots, params) for v in template]
+    return template
+
+
+class PlanCache:
+    """
+    Plans keyed by normalized intent: requests that differ only in IDs and
+    numbers reuse one planner result, re-instantiated with their own values.
+
+    Keys include a fingerprint of the watched contract/registry files, and
+    the cache is cleared as soon as any of them changes.
+    """
+
+    def __init__(self, directory: str, ttl: float, watch_paths: List[Path]):
+        self._cache = diskcache.Cache(directory)
+        self.ttl = ttl
+        self.watch_paths = [Path(p) for p in watch_paths]
+        self._fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def fingerprint(self) -> str:
+        stats = []
+        for path in self.watch_paths:
+            files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+            for f in files:
+                try:
+                    st = f.stat()
+                except FileNotFoundError:
+                    continue
+                stats.append((str(f), st.st_mtime_ns, st.st_size))
+        return hashlib.sha256(json.dumps(stats).encode()).hexdigest()[:16]
+
+    def _current_fingerprint(self) -> str:
+        fingerprint = self.fingerprint()
+        if self._fingerprint is not None and fingerprint != self._fingerprint:
+            logger.info("🧹 Tool contracts/registry changed; clearing plan cache")
+            self._cache.clear()
+            self.invalidations += 1
+        self._fingerprint = fingerprint
+        return fingerprint
+
+    def _key(self, template: str, params: Dict[str, Any]) -> str:
+        raw = json.dumps([self._current_fingerprint(), template, sorted(params)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, goal: str, objective: str, expected_outcome: str, params: Dict[str, Any]) -> Optional[List[dict]]:
+        template, slots = normalize_intent(goal, objective, expected_outcome)
+        entry = self._cache.get(self._key(template, params))
+        plan_steps = None
+        if entry is not None and entry["slots"] == len(slots):
+            try:
+                plan_steps = instantiate(entry["plan"], slots, params)
+            except ValueError:
+                logger.debug(f"Cached plan for '{template}' doesn't fit this request's values")
+        if plan_steps is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"📋 Plan cache hit for intent: {template}")
+        return plan_steps
+
+    def put(self, goal: str, objective: str, expected_outcome: str, params: Dict[str, Any], plan_steps: List[dict]) -> bool:
+        """Store a final plan; returns False when it can't be generalized safely."""
+        if not plan_steps:
+            return False
+        template, slots = normalize_intent(goal, objective, expected_outcome)
+        plan_template, ok = templatize(plan_steps, slots, params)
+        if not ok:
+            logger.debug(f"Plan for '{template}' has untraceable values; not cached")
+            return False
+        self._cache.set(self._key(template, params), {"slots": len(slots), "plan": plan_template}, expire=self.ttl)
+        self.stores += 1
+        return True
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+        }
@@ -5,7 +5,18 @@ from pathlib import Path
 from uuid import uuid4
 
 from core.utils import load_tool_contracts_from_folder
-from core.llm import call_gemma3
+from core.llm import CONVERSATION, call_gemma3, call_gemma3_async, conversation, discard_cached, output_format
+from core.llm_cache import call_site
+from core.tool_index import ToolIndex
+from core.tokens import count_tokens
+from core.json_repair import loads_lenient
+from core.plan_cache import PlanCache
+from core.fast_planner import FastPlanner
+from config.config import (
+    PLANNER_TOP_K, PROMPT_TOKEN_ENCODING, PLANNER_MAX_RETRIES,
+    PLAN_CACHE_ENABLED, PLAN_CACHE_DIR, PLAN_CACHE_TTL,
+    FAST_PLANNER_ENABLED, FAST_PLANNER_THRESHOLD,
+)
 from core.executioner import resolve_tool_name
 
 logger = logging.getLogger(__name__)
@@ -13,10 +24,54 @@ logger = logging.getLogger(__name__)
 TOOL_REGISTRY_PATH = Path("schema/tool_registry_llm.json")
 with open(TOOL_REGISTRY_PATH, "r") as f:
     tool_registry_llm = json.load(f)
+tool_index = ToolIndex(tool_registry_llm)
+
+# JSON schema the planner output is constrained to (Ollama "format")
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "goal": {"type": "string"},
+        "fallback_response": {"type": "string"},
+        "tool_chain": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "tool": {"type": "string", "enum": [tool["name"] for tool in tool_registry_llm]},
+                    "inputs": {"type": "object"},
+                },
+                "required": ["tool", "inputs"],
+            },
+        },
+    },
+    "required": ["goal", "fallback_response", "tool_chain"],
+}
+
+# Sent instead of the full planner prompt when retrying an unparseable output
+# whose context the backend returned: the model sees its own answer, so a short
+# continuation is enough and the tool catalogue is not paid for twice.
+PLAN_RETRY_PROMPT = (
+    "Your last output was not valid JSON. Return only the plan JSON object "
+    "(goal, fallback_response, tool_chain) with no other text."
+)
+
+# Size of the planner prompts sent so far (see /metrics)
+PROMPT_STATS = {"prompts": 0, "tokens": 0, "max_tokens": 0, "tools": 0, "parse_retries": 0, "parse_failures": 0, "fast_path": 0}
 
 TOOL_CONTRACT_DIR = Path("schema/tool_contract")
 tool_contracts = load_tool_contracts_from_folder(TOOL_CONTRACT_DIR)
 
+PLAN_CACHE = PlanCache(
+    PLAN_CACHE_DIR, PLAN_CACHE_TTL, watch_paths=[TOOL_CONTRACT_DIR, TOOL_REGISTRY_PATH]
+) if PLAN_CACHE_ENABLED else None
+
+
+def build_fast_planner() -> FastPlanner:
+    return FastPlanner(tool_registry_llm, tool_contracts, FAST_PLANNER_THRESHOLD)
+
+
+FAST_PLANNER = build_fast_planner() if FAST_PLANNER_ENABLED else None
+
 PLACEHOLDER_PATTERN = re.compile(r"^<([^>]+)>$")
 
 
@@ -84,31 +139,52 @@ def extract_missing_from_plan(plan_steps, tool_contracts):
     return sorted(set(missing))
 
 
-def generate_reasoned_plan(
-    goal: str,
-    objective: str,
-    expected_outcome: str,
-    memory: dict,
-    user_inputs: dict = None
-) -> dict:
-    if user_inputs is None:
-        user_inputs = {}
+def shortlist_tools(goal: str, objective: str, expected_outcome: str) -> list:
+    """Registry entries worth showing the planner for this request (at most PLANNER_TOP_K)."""
+    return tool_index.search(f"{goal} {objective} {expected_outcome}", PLANNER_TOP_K)
 
-    prompt = f"""
-You are an intelligent planning agent for a banking assistant.
 
-**Your task:** From the tools listed below, select the tool (or sequence) whose *description* and *parameters* best fulfill the user's goal and expected outcome. Use the 'name' exactly as shown.
+def render_tools(tools: list) -> str:
+    """One compact JSON object per line; indentation only costs prompt tokens."""
+    return "\n".join(json.dumps(tool, separators=(",", ":"), ensure_ascii=False) for tool in tools)
 
-**Tools:**
-{json.dumps(tool_registry_llm, indent=2)}
 
-**User Request Context**
-Goal: {goal}
-Objective: {objective}
-Expected Outcome: {expected_outcome}
+def record_prompt(prompt: str, tool_count: int) -> None:
+    tokens = count_tokens(prompt, PROMPT_TOKEN_ENCODING)
+    PROMPT_STATS["prompts"] += 1
+    PROMPT_STATS["tokens"] += tokens
+    PROMPT_STATS["max_tokens"] = max(PROMPT_STATS["max_tokens"], tokens)
+    PROMPT_STATS["tools"] += tool_count
+    logger.info(f"[Planner] prompt: {tokens} tokens, {tool_count} tools")
 
-**Previously collected parameter values:**  
-{json.dumps(memory, indent=2)}
+
+def prompt_stats() -> dict:
+    n = PROMPT_STATS["prompts"]
+    return {
+        "prompts": n,
+        "avg_tokens": round(PROMPT_STATS["tokens"] / n, 1) if n else 0.0,
+        "max_tokens": PROMPT_STATS["max_tokens"],
+        "avg_tools": round(PROMPT_STATS["tools"] / n, 1) if n else 0.0,
+        "registry_tools": len(tool_registry_llm),
+        "parse_retries": PROMPT_STATS["parse_retries"],
+        "parse_failures": PROMPT_STATS["parse_failures"],
+        "fast_path_plans": PROMPT_STATS["fast_path"],
+    }
+
+
+def build_planner_prompt(goal: str, objective: str, expected_outcome: str, memory: dict) -> str:
+    tools = shortlist_tools(goal, objective, expected_outcome)
+    prompt = _planner_prompt(render_tools(tools), goal, objective, expected_outcome, memory)
+    record_prompt(prompt, len(tools))
+    return prompt
+
+
+# Everything that does not depend on the request comes first and stays
+# byte-identical between calls, so Ollama can reuse the KV cache for it.
+PLANNER_INSTRUCTIONS = """
+You are an intelligent planning agent for a banking assistant.
+
+**Your task:** From the tools listed below, select the tool (or sequence) whose *description* and *parameters* best fulfill the user's goal and expected outcome. Use the 'name' exactly as shown.
 
 **Instructions:**
 - Review all tools. Do NOT assume or hallucinate tool names.
@@ -117,30 +193,78 @@ Expected Outcome: {expected_outcome}
 - If NO tool fits the user's goal, reply with an appropriate 'fallback_response' explaining why.
 - **Output ONLY valid JSON, matching this exact structure:**
 
-{{
+{
   "goal": "<Restate user's goal in your own words>",
   "fallback_response": "<Fallback message if no suitable tool exists, otherwise leave blank>",
   "tool_chain": [
-    {{
+    {
       "tool": "<EXACT tool name from the list>",
-      "inputs": {{ "param1": "...", ... }}
-    }}
+      "inputs": { "param1": "...", ... }
+    }
   ]
-}}
+}
 
 Return ONLY the JSON response. Do not add any explanation or non-JSON text.
 """
-    logger.debug("[LLM PLANNER PROMPT] >>>\n%s", prompt)
-    raw = call_gemma3(prompt)
+
+
+def _planner_prompt(tools_text: str, goal: str, objective: str, expected_outcome: str, memory: dict) -> str:
+    return f"""{PLANNER_INSTRUCTIONS}
+**Tools:**
+{tools_text}
+
+**User Request Context**
+Goal: {goal}
+Objective: {objective}
+Expected Outcome: {expected_outcome}
+
+**Previously collected parameter values:**
+{json.dumps(memory, indent=2)}
+"""
+
+
+def build_followup_prompt(memory: dict) -> str:
+    """
+    Prompt for a parameter-completion turn that continues the previous
+    planner generation (its Ollama context), so only the new values are prefilled.
+    """
+    prompt = f"""
+The user has now supplied more parameter values. Collected parameter values:
+{json.dumps(memory, indent=2)}
+
+Update your plan with these values and return ONLY the JSON response with "goal", "fallback_response" and "tool_chain", exactly as before.
+"""
+    record_prompt(prompt, 0)
+    return prompt
+
+
+def planner_prompt_for(goal: str, objective: str, expected_outcome: str, memory: dict) -> str:
+    """Follow-up prompt when this session's planner context can be continued, the full prompt otherwise."""
+    state = CONVERSATION.get()
+    if state and state.get("context"):
+        return build_followup_prompt(memory)
+    return build_planner_prompt(goal, objective, expected_outcome, memory)
+
+
+def parse_planner_response(raw: str, memory: dict, user_inputs: dict) -> dict:
     print("\n--- LLM RESPONSE ---\n", raw, "\n--- END RESPONSE ---\n")
-    cleaned = raw.strip().removeprefix("```json").removesuffix("```").strip()
-    if not cleaned or not cleaned.startswith("{"):
-        raise ValueError(f"LLM did not return JSON! Output was: {repr(raw)}")
-    parsed = json.loads(cleaned)
+    parsed = loads_lenient(raw)
+    if not isinstance(parsed, dict):
+        raise ValueError(f"LLM did not return a JSON object! Output was: {repr(raw)}")
 
     # Normalize the plan and resolve placeholders if needed
+    chain = parsed.get("tool_chain") or []
+    if not isinstance(chain, list):
+        raise ValueError(f"tool_chain is not a list! Output was: {repr(raw)}")
+
     plan_steps = []
-    for step in parsed.get("tool_chain", []):
+    for step in chain:
+        # A bare string or a step without a tool name is a malformed plan, so
+        # raise ValueError to let the caller retry and drop the cached answer.
+        if (not isinstance(step, dict)
+                or not isinstance(step.get("tool"), str) or not step["tool"]
+                or not isinstance(step.get("inputs") or {}, dict)):
+            raise ValueError(f"tool_chain element is not a {{tool, inputs}} object: {step!r}")
         raw_tool = step.get("tool")
         normalized = resolve_tool_name(raw_tool) or raw_tool
         if normalized == raw_tool:
@@ -189,14 +313,86 @@ Return ONLY the JSON response. Do not add any explanation or non-JSON text.
     }
 
 
-def plan(
+def _discard_attempt(sent: str, prompt: str, state: dict, prior_context, context_before,
+                     attempt: int, error: ValueError) -> str:
+    """
+    Forget an unparseable planner output (its cache entry) and pick the prompt
+    for the next attempt: PLAN_RETRY_PROMPT continuing the failed output's
+    context when the backend returned one, else the full prompt again.
+    Once the retry budget is spent, restore the context the request started
+    with and re-raise.
+    """
+    discard_cached(sent)
+    if attempt >= PLANNER_MAX_RETRIES:
+        state["context"] = prior_context
+        PROMPT_STATS["parse_failures"] += 1
+        raise error
+    PROMPT_STATS["parse_retries"] += 1
+    logger.warning(f"[Planner] Unparseable plan (attempt {attempt + 1}): {error}; retrying")
+    context = state.get("context")
+    if context and context is not context_before:
+        return PLAN_RETRY_PROMPT
+    state["context"] = prior_context
+    return prompt
+
+
+def generate_reasoned_plan(
     goal: str,
     objective: str,
     expected_outcome: str,
     memory: dict,
     user_inputs: dict = None
-):
-    result = generate_reasoned_plan(goal, objective, expected_outcome, memory, user_inputs)
+) -> dict:
+    if user_inputs is None:
+        user_inputs = {}
+
+    prompt = planner_prompt_for(goal, objective, expected_outcome, memory)
+    logger.debug("[LLM PLANNER PROMPT] >>>\n%s", prompt)
+    # Without a session, a private state still lets a retry continue the failed output
+    state = CONVERSATION.get()
+    if state is None:
+        state = {}
+    prior_context = state.get("context")
+    sent = prompt
+    for attempt in range(PLANNER_MAX_RETRIES + 1):
+        context_before = state.get("context")
+        with conversation(state), call_site("planner"), output_format(PLAN_SCHEMA):
+            raw = call_gemma3(sent)
+            try:
+                return parse_planner_response(raw, memory, user_inputs)
+            except ValueError as e:
+                sent = _discard_attempt(sent, prompt, state, prior_context, context_before, attempt, e)
+
+
+async def generate_reasoned_plan_async(
+    goal: str,
+    objective: str,
+    expected_outcome: str,
+    memory: dict,
+    user_inputs: dict = None
+) -> dict:
+    if user_inputs is None:
+        user_inputs = {}
+
+    prompt = planner_prompt_for(goal, objective, expected_outcome, memory)
+    logger.debug("[LLM PLANNER PROMPT] >>>\n%s", prompt)
+    # Without a session, a private state still lets a retry continue the failed output
+    state = CONVERSATION.get()
+    if state is None:
+        state = {}
+    prior_context = state.get("context")
+    sent = prompt
+    for attempt in range(PLANNER_MAX_RETRIES + 1):
+        context_before = state.get("context")
+        with conversation(state), call_site("planner"), output_format(PLAN_SCHEMA):
+            raw = await call_gemma3_async(sent)
+            try:
+                return parse_planner_response(raw, memory, user_inputs)
+            except ValueError as e:
+                sent = _discard_attempt(sent, prompt, state, prior_context, context_before, attempt, e)
+
+
+def flatten_plan(result: dict):
     # Flatten api_inputs + local_filters into a single 'inputs' dict if present
     final_plan = []
     for step in result["plan"]:
@@ -206,3 +402,54 @@ def plan(
             "inputs": merged
         })
     return final_plan, result["missing"]
+
+
+def _cached_plan(goal, objective, expected_outcome, params):
+    """Plan without the LLM: keyword fast path first, then the intent cache."""
+    if FAST_PLANNER is not None:
+        fast = FAST_PLANNER.plan(goal, objective, expected_outcome, params)
+        if fast is not None:
+            PROMPT_STATS["fast_path"] += 1
+            return fast.plan, fast.missing
+    if PLAN_CACHE is None:
+        return None
+    cached = PLAN_CACHE.get(goal, objective, expected_outcome, params)
+    return (cached, []) if cached is not None else None
+
+
+def _store_plan(goal, objective, expected_outcome, params, flattened):
+    """Remember complete plans (nothing missing) for requests with the same intent."""
+    final_plan, missing = flattened
+    if PLAN_CACHE is not None and not missing:
+        PLAN_CACHE.put(goal, objective, expected_outcome, params, final_plan)
+    return final_plan, missing
+
+
+def plan(
+    goal: str,
+    objective: str,
+    expected_outcome: str,
+    memory: dict,
+    user_inputs: dict = None
+):
+    params = {**(user_inputs or {}), **memory}
+    cached = _cached_plan(goal, objective, expected_outcome, params)
+    if cached is not None:
+        return cached
+    result = generate_reasoned_plan(goal, objective, expected_outcome, memory, user_inputs)
+    return _store_plan(goal, objective, expected_outcome, params, flatten_plan(result))
+
+
+async def plan_async(
+    goal: str,
+    objective: str,
+    expected_outcome: str,
+    memory: dict,
+    user_inputs: dict = None
+):
+    params = {**(user_inputs or {}), **memory}
+    cached = _cached_plan(goal, objective, expected_outcome, params)
+    if cached is not None:
+        return cached
+    result = await generate_reasoned_plan_async(goal, objective, expected_outcome, memory, user_inputs)
+    return _store_plan(goal, objective, expected_outcome, params, flatten_plan(result))
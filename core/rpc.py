@@ -0,0 +1,217 @@
+# core/rpc.py
+
+import asyncio
+import functools
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config.config import (
+    MCP_MAX_CONCURRENCY, MCP_MAX_QUEUE, MCP_QUEUE_TIMEOUT,
+    MCP_BATCH_PARALLELISM, MCP_MAX_BATCH_SIZE, MCP_DEFAULT_RESPONSE_MODE,
+)
+from core.admission import AdmissionController, OverloadedError
+from core.catalog import TOOL_CATALOG
+from core.aggregator import SUMMARY_MODES
+from core.mcp import RESPONSE_MODES, process_user_request_async, shape_response
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC 2.0 error codes (-32000..-32099 are implementation-defined server errors)
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32000
+SERVER_OVERLOADED = -32001
+
+# Admission control shared by every transport
+admission = AdmissionController(MCP_MAX_CONCURRENCY, MCP_MAX_QUEUE, MCP_QUEUE_TIMEOUT)
+
+
+class RpcError(Exception):
+    """Raised by a method handler to return a JSON-RPC error instead of a result."""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+
+def result_response(rpc_id, result) -> dict:
+    return {"jsonrpc": "2.0", "result": result, "id": rpc_id}
+
+
+def error_response(rpc_id, code: int, message: str, data: Any = None) -> dict:
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "error": error, "id": rpc_id}
+
+
+def invalid_request(rpc_id, message: str = "Invalid Request") -> dict:
+    return error_response(rpc_id, INVALID_REQUEST, message)
+
+
+def parse_payload(body):
+    """
+    Decode a JSON-RPC request body (bytes or text).
+
+    Returns:
+        tuple: (payload, None), or (None, a -32700 Parse error response) if the
+        body is not valid JSON, e.g. a truncated batch array.
+    """
+    try:
+        return json.loads(body), None
+    except ValueError:
+        return None, error_response(None, PARSE_ERROR, "Parse error")
+
+
+def overloaded_error(rpc_id, ex: OverloadedError) -> dict:
+    """JSON-RPC error returned when admission control rejects a call."""
+    return error_response(rpc_id, SERVER_OVERLOADED, str(ex), {"retry_after": ex.retry_after})
+
+
+# --- Method handlers: (params, on_event) -> result ---
+
+async def initialize(params: Dict[str, Any], on_event=None) -> Dict[str, Any]:
+    return TOOL_CATALOG.initialize_result()
+
+
+async def tools_list(params: Dict[str, Any], on_event=None):
+    return TOOL_CATALOG.tools
+
+
+async def tools_call(params: Dict[str, Any], on_event=None) -> Dict[str, Any]:
+    """
+    Run the MCP pipeline behind admission control.
+    Raises OverloadedError if no worker slot is available; each transport maps it.
+
+    params.response_mode ("summary" | "steps" | "full") controls how much of the
+    result is returned; raw upstream bodies are only sent in "full" mode.
+    params.summary_mode ("per_step" | "batched" | "deterministic") overrides
+    SUMMARY_MODE for this call; "deterministic" makes no LLM call after planning.
+    """
+    required = ["goal", "objective", "expected_outcome"]
+    if not all(k in params for k in required):
+        raise RpcError(INVALID_PARAMS, "Invalid params: goal, objective, expected_outcome are required.")
+
+    mode = params.get("response_mode") or MCP_DEFAULT_RESPONSE_MODE
+    if mode not in RESPONSE_MODES:
+        raise RpcError(INVALID_PARAMS, f"Invalid params: response_mode must be one of {', '.join(RESPONSE_MODES)}.")
+    if params.get("summary_mode") and params["summary_mode"] not in SUMMARY_MODES:
+        raise RpcError(INVALID_PARAMS, f"Invalid params: summary_mode must be one of {', '.join(SUMMARY_MODES)}.")
+
+    # Progress events follow the same shaping: no raw step bodies
+    async def shaped_progress(stage, data):
+        await on_event(stage, {k: v for k, v in data.items() if k != "result"})
+
+    progress = shaped_progress if on_event and mode != "full" else on_event
+
+    session_id = params.get("session_id", str(uuid.uuid4()))
+    async with admission.admit():
+        result = await process_user_request_async(params, session_id, on_event=progress)
+    return {
+        "session_id": session_id,
+        **shape_response(result, mode)
+    }
+
+
+METHODS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "initialize": initialize,
+    "tools/list": tools_list,
+    "tools/call": tools_call,
+    "process": tools_call,
+    "call": tools_call,
+}
+
+
+async def dispatch_rpc(payload: dict, on_event: Optional[Callable] = None) -> dict:
+    """
+    Execute a single JSON-RPC 2.0 request through the METHODS table.
+
+    Args:
+        payload (dict): One JSON-RPC request object.
+        on_event (callable, optional): Awaited as on_event(rpc_id, stage, data)
+            for each progress stage of a tools/call.
+
+    Returns:
+        dict: JSON-RPC response object with result or error.
+    """
+    if not isinstance(payload, dict):
+        return invalid_request(None)
+
+    method = payload.get("method")
+    params = payload.get("params", {})
+    rpc_id = payload.get("id")
+
+    handler = METHODS.get(method)
+    if handler is None:
+        return error_response(rpc_id, METHOD_NOT_FOUND, "Method not found")
+
+    progress = functools.partial(on_event, rpc_id) if on_event else None
+    try:
+        return result_response(rpc_id, await handler(params, on_event=progress))
+
+    except RpcError as ex:
+        return error_response(rpc_id, ex.code, str(ex), ex.data)
+
+    except OverloadedError as ex:
+        return overloaded_error(rpc_id, ex)
+
+    except Exception as ex:
+        logger.exception("Exception in JSON-RPC handler")
+        return error_response(rpc_id, INTERNAL_ERROR, f"Internal server error: {str(ex)}")
+
+
+def validate_batch(payload: list) -> Optional[dict]:
+    """
+    Check a JSON-RPC batch array before running it.
+
+    Returns:
+        dict or None: A single error response if the batch is rejected as a whole.
+    """
+    if not payload:
+        return invalid_request(None)
+    if len(payload) > MCP_MAX_BATCH_SIZE:
+        return invalid_request(None, f"Invalid Request: batch exceeds {MCP_MAX_BATCH_SIZE} calls")
+    return None
+
+
+def is_notification(payload) -> bool:
+    """A request (or batch member) without an "id" member is a notification and gets no response."""
+    return isinstance(payload, dict) and "id" not in payload
+
+
+def batch_calls(payload: list, on_event: Optional[Callable] = None) -> list:
+    """
+    Wrap each batch member in a coroutine that respects MCP_BATCH_PARALLELISM.
+    Notifications still run, but their coroutine resolves to None.
+
+    Returns:
+        list: One coroutine per member, in request order.
+    """
+    limiter = asyncio.Semaphore(MCP_BATCH_PARALLELISM)
+
+    async def run(member):
+        async with limiter:
+            response = await dispatch_rpc(member, on_event)
+        return None if is_notification(member) else response
+
+    return [run(member) for member in payload]
+
+
+async def dispatch_batch(payload: list, on_event: Optional[Callable] = None) -> list:
+    """
+    Run all members of a JSON-RPC batch concurrently (capped by MCP_BATCH_PARALLELISM).
+
+    Returns:
+        list: Responses in request order, notifications omitted.
+    """
+    responses = await asyncio.gather(*batch_calls(payload, on_event))
+    return [resp for resp in responses if resp is not None]
+
+
+def is_overloaded(response: dict) -> bool:
+    return response.get("error", {}).get("code") == SERVER_OVERLOADED
@@ -0,0 +1,41 @@
+# core/serialization.py
+
+import json
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes.
+    Uses orjson when installed (several times faster on large raw_result payloads)
+    and falls back to stdlib json for anything orjson rejects (e.g. >64-bit ints).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """Same as dumps() but returns text, for SSE frames and WebSocket text messages."""
+    return dumps(obj).decode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSONResponse replacement that renders with dumps() and skips jsonable_encoder."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
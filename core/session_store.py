@@ -0,0 +1,174 @@
+# core/session_store.py
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend:
+    """
+    Storage for MCP session contexts (memory, original goal, last response).
+
+    Contexts are plain JSON-serializable dicts. Implementations other than
+    InMemorySessionBackend are shared between processes, so a follow-up turn
+    can land on any uvicorn worker (or node) without sticky routing.
+    """
+
+    # Expired entries are swept on write, at most once per this many seconds
+    sweep_interval = 60.0
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self._next_sweep = 0.0
+
+    def _sweep_due(self, now: float) -> bool:
+        if now < self._next_sweep:
+            return False
+        self._next_sweep = now + self.sweep_interval
+        return True
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, session_id: str, context: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Per-process dict; the historical behaviour. Only correct with a single worker."""
+
+    def __init__(self, ttl: float = 3600):
+        super().__init__(ttl)
+        self._store: Dict[str, tuple] = {}
+
+    def get(self, session_id):
+        entry = self._store.get(session_id)
+        if entry is None:
+            return None
+        expires, context = entry
+        if expires < time.time():
+            self._store.pop(session_id, None)
+            return None
+        return context
+
+    def set(self, session_id, context):
+        now = time.time()
+        if self._sweep_due(now):
+            # Sessions that are never resumed would otherwise stay forever
+            for key in [k for k, (expires, _) in self._store.items() if expires < now]:
+                self._store.pop(key, None)
+        self._store[session_id] = (now + self.ttl, context)
+
+    def delete(self, session_id):
+        self._store.pop(session_id, None)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    SQLite file in WAL mode: many readers and one writer across processes,
+    without a separate server. One connection per thread.
+    """
+
+    synchronous = "NORMAL"
+
+    def __init__(self, path: str, ttl: float = 3600):
+        super().__init__(ttl)
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " context BLOB NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+        self._connect().execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._connect().execute(
+            "SELECT context FROM sessions WHERE session_id = ? AND expires >= ?",
+            (session_id, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id, context):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, context, expires) VALUES (?, ?, ?)",
+            (session_id, dumps(context), now + self.ttl),
+        )
+        if self._sweep_due(now):
+            conn.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+
+    def delete(self, session_id):
+        self._connect().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+class SharedMemorySessionBackend(SQLiteSessionBackend):
+    """
+    SQLiteSessionBackend placed on tmpfs (/dev/shm): workers on the same host
+    share sessions through RAM with no disk I/O. Sessions do not survive a
+    reboot, so fsync is skipped entirely.
+    """
+
+    synchronous = "OFF"
+
+    def __init__(self, path: str = "/dev/shm/mcp_sessions.db", ttl: float = 3600):
+        super().__init__(path, ttl)
+
+
+class DiskCacheSessionBackend(SessionBackend):
+    """diskcache.Cache directory (SQLite-backed, process-safe) with native expiry."""
+
+    def __init__(self, directory: str, ttl: float = 3600):
+        super().__init__(ttl)
+        import diskcache
+        self._cache = diskcache.Cache(directory)
+
+    def get(self, session_id):
+        return self._cache.get(session_id)
+
+    def set(self, session_id, context):
+        self._cache.set(session_id, context, expire=self.ttl)
+
+    def delete(self, session_id):
+        self._cache.delete(session_id)
+
+
+def create_session_backend(kind: str, path: str = None, ttl: float = 3600) -> SessionBackend:
+    """
+    Build a backend by name: memory | sqlite | diskcache | shm.
+    path is the SQLite file (sqlite, shm) or cache directory (diskcache).
+    """
+    kind = (kind or "memory").lower()
+    if kind == "memory":
+        return InMemorySessionBackend(ttl)
+    if kind == "sqlite":
+        return SQLiteSessionBackend(path or "data/sessions.db", ttl)
+    if kind == "shm":
+        return SharedMemorySessionBackend(path or "/dev/shm/mcp_sessions.db", ttl)
+    if kind == "diskcache":
+        return DiskCacheSessionBackend(path or "data/session_cache", ttl)
+    raise ValueError(f"Unknown session backend: {kind}")
+
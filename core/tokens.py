@@ -0,0 +1,32 @@
+# core/tokens.py
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding(name: str):
+    """Load the tiktoken encoding once; remember a failure (e.g. no network to fetch the BPE file)."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(name)
+        except Exception as e:
+            _encoding_failed = True
+            logger.warning(f"⚠️ tiktoken encoding '{name}' unavailable ({e}); estimating tokens as chars/4")
+    return _encoding
+
+
+def count_tokens(text: str, encoding: str = "cl100k_base") -> int:
+    """
+    Prompt size in tokens. gemma3 uses its own tokenizer, so this is a
+    consistent yardstick for comparing prompts rather than an exact count.
+    """
+    enc = _get_encoding(encoding)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text))
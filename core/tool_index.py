@@ -0,0 +1,82 @@
+# core/tool_index.py
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+# Words that appear in nearly every goal or description and carry no signal
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "get", "give", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "please", "show", "the", "this", "to", "tool",
+    "user", "wants", "with", "you", "your", "need", "needs", "provide", "specific", "id",
+}
+
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words with camelCase and snake_case split and plural 's' stripped."""
+    words = _WORD.findall(_CAMEL.sub(" ", text).lower())
+    tokens = []
+    for word in words:
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def tool_document(tool: Dict[str, Any]) -> List[str]:
+    """Searchable text of a registry entry: name (weighted twice), description, parameters."""
+    params = tool.get("parameters", {}).get("properties", {})
+    name_tokens = tokenize(tool.get("name", "").removeprefix("tool_"))
+    parts = [tool.get("description", "")]
+    for param, spec in params.items():
+        parts.append(param)
+        parts.append(spec.get("description", ""))
+    return name_tokens * 2 + tokenize(" ".join(parts))
+
+
+class ToolIndex:
+    """
+    BM25 index over the LLM tool registry, built once per registry load.
+    search() returns the registry entries most relevant to a goal, so the
+    planner prompt only carries a shortlist instead of every contract.
+    """
+
+    def __init__(self, tools: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.tools = tools
+        self.k1 = k1
+        self.b = b
+        self.docs = [Counter(tool_document(tool)) for tool in tools]
+        self.lengths = [sum(doc.values()) for doc in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if tools else 0.0
+        df = Counter(term for doc in self.docs for term in doc)
+        n = len(tools)
+        self.idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+
+    def score(self, query_terms: List[str], i: int) -> float:
+        doc, length = self.docs[i], self.lengths[i]
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term)
+            if not tf:
+                continue
+            norm = tf + self.k1 * (1 - self.b + self.b * length / self.avg_length)
+            score += self.idf[term] * tf * (self.k1 + 1) / norm
+        return score
+
+    def search(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """
+        Top-k tools for query, in registry order. When the registry has no
+        more than k tools, all of them are returned.
+        """
+        if len(self.tools) <= k:
+            return list(self.tools)
+        terms = tokenize(query)
+        scores = [self.score(terms, i) for i in range(len(self.tools))]
+        ranked = sorted(range(len(self.tools)), key=lambda i: (-scores[i], i))[:k]
+        return [self.tools[i] for i in sorted(ranked)]
@@ -0,0 +1,104 @@
+# core/warmup.py
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.config import PROMPT_TOKEN_ENCODING, TEMENOS_BASE_URL
+from core import llm, planner
+from core.catalog import TOOL_CATALOG
+from core.executioner import TOOL_CONTRACTS
+from core.tokens import count_tokens
+from tools.run_tool import get_async_client
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Tuple[str, Callable[[], Awaitable[None]]]
+
+
+class Readiness:
+    """
+    Startup state reported by /health. A worker turns ready once every
+    warm-up step has run; steps that failed are reported ("degraded") but
+    don't hold readiness back, since most requests can still be served.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.seconds: Optional[float] = None
+        self.steps: Dict[str, str] = {}
+
+    def mark_ready(self) -> None:
+        self.ready = True
+
+    def status(self) -> dict:
+        if not self.ready:
+            state = "warming_up"
+        elif any(result != "ok" for result in self.steps.values()):
+            state = "degraded"
+        else:
+            state = "ok"
+        return {
+            "status": state,
+            "initialized": self.ready,
+            "warmup": {"steps": dict(self.steps), "seconds": self.seconds},
+        }
+
+
+READINESS = Readiness()
+
+
+async def preload_models() -> None:
+    """Load the primary (and fallback) model into Ollama so the first request doesn't pay for it."""
+    backends = [llm.BACKEND] + ([llm.FALLBACK_BACKEND] if llm.FALLBACK_BACKEND is not None else [])
+    await asyncio.gather(*(backend.preload_async() for backend in backends))
+
+
+def _parse_contracts() -> None:
+    if not TOOL_CONTRACTS or not planner.tool_registry_llm:
+        raise RuntimeError("no tool contracts or registry entries loaded")
+    TOOL_CATALOG.capabilities()
+    # The tiktoken encoding loads (and may download) on first use
+    count_tokens(planner.PLANNER_INSTRUCTIONS, PROMPT_TOKEN_ENCODING)
+
+
+async def parse_contracts() -> None:
+    """Contracts and registry are parsed on import; check them and build the lazily loaded parts."""
+    await asyncio.to_thread(_parse_contracts)
+
+
+async def open_upstream() -> None:
+    """Open a keep-alive connection to Temenos (DNS, TCP, TLS) in the shared client's pool."""
+    await get_async_client().head(TEMENOS_BASE_URL)
+
+
+def default_steps() -> List[WarmupStep]:
+    return [
+        ("models", preload_models),
+        ("contracts", parse_contracts),
+        ("upstream", open_upstream),
+    ]
+
+
+async def run_warmup(steps: List[WarmupStep], readiness: Readiness = READINESS,
+                     timeout: Optional[float] = None) -> Readiness:
+    """Run the steps concurrently, each bounded by timeout seconds, then mark readiness."""
+    started = time.monotonic()
+
+    async def run(name, step):
+        readiness.steps[name] = "pending"
+        try:
+            await asyncio.wait_for(step(), timeout)
+            readiness.steps[name] = "ok"
+        except asyncio.TimeoutError:
+            readiness.steps[name] = f"timed out after {timeout}s"
+        except Exception as e:
+            readiness.steps[name] = f"failed: {e}"
+        logger.info(f"🔥 Warm-up {name}: {readiness.steps[name]}")
+
+    await asyncio.gather(*(run(name, step) for name, step in steps))
+    readiness.seconds = round(time.monotonic() - started, 3)
+    readiness.mark_ready()
+    logger.info(f"✅ Warm-up finished in {readiness.seconds}s; ready for traffic")
+    return readiness
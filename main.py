@@ -1,12 +1,20 @@
-import uuid
+import asyncio
 import logging
-import json
+from typing import Optional
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 
-from core.mcp import process_user_request
+from core import llm, planner, rpc, warmup
+from core.admission import OverloadedError
+from core.catalog import TOOL_CATALOG, etag_matches
+from core.compression import CompressionMiddleware
+from core.serialization import FastJSONResponse, dumps_str
+from tools import run_tool
+from config.config import (
+    MCP_SSE_HEARTBEAT, MCP_WS_MAX_INFLIGHT, MCP_COMPRESSION_MIN_SIZE, MCP_WARMUP_ENABLED, MCP_WARMUP_TIMEOUT,
+)
 
 logger = logging.getLogger("main")
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +23,7 @@ app = FastAPI(
     title="MCP API",
     version="1.0.0",
     docs_url="/docs",
+    default_response_class=FastJSONResponse,
 )
 
 # --- CORS ---
@@ -26,19 +35,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_all_tools():
+# --- Response compression (br/gzip, negotiated per request) ---
+app.add_middleware(CompressionMiddleware, minimum_size=MCP_COMPRESSION_MIN_SIZE)
+
+async def run_until_disconnected(request: Request, coro):
     """
-    Load the list of tools from the local JSON registry file.
-    
+    Await coro, cancelling it if the HTTP client disconnects first.
+
+    Cancellation propagates through the pipeline, killing the planner
+    subprocess and aborting upstream calls nobody will read.
+
     Returns:
-        list: List of tool metadata dictionaries, or empty list on failure.
+        tuple: (completed, result); result is None when the client went away.
     """
+    work = asyncio.ensure_future(coro)
+
+    async def wait_for_disconnect():
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                return
+
+    watcher = asyncio.create_task(wait_for_disconnect())
     try:
-        with open("./schema/tool_registry_llm.json", "r") as f:
-            return json.load(f)
-    except Exception as ex:
-        logger.warning(f"Could not load tool registry: {ex}")
-        return []
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not work.done():
+            logger.info(f"🛑 Client disconnected from {request.url.path}; cancelling request")
+            work.cancel()
+            # let the cancellation unwind (subprocess killed, connections closed)
+            await asyncio.wait({work})
+
+    if work.cancelled():
+        return False, None
+    return True, work.result()
 
 class ProcessRequest(BaseModel):
     """
@@ -47,142 +78,111 @@ class ProcessRequest(BaseModel):
     goal: str
     objective: str
     expected_outcome: str
+    response_mode: Optional[str] = None
+    summary_mode: Optional[str] = None
 
 @app.post("/process")
-async def handle_process(request: ProcessRequest):
+async def handle_process(request: ProcessRequest, raw_request: Request):
     """
     Handle a classic REST POST /process request.
 
+    Runs the same tools/call handler as the JSON-RPC transports, always in a
+    fresh session.
+
     Args:
-        request (ProcessRequest): JSON body containing goal, objective, expected_outcome.
+        request (ProcessRequest): JSON body containing goal, objective, expected_outcome,
+            and optionally response_mode ("summary" | "steps" | "full") and
+            summary_mode ("per_step" | "batched" | "deterministic").
+        raw_request (Request): Underlying HTTP request, watched for client disconnect.
 
     Returns:
-        dict: The MCP processing result with a generated session_id.
+        Response: The MCP processing result with a generated session_id,
+        or 429 with Retry-After when admission control rejects the call.
     """
-    session_id = str(uuid.uuid4())
-    response = process_user_request(request.dict(), session_id)
-    return {
-        "session_id": session_id,
-        **response
-    }
+    try:
+        completed, result = await run_until_disconnected(raw_request, rpc.METHODS["tools/call"](request.dict()))
+    except OverloadedError as ex:
+        return FastJSONResponse(
+            status_code=429,
+            content={"status": "error", "message": str(ex)},
+            headers={"Retry-After": str(ex.retry_after)},
+        )
+    except rpc.RpcError as ex:
+        return FastJSONResponse(status_code=400, content={"status": "error", "message": str(ex)})
+    if not completed:
+        return Response(status_code=499)
+    return FastJSONResponse(result)
 
 @app.get("/capabilities")
-async def get_capabilities():
+async def get_capabilities(request: Request):
     """
     Return MCP version info, available transports, and tools.
 
+    The body is pre-serialized by the tool catalogue and carries a weak ETag;
+    a matching If-None-Match gets 304 Not Modified with no body.
+
     Returns:
-        dict: MCP capabilities including transports and registered tools.
+        Response: MCP capabilities including transports and registered tools.
     """
-    return {
-        "mcp_version": "1.0.0",
-        "transports": [
-            {"type": "REST", "path": "/process"},
-            {"type": "JSON-RPC", "path": "/mcp"},
-            {"type": "SSE", "path": "/mcp/stream"},
-            {"type": "WebSocket", "path": "/ws/mcp"},
-        ],
-        "tools": get_all_tools(),
-    }
+    body, etag = TOOL_CATALOG.capabilities()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/mcp")
 async def handle_mcp(request: Request):
     """
     Handle JSON-RPC 2.0 POST requests on /mcp endpoint.
 
-    Supports methods:
-    - initialize: returns MCP version, tools, transports
-    - tools/list: lists registered tools
-    - tools/call, process, call: execute a tool call with required params
+    Accepts a single request object or a batch array; batch members run
+    concurrently and responses are correlated by id. Methods are resolved
+    through the shared table in core.rpc. A body that is not valid JSON gets
+    a single -32700 Parse error; a lone notification (no "id") gets 204.
 
     Args:
         request (Request): Incoming HTTP request.
 
     Returns:
-        dict: JSON-RPC response object with result or error.
+        Response: JSON-RPC response object, or array of responses for a batch.
     """
-    payload = await request.json()
+    payload, error = rpc.parse_payload(await request.body())
+    if error:
+        return FastJSONResponse(error)
     logger.info(f"JSON-RPC Payload: {payload}")
 
-    method = payload.get("method")
-    params = payload.get("params", {})
-    rpc_id = payload.get("id")
-
-    try:
-        if method == "initialize":
-            tools = await mcp_system.mcp.list_tools()
-            tools_json = [t.model_dump() if hasattr(t, "model_dump") else t.dict() for t in tools]
-            return {
-                "jsonrpc": "2.0",
-                "result": {
-                    "mcp_version": "1.0.0",
-                    "tools": tools_json,
-                    "transports": [
-                        {"type": "REST", "path": "/process"},
-                        {"type": "JSON-RPC", "path": "/mcp"},
-                        {"type": "SSE", "path": "/mcp/stream"},
-                        {"type": "WebSocket", "path": "/ws/mcp"}
-                    ],
-                },
-                "id": rpc_id
-            }
-
-        elif method == "tools/list":
-            tools = await mcp_system.mcp.list_tools()
-            tools_json = [t.model_dump() if hasattr(t, "model_dump") else t.dict() for t in tools]
-            return {
-                "jsonrpc": "2.0",
-                "result": tools_json,
-                "id": rpc_id
-            }
-
-        elif method in ("tools/call", "process", "call"):
-            required = ["goal", "objective", "expected_outcome"]
-            if not all(k in params for k in required):
-                return {
-                    "jsonrpc": "2.0",
-                    "error": {"code": -32602, "message": "Invalid params: goal, objective, expected_outcome are required."},
-                    "id": rpc_id
-                }
-            session_id = params.get("session_id", str(uuid.uuid4()))
-            result = process_user_request(params, session_id)
-            return {
-                "jsonrpc": "2.0",
-                "result": {
-                    "session_id": session_id,
-                    **result
-                },
-                "id": rpc_id
-            }
-
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "error": {"code": -32601, "message": "Method not found"},
-                "id": rpc_id
-            }
-
-    except Exception as ex:
-        logger.exception("Exception in JSON-RPC handler")
-        return {
-            "jsonrpc": "2.0",
-            "error": {
-                "code": -32000,
-                "message": f"Internal server error: {str(ex)}"
-            },
-            "id": rpc_id
-        }
-
-def sse_format(data: str) -> str:
+    if isinstance(payload, list):
+        error = rpc.validate_batch(payload)
+        if error:
+            return FastJSONResponse(error)
+        completed, responses = await run_until_disconnected(request, rpc.dispatch_batch(payload))
+        if not completed:
+            return Response(status_code=499)
+        if not responses:
+            # Batch of notifications only: nothing to return
+            return Response(status_code=204)
+        return FastJSONResponse(responses)
+
+    completed, response = await run_until_disconnected(request, rpc.dispatch_rpc(payload))
+    if not completed:
+        return Response(status_code=499)
+    if rpc.is_notification(payload):
+        return Response(status_code=204)
+    return FastJSONResponse(response)
+
+def sse_format(data: str, event: str = None) -> str:
     """
     Format a string message according to Server-Sent Events protocol.
 
     Args:
         data (str): Data string to send.
+        event (str, optional): SSE event name; omitted for default "message" events.
 
     Returns:
         str: Formatted SSE message string.
     """
+    if event:
+        return f"event: {event}\ndata: {data}\n\n"
     return f"data: {data}\n\n"
 
 @app.post("/mcp/stream")
@@ -190,95 +190,76 @@ async def handle_mcp_stream(request: Request):
     """
     Handle JSON-RPC 2.0 requests over Server-Sent Events (SSE).
 
-    Returns a stream of events representing JSON-RPC responses.
+    A tools/call streams staged events as they happen, each named after its
+    stage and tagged with the request id:
+    plan → step_started / step_finished per step → step_summary per step →
+    summary, followed by the final JSON-RPC response as a default "message"
+    event. For a batch array, every member streams its own stages and final
+    response, correlated by id. A comment heartbeat is sent while idle so
+    proxies keep long plans open. If the client disconnects mid-stream, all
+    in-flight work for the request is cancelled.
 
     Args:
         request (Request): Incoming HTTP request.
 
     Returns:
-        StreamingResponse: SSE stream of JSON-RPC responses.
+        StreamingResponse: SSE stream of progress events and JSON-RPC responses.
     """
-    payload = await request.json()
+    payload, parse_error = rpc.parse_payload(await request.body())
     logger.info(f"SSE JSON-RPC Payload: {payload}")
 
-    method = payload.get("method")
-    params = payload.get("params", {})
-    rpc_id = payload.get("id")
-
     async def event_generator():
-        try:
-            if method == "initialize":
-                tools = await mcp_system.mcp.list_tools()
-                tools_json = [t.model_dump() if hasattr(t, "model_dump") else t.dict() for t in tools]
-                response = {
-                    "jsonrpc": "2.0",
-                    "result": {
-                        "mcp_version": "1.0.0",
-                        "tools": tools_json,
-                        "transports": [
-                            {"type": "REST", "path": "/process"},
-                            {"type": "JSON-RPC", "path": "/mcp"},
-                            {"type": "SSE", "path": "/mcp/stream"},
-                            {"type": "WebSocket", "path": "/ws/mcp"}
-                        ],
-                    },
-                    "id": rpc_id
-                }
-                yield sse_format(json.dumps(response))
-
-            elif method == "tools/list":
-                tools = await mcp_system.mcp.list_tools()
-                tools_json = [t.model_dump() if hasattr(t, "model_dump") else t.dict() for t in tools]
-                response = {
-                    "jsonrpc": "2.0",
-                    "result": tools_json,
-                    "id": rpc_id
-                }
-                yield sse_format(json.dumps(response))
-
-            elif method in ("tools/call", "process", "call"):
-                required = ["goal", "objective", "expected_outcome"]
-                if not all(k in params for k in required):
-                    response = {
-                        "jsonrpc": "2.0",
-                        "error": {"code": -32602, "message": "Invalid params: goal, objective, expected_outcome are required."},
-                        "id": rpc_id
-                    }
-                    yield sse_format(json.dumps(response))
+        frames = asyncio.Queue()
+
+        async def on_event(rpc_id, stage, data):
+            await frames.put(sse_format(dumps_str({"id": rpc_id, "stage": stage, **data}), event=stage))
+
+        async def run():
+            if parse_error:
+                await frames.put(sse_format(dumps_str(parse_error), event="error"))
+                return
+            if isinstance(payload, list):
+                error = rpc.validate_batch(payload)
+                if error:
+                    await frames.put(sse_format(dumps_str(error), event="error"))
                     return
-
-                session_id = params.get("session_id", str(uuid.uuid4()))
-                result = process_user_request(params, session_id)
-
-                response = {
-                    "jsonrpc": "2.0",
-                    "result": {
-                        "session_id": session_id,
-                        **result
-                    },
-                    "id": rpc_id
-                }
-                yield sse_format(json.dumps(response))
-
+                members = [asyncio.create_task(call) for call in rpc.batch_calls(payload, on_event)]
+                try:
+                    for done in asyncio.as_completed(members):
+                        response = await done
+                        if response is not None:
+                            await frames.put(sse_format(dumps_str(response)))
+                finally:
+                    for member in members:
+                        member.cancel()
+                return
+
+            response = await rpc.dispatch_rpc(payload, on_event)
+            if rpc.is_notification(payload):
+                return
+            if rpc.is_overloaded(response):
+                await frames.put(sse_format(dumps_str(response), event="error"))
             else:
-                response = {
-                    "jsonrpc": "2.0",
-                    "error": {"code": -32601, "message": "Method not found"},
-                    "id": rpc_id
-                }
-                yield sse_format(json.dumps(response))
-
-        except Exception as ex:
-            logger.exception("Exception in SSE handler")
-            response = {
-                "jsonrpc": "2.0",
-                "error": {
-                    "code": -32000,
-                    "message": f"Internal server error: {str(ex)}"
-                },
-                "id": rpc_id
-            }
-            yield sse_format(json.dumps(response))
+                await frames.put(sse_format(dumps_str(response)))
+
+        worker = asyncio.create_task(run())
+        worker.add_done_callback(lambda _: frames.put_nowait(None))
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(frames.get(), timeout=MCP_SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    break
+                yield frame
+            await worker
+        finally:
+            # Client disconnected (generator cancelled/closed) before the work finished
+            if not worker.done():
+                logger.info("🛑 SSE client disconnected; cancelling request")
+                worker.cancel()
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -287,119 +268,119 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint handling JSON-RPC 2.0 messages.
 
-    Supports:
-    - initialize
-    - tools/list
-    - tools/call, process, call
+    Supports every method in core.rpc.METHODS, plus batch arrays
+    (answered with one array of responses).
 
     Args:
         websocket (WebSocket): The WebSocket connection instance.
 
     Behavior:
-        Continuously receives JSON-RPC requests and sends back JSON-RPC responses.
-        Closes on WebSocket disconnect.
+        Every incoming message is dispatched as its own task, so pipelined
+        calls run concurrently and each response is sent as soon as it is
+        ready, correlated by id. At most MCP_WS_MAX_INFLIGHT messages run per
+        connection; beyond that the socket stops reading until one finishes.
+        On disconnect, every in-flight request on the socket is cancelled.
+        While a tools/call generates its final summary, each fragment is sent
+        ahead of the response as a "partial_summary" notification carrying
+        the request id and the text delta.
     """
     await websocket.accept()
+    inflight = asyncio.Semaphore(MCP_WS_MAX_INFLIGHT)
+    send_lock = asyncio.Lock()
+    tasks = set()
+
+    async def send(response):
+        async with send_lock:
+            await websocket.send_text(dumps_str(response))
+
+    async def on_event(rpc_id, stage, data):
+        if stage == "partial_summary" and rpc_id is not None:
+            await send({"jsonrpc": "2.0", "method": "partial_summary", "params": {"id": rpc_id, **data}})
+
+    async def handle(data):
+        try:
+            if isinstance(data, list):
+                error = rpc.validate_batch(data)
+                if error:
+                    await send(error)
+                    return
+                responses = await rpc.dispatch_batch(data, on_event)
+                if responses:
+                    await send(responses)
+                return
+
+            response = await rpc.dispatch_rpc(data, on_event)
+            if not rpc.is_notification(data):
+                await send(response)
+        except Exception:
+            logger.exception("Exception in WebSocket handler")
+        finally:
+            inflight.release()
+
     try:
         while True:
-            data = await websocket.receive_json()
+            data, error = rpc.parse_payload(await websocket.receive_text())
+            if error:
+                await send(error)
+                continue
             logger.info(f"WebSocket JSON-RPC Payload: {data}")
 
-            method = data.get("method")
-            params = data.get("params", {})
-            rpc_id = data.get("id")
-
-            try:
-                if method == "initialize":
-                    tools = await mcp_system.mcp.list_tools()
-                    tools_json = [t.model_dump() if hasattr(t, "model_dump") else t.dict() for t in tools]
-                    response = {
-                        "jsonrpc": "2.0",
-                        "result": {
-                            "mcp_version": "1.0.0",
-                            "tools": tools_json,
-                            "transports": [
-                                {"type": "REST", "path": "/process"},
-                                {"type": "JSON-RPC", "path": "/mcp"},
-                                {"type": "SSE", "path": "/mcp/stream"},
-                                {"type": "WebSocket", "path": "/ws/mcp"}
-                            ],
-                        },
-                        "id": rpc_id
-                    }
-                    await websocket.send_json(response)
-
-                elif method == "tools/list":
-                    tools = await mcp_system.mcp.list_tools()
-                    tools_json = [t.model_dump() if hasattr(t, "model_dump") else t.dict() for t in tools]
-                    response = {
-                        "jsonrpc": "2.0",
-                        "result": tools_json,
-                        "id": rpc_id
-                    }
-                    await websocket.send_json(response)
-
-                elif method in ("tools/call", "process", "call"):
-                    required = ["goal", "objective", "expected_outcome"]
-                    if not all(k in params for k in required):
-                        response = {
-                            "jsonrpc": "2.0",
-                            "error": {"code": -32602, "message": "Invalid params: goal, objective, expected_outcome are required."},
-                            "id": rpc_id
-                        }
-                        await websocket.send_json(response)
-                        continue
-
-                    session_id = params.get("session_id", str(uuid.uuid4()))
-                    result = process_user_request(params, session_id)
-                    response = {
-                        "jsonrpc": "2.0",
-                        "result": {
-                            "session_id": session_id,
-                            **result
-                        },
-                        "id": rpc_id
-                    }
-                    await websocket.send_json(response)
-
-                else:
-                    response = {
-                        "jsonrpc": "2.0",
-                        "error": {"code": -32601, "message": "Method not found"},
-                        "id": rpc_id
-                    }
-                    await websocket.send_json(response)
-
-            except Exception as ex:
-                logger.exception("Exception in WebSocket handler")
-                response = {
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32000,
-                        "message": f"Internal server error: {str(ex)}"
-                    },
-                    "id": rpc_id
-                }
-                await websocket.send_json(response)
+            await inflight.acquire()
+            task = asyncio.create_task(handle(data))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
 
     except WebSocketDisconnect:
-        logger.info("WebSocket disconnected")
+        logger.info(f"WebSocket disconnected; cancelling {len(tasks)} in-flight request(s)")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 @app.get("/health")
 async def health():
     """
-    Health check endpoint.
+    Health / readiness check endpoint.
+
+    Returns:
+        Response: 503 with status "warming_up" until the startup warm-up has
+        finished, then 200 with status "ok" (or "degraded" if a warm-up step
+        failed) and the result of each step.
+    """
+    status = warmup.READINESS.status()
+    return FastJSONResponse(status, status_code=200 if status["initialized"] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Runtime counters for sizing workers.
 
     Returns:
-        dict: Service health status.
+        dict: Admission queue depth, wait times and rejection counts,
+        plus LLM response cache, in-flight coalescing, LLM deadline
+        timeout/fallback, planner prompt size and plan cache counters.
     """
-    return {"status": "ok", "initialized": True}
+    return {
+        "admission": rpc.admission.stats(),
+        "llm_cache": llm.LLM_CACHE.stats() if llm.LLM_CACHE is not None else None,
+        "llm_singleflight": llm.LLM_FLIGHTS.stats(),
+        "llm_deadlines": llm.deadline_stats(),
+        "planner_prompt": planner.prompt_stats(),
+        "plan_cache": planner.PLAN_CACHE.stats() if planner.PLAN_CACHE is not None else None,
+    }
 
 @app.on_event("startup")
 async def on_startup():
     """
-    Log service readiness info at application startup.
+    Start the warm-up in the background and log service info at application startup.
+    /health reports not-ready until the warm-up has finished.
     """
+    if MCP_WARMUP_ENABLED:
+        app.state.warmup = asyncio.create_task(
+            warmup.run_warmup(warmup.default_steps(), timeout=MCP_WARMUP_TIMEOUT)
+        )
+    else:
+        warmup.READINESS.mark_ready()
+
     logger.info("=" * 50)
     logger.info("🚀 MCP Multi-Transport Service Ready!")
     logger.info("REST:       POST /process")
@@ -407,9 +388,19 @@ async def on_startup():
     logger.info("SSE:        POST /mcp/stream")
     logger.info("WebSocket:  /ws/mcp")
     logger.info("Health:     GET /health")
+    logger.info("Metrics:    GET /metrics")
     logger.info("Capabilities: GET /capabilities")
+    if MCP_WARMUP_ENABLED:
+        logger.info("🔥 Warm-up running; /health returns 503 until it finishes")
     logger.info("=" * 50)
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    """
+    Close the shared upstream HTTP client at application shutdown.
+    """
+    await run_tool.close_async_client()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Serialization cost per transport, before (stdlib json / Starlette defaults)
+and after (core.serialization with orjson), for a transaction-heavy tools/call
+response.
+
+Usage:
+    python scripts/bench_serialization.py [--transactions 2000] [--accounts 3] [--repeat 20]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from core.serialization import FastJSONResponse, dumps_str, orjson
+
+SAMPLE_PATH = "schema/json_schemas/generated/tool_get_holdings_accounts_transactions_response.json"
+
+
+def build_payload(accounts: int, transactions: int) -> dict:
+    """A tools/call JSON-RPC response shaped like process_user_request's output."""
+    with open(SAMPLE_PATH, "r") as f:
+        sample = json.load(f)
+    template = sample["body"][0]
+
+    plan, raw_result, raw_text = [], {}, {}
+    for a in range(accounts):
+        account_id = str(106000 + a)
+        body = [{**template, "accountId": account_id, "transactionReference": f"BNK{a}{i:08d}"}
+                for i in range(transactions)]
+        step = f"step{a+1}"
+        plan.append({"tool": "tool_get_holdings_accounts_transactions", "inputs": {"accountId": account_id}})
+        raw_result.setdefault("tool_get_holdings_accounts_transactions", {})[step] = {
+            "header": sample["header"], "body": body
+        }
+        raw_text.setdefault("tool_get_holdings_accounts_transactions", {})[step] = \
+            f"{transactions} transactions found for account {account_id}."
+
+    return {
+        "jsonrpc": "2.0",
+        "result": {
+            "session_id": "bench",
+            "plan": plan,
+            "next_action": "respond_with_result",
+            "final_summary": "Summary of balances and transactions.",
+            "raw_result": raw_result,
+            "raw_text": raw_text,
+            "is_final": True,
+            "memory_passed": {},
+        },
+        "id": 1,
+    }
+
+
+def timeit(fn, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = build_payload(args.accounts, args.transactions)
+
+    transports = {
+        # FastAPI runs jsonable_encoder on returned dicts, then JSONResponse.render
+        "REST /process": (
+            lambda: JSONResponse(jsonable_encoder(payload["result"])).body,
+            lambda: FastJSONResponse(payload["result"]).body,
+        ),
+        "JSON-RPC /mcp": (
+            lambda: JSONResponse(jsonable_encoder(payload)).body,
+            lambda: FastJSONResponse(payload).body,
+        ),
+        # SSE frames used json.dumps with default separators
+        "SSE /mcp/stream": (
+            lambda: json.dumps(payload),
+            lambda: dumps_str(payload),
+        ),
+        # WebSocket.send_json uses compact json.dumps
+        "WebSocket /ws/mcp": (
+            lambda: json.dumps(payload, separators=(",", ":"), ensure_ascii=False),
+            lambda: dumps_str(payload),
+        ),
+    }
+
+    size_kb = len(FastJSONResponse(payload).body) / 1024
+    print(f"Payload: {args.accounts} accounts x {args.transactions} transactions = {size_kb:,.0f} KiB")
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'Transport':<20}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, (before, after) in transports.items():
+        b = timeit(before, args.repeat)
+        a = timeit(after, args.repeat)
+        print(f"{name:<20}{b:>12.2f}{a:>12.2f}{b / a:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+How much of the logged traffic the deterministic fast-path planner
+(core.fast_planner) would answer without calling the LLM planner.
+
+Usage:
+    python scripts/fast_path_report.py [--log logs/mcp_requests.jsonl] [--threshold 0.8] [--examples 3]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+from collections import Counter, defaultdict
+
+from core.planner import build_fast_planner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default="logs/mcp_requests.jsonl")
+    parser.add_argument("--threshold", type=float, default=None, help="defaults to FAST_PLANNER_THRESHOLD")
+    parser.add_argument("--examples", type=int, default=3, help="goals shown per outcome")
+    args = parser.parse_args()
+
+    fast = build_fast_planner()
+    if args.threshold is not None:
+        fast.threshold = args.threshold
+
+    total = 0
+    answered = Counter()
+    declined = Counter()
+    examples = defaultdict(list)
+    with open(args.log, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            req = entry.get("input", {})
+            total += 1
+            result = fast.match(req.get("goal", ""), req.get("objective", ""), req.get("expected_outcome", ""),
+                                req.get("parameters", {}) or {})
+            if result.plan and result.confidence >= fast.threshold:
+                key = result.tool
+                answered[key] += 1
+            else:
+                key = result.reason if not result.plan else f"low confidence ({result.confidence:.2f})"
+                key = key.split(":")[0]
+                declined[key] += 1
+            if len(examples[key]) < args.examples:
+                examples[key].append(req.get("goal", ""))
+
+    hits = sum(answered.values())
+    print(f"Requests: {total}")
+    print(f"Fast path: {hits} ({hits / total:.1%})" if total else "Fast path: 0")
+    print("\nAnswered by tool:")
+    for key, n in answered.most_common():
+        print(f"  {n:5d}  {key}")
+        for goal in examples[key]:
+            print(f"         - {goal}")
+    print("\nSent to the LLM planner:")
+    for key, n in declined.most_common():
+        print(f"  {n:5d}  {key}")
+        for goal in examples[key]:
+            print(f"         - {goal}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+
+# Keep test runs from reading or filling the on-disk LLM and plan caches under data/
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("PLAN_CACHE_ENABLED", "false")
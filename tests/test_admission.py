@@ -0,0 +1,115 @@
+import os
+import sys
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core import rpc
+from core.admission import AdmissionController, OverloadedError
+
+
+@pytest.mark.asyncio
+async def test_admission_limits_concurrency():
+    controller = AdmissionController(max_concurrency=2, max_queue=10, queue_timeout=5)
+    peak = {"running": 0, "max": 0}
+
+    async def work():
+        async with controller.admit():
+            peak["running"] += 1
+            peak["max"] = max(peak["max"], peak["running"])
+            await asyncio.sleep(0.05)
+            peak["running"] -= 1
+
+    await asyncio.gather(*[work() for _ in range(6)])
+
+    assert peak["max"] == 2
+    stats = controller.stats()
+    assert stats["admitted"] == 6
+    assert stats["active"] == 0
+    assert stats["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_rejects_when_queue_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.admit():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(OverloadedError):
+        async with controller.admit():
+            pass
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert controller.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_timeout():
+    controller = AdmissionController(max_concurrency=1, max_queue=5, queue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.admit():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(OverloadedError):
+        async with controller.admit():
+            pass
+
+    release.set()
+    await holder
+    assert controller.stats()["timed_out"] == 1
+
+
+class _AlwaysOverloaded:
+    def admit(self):
+        raise OverloadedError("Server overloaded: request queue is full", retry_after=3)
+
+    def stats(self):
+        return {}
+
+
+def test_rest_returns_429_when_overloaded(monkeypatch):
+    monkeypatch.setattr(rpc, "admission", _AlwaysOverloaded())
+    client = TestClient(main.app)
+
+    resp = client.post("/process", json={"goal": "g", "objective": "o", "expected_outcome": "e"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "3"
+
+
+def test_jsonrpc_returns_overload_error(monkeypatch):
+    monkeypatch.setattr(rpc, "admission", _AlwaysOverloaded())
+    client = TestClient(main.app)
+
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": "g", "objective": "o", "expected_outcome": "e"},
+        "id": 5
+    }
+    data = client.post("/mcp", json=payload).json()
+    assert data["id"] == 5
+    assert data["error"]["code"] == -32001
+
+
+def test_metrics_exposes_admission_stats():
+    client = TestClient(main.app)
+    data = client.get("/metrics").json()
+    assert "queue_depth" in data["admission"]
+    assert "avg_wait_ms" in data["admission"]
@@ -0,0 +1,159 @@
+import os
+import sys
+import asyncio
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.mcp as mcp
+from core import executioner
+import tools.run_tool as run_tool_module
+
+
+@pytest.fixture
+def stub_async_pipeline(monkeypatch):
+    """
+    Stub the async planner/executor/aggregator with coroutines that sleep,
+    so we can observe whether concurrent requests overlap on one event loop.
+    """
+    async def fake_plan_async(goal, objective, outcome, memory):
+        await asyncio.sleep(0.2)
+        return [{"tool": "t1", "inputs": {"accountId": "1"}}], []
+
+    async def fake_execute_plan_async(plan):
+        await asyncio.sleep(0.2)
+        return {"step1": {"body": [{"balance": 10}]}}
+
+    async def fake_aggregate_async(tool_outputs, expected_outcome, llm_call, TOOL_CONTRACTS, on_event=None, llm_stream=None, summary_mode="per_step", parallelism=1):
+        await asyncio.sleep(0.2)
+        return {"summary": "async summary", "raw_result": {}, "raw_text": {}}
+
+    monkeypatch.setattr(mcp, "plan_async", fake_plan_async)
+    monkeypatch.setattr(mcp, "execute_plan_async", fake_execute_plan_async)
+    monkeypatch.setattr(mcp, "aggregate_async", fake_aggregate_async)
+    yield
+
+
+@pytest.mark.asyncio
+async def test_process_user_request_async_happy_path(stub_async_pipeline):
+    payload = {"goal": "g", "objective": "o", "expected_outcome": "e", "parameters": {}}
+    resp = await mcp.process_user_request_async(payload, session_id="async1")
+
+    assert resp["next_action"] == "respond_with_result"
+    assert resp["final_summary"] == "async summary"
+    assert resp["plan"][0]["tool"] == "t1"
+    assert resp["session_id"] == "async1"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_do_not_serialize(stub_async_pipeline):
+    payload = {"goal": "g", "objective": "o", "expected_outcome": "e", "parameters": {}}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    results = await asyncio.gather(*[
+        mcp.process_user_request_async(payload, session_id=f"concurrent{i}")
+        for i in range(10)
+    ])
+    elapsed = loop.time() - start
+
+    assert all(r["is_final"] for r in results)
+    # Ten sequential requests would take ~6s; overlapped they take ~0.6s
+    assert elapsed < 2.0
+
+
+@pytest.mark.asyncio
+async def test_execute_plan_async_awaits_run_tool(monkeypatch):
+    dummy_contracts = {
+        "alpha": {"endpoint": "/dummy/alpha", "required_inputs": ["x"]},
+    }
+
+    async def dummy_run_tool_async(tool_contract, inputs, request_schema=None, response_schema=None):
+        return {"alpha_result": inputs}
+
+    monkeypatch.setattr(executioner, "TOOL_CONTRACTS", dummy_contracts)
+    monkeypatch.setattr(executioner, "run_tool_async", dummy_run_tool_async)
+
+    out = await executioner.execute_plan_async([{"tool": "alpha", "inputs": {"x": "1"}}])
+    assert out == {"step1": {"alpha_result": {"x": "1"}}}
+
+
+@pytest.mark.asyncio
+async def test_run_tool_async_applies_filters(monkeypatch):
+    contract = {
+        "endpoint": "/v1.0.0/holdings/accounts/{accountId}/transactions",
+        "required_inputs": ["accountId"],
+        "optional_inputs": [],
+        "filtering_rules": [
+            {"input_param": "name", "response_field": "name", "filter_type": "exact"}
+        ],
+    }
+    seen = {}
+
+    async def fake_call_api_async(endpoint, path_params, query_params):
+        seen["path_params"] = path_params
+        return {"body": [{"name": "Rent"}, {"name": "Food"}]}
+
+    monkeypatch.setattr(run_tool_module, "call_api_async", fake_call_api_async)
+
+    out = await run_tool_module.run_tool_async(contract, {"accountId": "7", "name": "rent"})
+    assert seen["path_params"] == {"accountId": "7"}
+    assert out == {"body": [{"name": "Rent"}]}
+
+
+@pytest.mark.asyncio
+async def test_upstream_client_uses_configured_timeouts_and_closes(monkeypatch):
+    monkeypatch.setattr(run_tool_module, "_async_client", None)
+    monkeypatch.setattr(run_tool_module, "TEMENOS_TIMEOUT", 0)
+    monkeypatch.setattr(run_tool_module, "TEMENOS_CONNECT_TIMEOUT", 7)
+
+    client = run_tool_module.get_async_client()
+    assert client.timeout == run_tool_module.httpx.Timeout(None, connect=7)
+    assert client is run_tool_module.get_async_client()
+
+    await run_tool_module.close_async_client()
+    assert client.is_closed
+    assert run_tool_module._async_client is None
+
+
+@pytest.mark.asyncio
+async def test_call_api_async_drops_none_query_params(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request.url)
+        return run_tool_module.httpx.Response(200, json={"body": []})
+
+    client = run_tool_module.httpx.AsyncClient(transport=run_tool_module.httpx.MockTransport(handler))
+    monkeypatch.setattr(run_tool_module, "_async_client", client)
+    monkeypatch.setattr(run_tool_module, "build_auth_headers", lambda: {})
+
+    await run_tool_module.call_api_async("http://temenos/accounts/{accountId}", {"accountId": "7"}, {"a": None, "b": 1})
+
+    assert seen[0].query == b"b=1"
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_process_user_request_async_emits_stages(monkeypatch, stub_async_pipeline):
+    async def fake_aggregate_async(tool_outputs, expected_outcome, llm_call, TOOL_CONTRACTS, on_event=None, llm_stream=None, summary_mode="per_step", parallelism=1):
+        await on_event("step_summary", {"step": "step1", "summary": "s1"})
+        await on_event("summary", {"summary": "done"})
+        return {"summary": "done", "raw_result": {}, "raw_text": {}}
+
+    monkeypatch.setattr(mcp, "aggregate_async", fake_aggregate_async)
+    stages = []
+
+    async def on_event(stage, data):
+        stages.append((stage, data.get("step")))
+
+    payload = {"goal": "g", "objective": "o", "expected_outcome": "e", "parameters": {}}
+    await mcp.process_user_request_async(payload, session_id="stages1", on_event=on_event)
+
+    assert stages == [
+        ("plan", None),
+        ("step_started", "step1"),
+        ("step_finished", "step1"),
+        ("step_summary", "step1"),
+        ("summary", None),
+    ]
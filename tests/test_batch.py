@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core import rpc
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    Stub the async MCP pipeline: each call sleeps briefly and echoes its goal,
+    while recording how many calls were in flight at once.
+    """
+    state = {"running": 0, "peak": 0}
+
+    async def fake_process(params, session_id, on_event=None):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.05)
+        state["running"] -= 1
+        return {"final_summary": params["goal"], "is_final": True}
+
+    monkeypatch.setattr(rpc, "process_user_request_async", fake_process)
+    test_client = TestClient(main.app)
+    test_client.state = state
+    return test_client
+
+
+def call(goal, rpc_id):
+    return {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": goal, "objective": "o", "expected_outcome": "e"},
+        "id": rpc_id,
+    }
+
+
+def test_batch_responses_correlated_by_id(client):
+    batch = [call(f"acct {i}", i) for i in range(5)]
+    resp = client.post("/mcp", json=batch)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert isinstance(data, list) and len(data) == 5
+    by_id = {item["id"]: item for item in data}
+    for i in range(5):
+        assert by_id[i]["result"]["final_summary"] == f"acct {i}"
+
+
+def test_batch_runs_concurrently_with_cap(client, monkeypatch):
+    monkeypatch.setattr(rpc, "MCP_BATCH_PARALLELISM", 2)
+    client.post("/mcp", json=[call("g", i) for i in range(6)])
+    assert client.state["peak"] == 2
+
+
+def test_batch_mixed_members_and_notifications(client):
+    batch = [
+        call("g", 1),
+        {"jsonrpc": "2.0", "method": "unknown/method", "id": 2},
+        {"jsonrpc": "2.0", "method": "tools/call", "params": {"goal": "note", "objective": "o", "expected_outcome": "e"}},
+        42,
+    ]
+    data = client.post("/mcp", json=batch).json()
+
+    # the notification (no id) gets no response; the bare 42 is an invalid request
+    assert len(data) == 3
+    assert data[0]["id"] == 1 and "result" in data[0]
+    assert data[1]["error"]["code"] == -32601
+    assert data[2]["error"]["code"] == -32600
+
+
+def test_empty_batch_is_invalid_request(client):
+    data = client.post("/mcp", json=[]).json()
+    assert data["error"]["code"] == -32600
+    assert data["id"] is None
+
+
+def test_batch_of_notifications_returns_no_content(client):
+    note = {"jsonrpc": "2.0", "method": "tools/call", "params": {"goal": "g", "objective": "o", "expected_outcome": "e"}}
+    resp = client.post("/mcp", json=[note, note])
+    assert resp.status_code == 204
+
+
+def test_sse_batch_emits_one_event_per_member(client):
+    resp = client.post("/mcp/stream", json=[call("a", "x"), call("b", "y")])
+    events = [
+        json.loads(line[len("data: "):])
+        for line in resp.content.decode().splitlines()
+        if line.startswith("data: ")
+    ]
+    assert sorted(e["id"] for e in events) == ["x", "y"]
+
+
+def test_websocket_batch_returns_array(client):
+    with client.websocket_connect("/ws/mcp") as ws:
+        ws.send_json([call("a", 1), call("b", 2)])
+        data = ws.receive_json()
+    assert [item["id"] for item in data] == [1, 2]
+
+
+def test_malformed_body_is_parse_error(client):
+    resp = client.post("/mcp", content=json.dumps([call("a", 1), call("b", 2)])[:-5],
+                       headers={"content-type": "application/json"})
+    assert resp.status_code == 200
+    assert resp.json() == {"jsonrpc": "2.0", "error": {"code": -32700, "message": "Parse error"}, "id": None}
+
+
+def test_sse_malformed_body_is_parse_error(client):
+    resp = client.post("/mcp/stream", content="{\"jsonrpc\": \"2.0\", ",
+                       headers={"content-type": "application/json"})
+    assert "event: error" in resp.text
+    assert '"code":-32700' in resp.text
+
+
+def test_single_notification_returns_no_content(client):
+    note = {"jsonrpc": "2.0", "method": "tools/call", "params": {"goal": "g", "objective": "o", "expected_outcome": "e"}}
+    resp = client.post("/mcp", json=note)
+    assert resp.status_code == 204
+    assert resp.content == b""
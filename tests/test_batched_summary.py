@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.aggregator import aggregate, aggregate_async, parse_batched_summary
+
+TOOL = "tool_get_holdings_accounts_balances"
+
+STEPS = [
+    {"tool": TOOL, "inputs": {"accountId": "105929"}, "result": {"body": [{"balance": 10}]}},
+    {"tool": TOOL, "inputs": {"accountId": "108596"}, "result": {"body": []}},
+    {"tool": TOOL, "inputs": {"accountId": "109213"}, "result": {"body": [{"balance": 30}]}},
+]
+
+REPLY = json.dumps({"steps": {"step1": "Balance is 10.", "step3": "Balance is 30."}, "summary": "Two accounts hold 40."})
+
+
+def test_batched_mode_makes_one_call():
+    prompts = []
+
+    def llm(prompt):
+        prompts.append(prompt)
+        return REPLY
+
+    result = aggregate(STEPS, "balances", llm, {}, summary_mode="batched")
+
+    assert len(prompts) == 1
+    assert "Already summarized: No data found for this query." in prompts[0]
+    assert result["summary"] == "Two accounts hold 40."
+    assert result["raw_text"][TOOL] == {
+        "step1": "Balance is 10.",
+        "step2": "No data found for this query.",
+        "step3": "Balance is 30.",
+    }
+
+
+def test_batched_mode_falls_back_to_per_step_on_bad_reply():
+    prompts = []
+
+    def llm(prompt):
+        prompts.append(prompt)
+        return "Sure! Here is a summary." if len(prompts) == 1 else "per-step text"
+
+    result = aggregate(STEPS, "balances", llm, {}, summary_mode="batched")
+
+    # 1 failed batched call + 2 step summaries (step2 is canned) + final summary
+    assert len(prompts) == 4
+    assert result["raw_text"][TOOL]["step1"] == "per-step text"
+    assert result["summary"] == "per-step text"
+
+
+def test_parse_batched_summary_requires_every_step():
+    with pytest.raises(ValueError):
+        parse_batched_summary('{"steps": {"step1": "a"}, "summary": "s"}', ["step1", "step3"])
+    # fenced and truncated replies are repaired
+    steps, summary = parse_batched_summary('```json\n{"steps": {"step1": "a"}, "summary": "s"', ["step1"])
+    assert steps == {"step1": "a"} and summary == "s"
+
+
+@pytest.mark.asyncio
+async def test_batched_mode_async_emits_step_and_summary_events():
+    events = []
+
+    async def llm(prompt):
+        return REPLY
+
+    async def on_event(stage, data):
+        events.append((stage, data.get("step")))
+
+    result = await aggregate_async(STEPS, "balances", llm, {}, on_event=on_event, summary_mode="batched")
+
+    assert result["summary"] == "Two accounts hold 40."
+    assert events == [("step_summary", "step1"), ("step_summary", "step2"), ("step_summary", "step3"), ("summary", None)]
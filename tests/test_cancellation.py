@@ -0,0 +1,165 @@
+import os
+import sys
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core.llm_backends import OllamaSubprocessBackend
+import core.mcp as mcp
+from core import rpc
+
+
+@pytest.mark.asyncio
+async def test_ollama_subprocess_killed_on_cancel(monkeypatch):
+    procs = []
+    real_exec = asyncio.create_subprocess_exec
+
+    async def tracking_exec(*args, **kwargs):
+        proc = await real_exec(*args, **kwargs)
+        procs.append(proc)
+        return proc
+
+    backend = OllamaSubprocessBackend("gemma3:latest")
+    backend.command = ["sleep", "30"]
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", tracking_exec)
+
+    task = asyncio.create_task(backend.generate_async("hello"))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert procs and procs[0].returncode is not None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_skips_aggregation(monkeypatch):
+    calls = {"aggregate": 0}
+
+    async def fake_plan_async(goal, objective, outcome, memory):
+        return [{"tool": "t1", "inputs": {}}], []
+
+    async def slow_execute_plan_async(plan):
+        await asyncio.sleep(10)
+
+    async def fake_aggregate_async(*args, **kwargs):
+        calls["aggregate"] += 1
+
+    monkeypatch.setattr(mcp, "plan_async", fake_plan_async)
+    monkeypatch.setattr(mcp, "execute_plan_async", slow_execute_plan_async)
+    monkeypatch.setattr(mcp, "aggregate_async", fake_aggregate_async)
+
+    payload = {"goal": "g", "objective": "o", "expected_outcome": "e", "parameters": {}}
+    task = asyncio.create_task(mcp.process_user_request_async(payload, session_id="cancel1"))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert calls["aggregate"] == 0
+    assert mcp.SESSION_STORE.get("cancel1") is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_follow_up_leaves_existing_session_unchanged(monkeypatch):
+    from core.session_store import InMemorySessionBackend
+
+    store = InMemorySessionBackend()
+    stored = {
+        "memory": {},
+        "last_response": {"next_action": "ask_user", "is_final": False, "missing": ["accountId"]},
+        "original_goal": "show cards",
+        "original_objective": "o",
+        "original_expected_outcome": "e",
+        "planner_llm": {},
+    }
+    store.set("cancel2", stored)
+    monkeypatch.setattr(mcp, "SESSION_STORE", store)
+
+    async def slow_plan_async(goal, objective, outcome, memory):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(mcp, "plan_async", slow_plan_async)
+
+    payload = {"goal": "105929", "objective": "", "expected_outcome": ""}
+    task = asyncio.create_task(mcp.process_user_request_async(payload, session_id="cancel2"))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert store.get("cancel2")["memory"] == {}
+
+
+class _DisconnectingRequest:
+    """Minimal stand-in for a Starlette Request whose client leaves after `delay` seconds."""
+
+    class url:
+        path = "/mcp"
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def receive(self):
+        await asyncio.sleep(self.delay)
+        return {"type": "http.disconnect"}
+
+
+@pytest.mark.asyncio
+async def test_run_until_disconnected_cancels_work():
+    state = {"cancelled": False}
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    completed, result = await main.run_until_disconnected(_DisconnectingRequest(0.05), slow())
+    await asyncio.sleep(0)
+
+    assert completed is False and result is None
+    assert state["cancelled"] is True
+
+
+@pytest.mark.asyncio
+async def test_run_until_disconnected_returns_result():
+    async def quick():
+        return 42
+
+    assert await main.run_until_disconnected(_DisconnectingRequest(10), quick()) == (True, 42)
+
+
+def test_websocket_close_cancels_inflight(monkeypatch):
+    state = {"started": 0, "cancelled": 0}
+
+    async def slow_process(params, session_id, on_event=None):
+        state["started"] += 1
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] += 1
+            raise
+
+    monkeypatch.setattr(rpc, "process_user_request_async", slow_process)
+    client = TestClient(main.app)
+    call = {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": "g", "objective": "o", "expected_outcome": "e"},
+        "id": 1,
+    }
+    with client.websocket_connect("/ws/mcp") as ws:
+        ws.send_json(call)
+        ws.send_json({**call, "id": 2})
+        # round-trip a cheap call so both slow calls are surely in flight
+        ws.send_json({"jsonrpc": "2.0", "method": "unknown", "id": 3})
+        assert ws.receive_json()["id"] == 3
+
+    assert state["started"] == 2
+    assert state["cancelled"] == 2
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core.catalog import ToolCatalog, etag_matches
+
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "tool_registry_llm.json"
+    path.write_text(json.dumps([{"name": "tool_a", "description": "A"}]))
+    return path
+
+
+def test_catalog_builds_once_and_caches_body(registry, monkeypatch):
+    catalog = ToolCatalog(registry)
+    body, etag = catalog.capabilities()
+
+    # No file change → no reload, same bytes object served again
+    monkeypatch.setattr("builtins.open", lambda *a, **k: pytest.fail("registry re-read"))
+    body2, etag2 = catalog.capabilities()
+    assert body2 is body
+    assert etag2 == etag
+    assert json.loads(body)["tools"][0]["name"] == "tool_a"
+
+
+def test_catalog_rebuilds_when_registry_changes(registry):
+    catalog = ToolCatalog(registry)
+    _, etag = catalog.capabilities()
+
+    registry.write_text(json.dumps([{"name": "tool_a"}, {"name": "tool_b"}]))
+    os.utime(registry, ns=(1, 1))
+
+    _, new_etag = catalog.capabilities()
+    assert new_etag != etag
+    assert [t["name"] for t in catalog.tools] == ["tool_a", "tool_b"]
+
+
+def test_catalog_missing_registry_serves_empty_tools(tmp_path):
+    catalog = ToolCatalog(tmp_path / "missing.json")
+    assert catalog.tools == []
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+
+
+def test_capabilities_conditional_get():
+    client = TestClient(main.app)
+    first = client.get("/capabilities")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    # the body may be sent gzip/br-encoded, so the validator must be weak
+    assert etag.startswith('W/"')
+
+    second = client.get("/capabilities", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+def test_initialize_and_tools_list_use_catalog():
+    client = TestClient(main.app)
+    init = client.post("/mcp", json={"jsonrpc": "2.0", "method": "initialize", "id": 1}).json()
+    assert init["result"]["mcp_version"] == "1.0.0"
+    assert isinstance(init["result"]["tools"], list)
+
+    listed = client.post("/mcp", json={"jsonrpc": "2.0", "method": "tools/list", "id": 2}).json()
+    assert listed["result"] == init["result"]["tools"]
@@ -0,0 +1,124 @@
+import os
+import sys
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import rpc
+from core.aggregator import aggregate, aggregate_async, deterministic_step_summary, render_template
+from core.utils import load_tool_contracts_from_folder
+
+CONTRACTS = load_tool_contracts_from_folder("schema/tool_contract")
+TX = "tool_get_holdings_accounts_transactions"
+
+TX_RESULT = {
+    "header": {"data": {"currency": "USD"}},
+    "body": [
+        {"bookingDate": "2025-03-01", "creditAmount": "1,000.00"},
+        {"bookingDate": "2025-01-02", "creditAmount": "3,210.50"},
+        {"bookingDate": "2025-02-10", "creditAmount": "0.00"},
+    ],
+}
+
+
+def no_llm(prompt):
+    raise AssertionError("LLM called in deterministic mode")
+
+
+def test_transaction_summary_from_contract_template():
+    summary = deterministic_step_summary(TX_RESULT, {}, CONTRACTS[TX], {"accountId": "105929"})
+    assert summary == "3 transactions between 2025-01-02 and 2025-03-01, total credits 4,210.50 USD."
+
+
+def test_missing_fields_fall_back_to_count_and_filters_are_mentioned():
+    result = {"body": [{"narratives": []}]}
+    summary = deterministic_step_summary(result, {"narrative": "ATM"}, CONTRACTS[TX], {"accountId": "105929"})
+    assert summary == "1 transaction returned (filtered locally by narrative)."
+
+
+def test_render_template_dates_in_text_form():
+    context = {"items": [{"d": "01 MAY 2024"}, {"d": "19 APR 2024"}], "count": 2}
+    assert render_template("{earliest:d} to {latest:d}", context) == "19 APR 2024 to 01 MAY 2024"
+
+
+def test_aggregate_deterministic_makes_no_llm_calls():
+    steps = [
+        {"tool": TX, "inputs": {"accountId": "105929"}, "result": TX_RESULT},
+        {"tool": TX, "inputs": {"accountId": "108596"}, "result": {"body": []}},
+    ]
+    result = aggregate(steps, "totals", no_llm, CONTRACTS, summary_mode="deterministic")
+
+    assert result["summary"] == (
+        "Account 105929: 3 transactions between 2025-01-02 and 2025-03-01, total credits 4,210.50 USD. "
+        "Account 108596: No data found for this query."
+    )
+    assert result["raw_text"][TX]["step2"] == "No data found for this query."
+
+
+@pytest.mark.asyncio
+async def test_aggregate_async_deterministic_emits_events():
+    events = []
+
+    async def on_event(stage, data):
+        events.append(stage)
+
+    steps = [{"tool": TX, "inputs": {"accountId": "105929"}, "result": TX_RESULT}]
+    result = await aggregate_async(steps, "totals", no_llm, CONTRACTS, on_event=on_event, summary_mode="deterministic")
+
+    assert result["summary"].startswith("Account 105929: 3 transactions")
+    assert events == ["step_summary", "summary"]
+
+
+@pytest.mark.asyncio
+async def test_tools_call_rejects_unknown_summary_mode():
+    params = {"goal": "g", "objective": "o", "expected_outcome": "e", "summary_mode": "fastest"}
+    resp = await rpc.dispatch_rpc({"jsonrpc": "2.0", "method": "tools/call", "params": params, "id": 1})
+    assert resp["error"]["code"] == -32602
+    assert "summary_mode" in resp["error"]["message"]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    import core.mcp as mcp
+    from core.session_store import InMemorySessionBackend
+
+    async def fake_plan(goal, objective, expected_outcome, memory):
+        return [{"tool": TX, "inputs": {"accountId": "105929"}}, {"tool": TX, "inputs": {"accountId": "108596"}}], []
+
+    async def fake_execute(plan):
+        step = plan[0]
+        return {"step1": TX_RESULT if step["inputs"]["accountId"] == "105929" else {"body": []}}
+
+    monkeypatch.setattr(mcp, "SESSION_STORE", InMemorySessionBackend())
+    monkeypatch.setattr(mcp, "plan_async", fake_plan)
+    monkeypatch.setattr(mcp, "execute_plan_async", fake_execute)
+    return mcp
+
+
+@pytest.mark.asyncio
+async def test_pipeline_summary_names_each_account(pipeline):
+    request = {"goal": "transactions for 105929 and 108596", "objective": "", "expected_outcome": "",
+               "summary_mode": "deterministic"}
+    response = await pipeline.process_user_request_async(request, "det1")
+
+    assert response["final_summary"] == (
+        "Account 105929: 3 transactions between 2025-01-02 and 2025-03-01, total credits 4,210.50 USD. "
+        "Account 108596: No data found for this query."
+    )
+
+
+@pytest.mark.asyncio
+async def test_pipeline_unavailable_summary_names_each_account(pipeline, monkeypatch):
+    from core.llm_backends import LLMTimeoutError
+
+    async def timing_out(prompt):
+        raise LLMTimeoutError("deadline")
+
+    monkeypatch.setattr(pipeline, "call_gemma3_async", timing_out)
+    request = {"goal": "transactions for 105929 and 108596", "objective": "", "expected_outcome": "",
+               "summary_mode": "per_step"}
+    response = await pipeline.process_user_request_async(request, "det2")
+
+    assert response["final_summary"].startswith("Summary unavailable. Account 105929: 3 transactions")
+    assert "Account 108596: No data found for this query." in response["final_summary"]
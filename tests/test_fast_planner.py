@@ -0,0 +1,76 @@
+import os
+import sys
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import planner
+from core.fast_planner import FastPlanner
+
+TX = "tool_get_holdings_accounts_transactions"
+CARDS = "tool_get_holdings_accounts_cards"
+
+
+@pytest.fixture
+def fast():
+    return FastPlanner(planner.tool_registry_llm, planner.tool_contracts, threshold=0.8)
+
+
+def test_single_tool_request_is_planned_directly(fast):
+    result = fast.plan("get account transactions for accounts 105929, 108596", "", "", {})
+
+    assert result.tool == TX
+    assert [step["inputs"] for step in result.plan] == [{"accountId": "105929"}, {"accountId": "108596"}]
+    assert result.missing == []
+
+
+def test_ids_bind_only_after_the_input_noun(fast):
+    assert fast.bound_ids("accounts 105929, 108596 and 109213 for customer 100210", "accountId") == [
+        "105929", "108596", "109213"
+    ]
+    assert fast.bound_ids("account no. 105929", "accountId") == ["105929"]
+    assert fast.bound_ids("customer 100210", "accountId") == []
+
+
+def test_filter_cues_come_from_contracts(fast):
+    cues = fast.filter_cues[TX]
+    assert {"narrative", "booking", "credit"} <= cues
+    # the tool's own name words and required input noun are not filters
+    assert "transaction" not in cues and "account" not in cues
+
+
+def test_missing_id_is_asked_for(fast):
+    result = fast.plan("view account cards details", "", "", {})
+    assert result.plan == [{"tool": CARDS, "inputs": {"accountId": "<accountId>"}}]
+    assert result.missing == ["accountId"]
+
+    # the follow-up turn supplies it through memory
+    assert fast.plan("view account cards details", "", "", {"accountId": "105929"}).plan[0]["inputs"] == {"accountId": "105929"}
+
+
+@pytest.mark.parametrize("goal", [
+    "get account transactions for account 108596 and view cards details for account 105929",  # two tools
+    "Find ATM withdrawals between 01 Apr 2024 and 30 Apr 2024 for account 105929",            # filters
+    "Find transactions close to 3400 for account 105996",                                      # amount
+    "get customer account details",                                                            # no tool keyword
+    "show transactions for customer 100210",                                                   # ID not after "account"
+    "get account transactions for account 105929 with narrative ATM",                          # contract filter field
+    "show cards with card status CARD.ISSUED for account 105929",                              # contract filter field
+    "get account transactions for account 105929 but not for 108596",                          # negation
+    "get account transactions for account 105929 and 3 others",                                # number that doesn't bind
+])
+def test_ambiguous_or_filtered_requests_go_to_the_llm(fast, goal):
+    assert fast.plan(goal, "", "", {}) is None
+
+
+def test_planner_uses_fast_path_before_llm(monkeypatch, fast):
+    def llm_must_not_run(prompt):
+        raise AssertionError("LLM planner called")
+
+    monkeypatch.setattr(planner, "FAST_PLANNER", fast)
+    monkeypatch.setattr(planner, "PLAN_CACHE", None)
+    monkeypatch.setattr(planner, "call_gemma3", llm_must_not_run)
+
+    plan, missing = planner.plan("show card details for account 105929", "o", "e", {})
+    assert plan == [{"tool": CARDS, "inputs": {"accountId": "105929"}}] and missing == []
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import asyncio
+import httpx
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.llm as llm
+from core.llm_backends import (
+    FakeLLMBackend, OllamaHTTPBackend, OllamaSubprocessBackend, create_llm_backend,
+)
+from core.planner import build_planner_prompt, parse_planner_response
+
+
+@pytest.fixture(autouse=True)
+def no_llm_cache(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_CACHE", None)
+
+
+def _ollama_handler(seen):
+    def handler(request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, json={"model": "gemma3:latest", "response": "  hi there \n", "done": True})
+    return handler
+
+
+def _http_backend(handler, fallback=None):
+    backend = OllamaHTTPBackend("gemma3:latest", "http://ollama", "30m", 10, fallback=fallback)
+    transport = httpx.MockTransport(handler)
+    backend._client = httpx.Client(base_url="http://ollama", transport=transport)
+    backend._async_client = httpx.AsyncClient(base_url="http://ollama", transport=transport)
+    return backend
+
+
+def test_call_gemma3_uses_http_api(monkeypatch):
+    seen = []
+    monkeypatch.setattr(llm, "BACKEND", _http_backend(_ollama_handler(seen)))
+
+    assert llm.call_gemma3("hello") == "hi there"
+    assert seen[0]["prompt"] == "hello"
+    assert seen[0]["stream"] is False
+    assert seen[0]["keep_alive"] == "30m"
+
+
+@pytest.mark.asyncio
+async def test_call_gemma3_async_uses_http_api(monkeypatch):
+    seen = []
+    monkeypatch.setattr(llm, "BACKEND", _http_backend(_ollama_handler(seen)))
+
+    assert await llm.call_gemma3_async("hello") == "hi there"
+    assert seen[0]["model"] == "gemma3:latest"
+
+
+def _unreachable(request):
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+def test_http_backend_falls_back_to_subprocess(monkeypatch):
+    fallback = OllamaSubprocessBackend("gemma3:latest")
+    fallback.command = ["cat"]
+    monkeypatch.setattr(llm, "BACKEND", _http_backend(_unreachable, fallback=fallback))
+
+    assert llm.call_gemma3("echoed prompt") == "echoed prompt"
+
+
+@pytest.mark.asyncio
+async def test_http_backend_without_fallback_raises(monkeypatch):
+    monkeypatch.setattr(llm, "BACKEND", _http_backend(_unreachable))
+
+    with pytest.raises(httpx.ConnectError):
+        await llm.call_gemma3_async("hello")
+
+
+def test_create_llm_backend_selects_by_name():
+    settings = {"model": "m", "host": "http://h", "keep_alive": "5m", "timeout": 1, "subprocess_fallback": True}
+    assert isinstance(create_llm_backend("ollama_subprocess", **settings), OllamaSubprocessBackend)
+    http = create_llm_backend("ollama_http", **settings)
+    assert isinstance(http, OllamaHTTPBackend) and isinstance(http.fallback, OllamaSubprocessBackend)
+    assert isinstance(create_llm_backend("fake", **settings), FakeLLMBackend)
+    with pytest.raises(ValueError):
+        create_llm_backend("openai", **settings)
+
+
+def test_fake_backend_plan_parses_like_a_real_one():
+    fake = FakeLLMBackend()
+    raw = fake.generate(build_planner_prompt("show statements", "o", "e", {"accountId": "106038"}))
+    result = parse_planner_response(raw, {"accountId": "106038"}, {})
+
+    assert result["is_final"] is True
+    assert result["plan"][0]["inputs"] == {"accountId": "106038"}
+    assert fake.generate("Summarize this step") == "Fake summary (19 prompt characters)."
+
+
+@pytest.mark.asyncio
+async def test_fake_backend_latency_and_canned_responses(tmp_path):
+    fake = FakeLLMBackend(latency=0.05, responses={"summary": "Balances look fine"})
+
+    started = asyncio.get_running_loop().time()
+    assert await fake.generate_async("summarize") == "Balances look fine"
+    assert asyncio.get_running_loop().time() - started >= 0.05
+    assert [f async for f in fake.stream_async("summarize")] == ["Balances", " look", " fine"]
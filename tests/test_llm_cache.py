@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.llm as llm
+from core.llm_cache import LLMCache, call_site
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = LLMCache(str(tmp_path / "llm_cache"), size_limit=10 * 1024 * 1024,
+                     ttls={"planner": 60, "summary": 0.05}, default_ttl=60)
+    monkeypatch.setattr(llm, "LLM_CACHE", cache)
+    return cache
+
+
+def test_repeated_prompt_is_served_from_cache(monkeypatch, cache):
+    calls = []
+    monkeypatch.setattr(llm, "_generate", lambda prompt: (calls.append(prompt) or "plan json", True))
+
+    with call_site("planner"):
+        assert llm.call_gemma3("same prompt") == "plan json"
+        assert llm.call_gemma3("same prompt") == "plan json"
+
+    assert calls == ["same prompt"]
+    stats = cache.stats()
+    assert stats["by_call_site"]["planner"] == {"hits": 1, "misses": 1}
+    assert stats["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_summary_entries_use_their_own_ttl(monkeypatch, cache):
+    calls = []
+
+    async def fake_generate(prompt):
+        calls.append(prompt)
+        return "summary", True
+
+    monkeypatch.setattr(llm, "_generate_async", fake_generate)
+
+    with call_site("summary"):
+        await llm.call_gemma3_async("p")
+        time.sleep(0.1)
+        await llm.call_gemma3_async("p")
+    with call_site("planner"):
+        await llm.call_gemma3_async("q")
+        await llm.call_gemma3_async("q")
+
+    assert calls == ["p", "p", "q"]
+
+
+def test_empty_responses_are_not_cached(monkeypatch, cache):
+    calls = []
+    monkeypatch.setattr(llm, "_generate", lambda prompt: (calls.append(prompt) or "", True))
+
+    llm.call_gemma3("p")
+    llm.call_gemma3("p")
+
+    assert len(calls) == 2
+
+
+def test_key_includes_model(monkeypatch, cache):
+    cache.set("model-a", "p", "from a")
+    assert cache.get("model-a", "p") == "from a"
+    assert cache.get("model-b", "p") is None
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = LLMCache(str(tmp_path / "small"), size_limit=2 * 1024 * 1024, ttls={}, default_ttl=60)
+    for i in range(100):
+        cache.set("m", f"prompt {i}", "x" * 64 * 1024)
+    assert cache.stats()["size_bytes"] <= 3 * 1024 * 1024
+    assert cache.get("m", "prompt 0") is None
+    assert cache.get("m", "prompt 99") is not None
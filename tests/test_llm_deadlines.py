@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import pytest
+from collections import Counter
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.llm as llm
+from core.aggregator import aggregate
+from core.llm_backends import FakeLLMBackend, LLMTimeoutError, OllamaSubprocessBackend
+from core.llm_cache import LLMCache, call_site
+from core.utils import load_tool_contracts_from_folder
+
+
+@pytest.fixture
+def deadlines(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_CACHE", None)
+    monkeypatch.setattr(llm, "FALLBACK_BACKEND", None)
+    monkeypatch.setattr(llm, "DEADLINES", {"planner": 0.1, "step_summary": 0.1, "final_summary": 0.1})
+    monkeypatch.setattr(llm, "DEADLINE_STATS", {"timeouts": Counter(), "fallbacks": Counter()})
+    monkeypatch.setattr(llm, "BACKEND", FakeLLMBackend(latency=5))
+
+
+def test_call_past_deadline_raises_and_is_counted(deadlines):
+    started = time.monotonic()
+    with call_site("planner"), pytest.raises(LLMTimeoutError):
+        llm.call_gemma3("plan this")
+    assert time.monotonic() - started < 1
+    assert llm.deadline_stats()["timeouts"] == {"planner": 1}
+
+
+def test_call_past_deadline_retries_on_fallback_model_uncached(deadlines, monkeypatch, tmp_path):
+    cache = LLMCache(str(tmp_path / "cache"), size_limit=2**20, ttls={}, default_ttl=60)
+    monkeypatch.setattr(llm, "LLM_CACHE", cache)
+    monkeypatch.setattr(llm, "FALLBACK_BACKEND", FakeLLMBackend(responses={"summary": "small model answer"}))
+
+    with call_site("step_summary"):
+        assert llm.call_gemma3("summarize") == "small model answer"
+
+    assert llm.deadline_stats()["fallbacks"] == {"step_summary": 1}
+    assert cache.get(llm.BACKEND.model, "summarize") is None
+
+
+@pytest.mark.asyncio
+async def test_async_deadline_kills_generation(deadlines, monkeypatch):
+    backend = OllamaSubprocessBackend("gemma3:latest")
+    backend.command = ["sleep", "30"]
+    monkeypatch.setattr(llm, "BACKEND", backend)
+
+    started = time.monotonic()
+    with call_site("final_summary"), pytest.raises(LLMTimeoutError):
+        await llm.call_gemma3_async("summarize")
+    assert time.monotonic() - started < 2
+    assert llm.deadline_stats()["timeouts"] == {"final_summary": 1}
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_before_first_fragment(deadlines, monkeypatch):
+    monkeypatch.setattr(llm, "FALLBACK_BACKEND", FakeLLMBackend(responses={"summary": "quick answer"}))
+
+    with call_site("final_summary"):
+        fragments = [fragment async for fragment in llm.stream_gemma3_async("summarize")]
+
+    assert fragments == ["quick answer"]
+    assert llm.deadline_stats()["fallbacks"] == {"final_summary": 1}
+
+
+def test_summaries_degrade_to_raw_data_templates():
+    contracts = load_tool_contracts_from_folder("schema/tool_contract")
+    tool = "tool_get_holdings_accounts_transactions"
+    steps = [{
+        "tool": tool,
+        "inputs": {"accountId": "105929"},
+        "result": {"header": {"data": {"currency": "USD"}},
+                   "body": [{"bookingDate": "01 MAY 2024", "creditAmount": "5,000.00"}]},
+    }]
+
+    def timing_out(prompt):
+        raise LLMTimeoutError("deadline")
+
+    result = aggregate(steps, "totals", timing_out, contracts)
+
+    step = "1 transaction between 01 MAY 2024 and 01 MAY 2024, total credits 5,000.00 USD."
+    assert result["raw_text"][tool]["step1"] == f"Summary unavailable. {step}"
+    assert result["summary"] == f"Summary unavailable. Account 105929: {step}"
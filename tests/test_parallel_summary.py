@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.aggregator import aggregate, aggregate_async
+from core.llm_cache import CALL_SITE
+
+TOOL = "tool_get_holdings_accounts_balances"
+STEPS = [
+    {"tool": TOOL, "inputs": {"accountId": str(100000 + i)}, "result": {"body": [{"n": i}]}}
+    for i in range(5)
+]
+
+
+class Tracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+
+def step_number(prompt):
+    return prompt.split("for step Step ")[1].split(" ")[0] if "for step Step " in prompt else "final"
+
+
+def test_step_summaries_run_in_parallel_and_keep_step_order():
+    tracker = Tracker()
+    sites = set()
+
+    def llm(prompt):
+        tracker.enter()
+        sites.add(CALL_SITE.get())
+        # later steps finish first
+        time.sleep(0.05 if step_number(prompt) == "final" else 0.02 * (6 - int(step_number(prompt))))
+        tracker.leave()
+        return f"summary {step_number(prompt)}"
+
+    result = aggregate(STEPS, "balances", llm, {}, parallelism=2)
+
+    assert tracker.peak == 2
+    # call sites reach the worker threads
+    assert sites == {"step_summary", "final_summary"}
+    assert list(result["raw_text"][TOOL].values()) == [f"summary {i}" for i in range(1, 6)]
+    assert result["summary"] == "summary final"
+
+
+@pytest.mark.asyncio
+async def test_async_step_summaries_are_bounded_and_reassembled():
+    tracker = Tracker()
+    events = []
+
+    async def llm(prompt):
+        tracker.enter()
+        n = step_number(prompt)
+        await asyncio.sleep(0.01 if n == "final" else 0.01 * (6 - int(n)))
+        tracker.leave()
+        return f"summary {n}"
+
+    async def on_event(stage, data):
+        events.append((stage, data.get("step")))
+
+    result = await aggregate_async(STEPS, "balances", llm, {}, on_event=on_event, parallelism=3)
+
+    assert tracker.peak == 3
+    assert result["steps"][0].endswith("summary 1") and result["steps"][4].endswith("summary 5")
+    assert sorted(step for stage, step in events if stage == "step_summary") == [f"step{i}" for i in range(1, 6)]
+    assert events[-1] == ("summary", None)
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import planner
+from core.plan_cache import PlanCache, normalize_intent
+
+TOOL = "tool_get_holdings_accounts_transactions"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    contracts = tmp_path / "tool_contract"
+    contracts.mkdir()
+    (contracts / "a.json").write_text("{}")
+    registry = tmp_path / "registry.json"
+    registry.write_text("[]")
+    return PlanCache(str(tmp_path / "plans"), 60, watch_paths=[contracts, registry])
+
+
+def test_normalize_intent_slots_out_ids():
+    template, slots = normalize_intent("Balances for accounts 105996, 106194", "retrieve", "Summary")
+    assert template == "balances for accounts <1>, <2> | retrieve | summary"
+    assert slots == ["105996", "106194"]
+
+
+def test_cached_plan_is_reinstantiated_with_new_ids(cache):
+    plan = [{"tool": TOOL, "inputs": {"accountId": "105996"}}, {"tool": TOOL, "inputs": {"accountId": "106194"}}]
+    assert cache.put("Transactions for accounts 105996, 106194", "o", "e", {}, plan)
+
+    hit = cache.get("transactions for accounts 108596, 105953", "o", "e", {})
+
+    assert [step["inputs"]["accountId"] for step in hit] == ["108596", "105953"]
+    assert cache.get("transactions for account 108596", "o", "e", {}) is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_mixed_case_ids_replay_unchanged(cache):
+    plan = [{"tool": TOOL, "inputs": {"arrangementId": "AA19354ABCDE"}}]
+    assert cache.put("Show arrangement AA19354ABCDE", "o", "e", {}, plan)
+
+    hit = cache.get("show arrangement AA20001XYZ", "o", "e", {})
+
+    assert hit == [{"tool": TOOL, "inputs": {"arrangementId": "AA20001XYZ"}}]
+
+
+def test_trailing_punctuation_is_not_part_of_the_slot(cache):
+    plan = [{"tool": TOOL, "inputs": {"accountId": "105996"}}, {"tool": TOOL, "inputs": {"accountId": "106194"}}]
+    assert cache.put("Transactions for accounts 105996, 106194.", "o", "e", {}, plan)
+
+    hit = cache.get("transactions for accounts 108596, 108155.", "o", "e", {})
+
+    assert [step["inputs"]["accountId"] for step in hit] == ["108596", "108155"]
+    assert normalize_intent("accounts 108155.", "", "")[1] == ["108155"]
+
+
+def test_numeric_inputs_keep_their_type(cache):
+    plan = [{"tool": TOOL, "inputs": {"accountId": "105929", "limit": 5, "minAmount": 12.5}}]
+    assert cache.put("last 5 transactions over 12.5 for account 105929", "o", "e", {}, plan)
+
+    hit = cache.get("last 7 transactions over 40 for account 108596", "o", "e", {})
+    assert hit[0]["inputs"] == {"accountId": "108596", "limit": 7, "minAmount": 40.0}
+
+    # a value that can't be cast back is a miss, not a wrong-typed plan
+    assert cache.get("last 7x transactions over 40 for account 108596", "o", "e", {}) is None
+
+
+def test_known_parameters_are_referenced_not_copied(cache):
+    cache.put("show cards", "o", "e", {"accountId": "AA1"}, [{"tool": TOOL, "inputs": {"accountId": "AA1"}}])
+    assert cache.get("show cards", "o", "e", {"accountId": "BB2"})[0]["inputs"] == {"accountId": "BB2"}
+    # a different set of known parameters is a different key
+    assert cache.get("show cards", "o", "e", {}) is None
+
+
+def test_plans_with_untraceable_values_are_not_cached(cache):
+    plan = [{"tool": TOOL, "inputs": {"accountId": "105929", "startDate": "2024-04-01"}}]
+    assert cache.put("ATM withdrawals in April for account 105929", "o", "e", {}, plan) is False
+
+
+def test_contract_change_invalidates(cache, tmp_path):
+    cache.put("show cards for 1", "o", "e", {}, [{"tool": TOOL, "inputs": {"accountId": "1"}}])
+    assert cache.get("show cards for 2", "o", "e", {}) is not None
+
+    time.sleep(0.01)
+    (tmp_path / "tool_contract" / "a.json").write_text('{"changed": true}')
+
+    assert cache.get("show cards for 2", "o", "e", {}) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_planner_skips_llm_on_hit(monkeypatch, cache):
+    calls = []
+
+    def fake_llm(prompt):
+        calls.append(prompt)
+        return json.dumps({"goal": "g", "fallback_response": "", "tool_chain": [{"tool": TOOL, "inputs": {"accountId": "105929"}}]})
+
+    monkeypatch.setattr(planner, "PLAN_CACHE", cache)
+    monkeypatch.setattr(planner, "FAST_PLANNER", None)
+    monkeypatch.setattr(planner, "call_gemma3", fake_llm)
+
+    first, _ = planner.plan("get account transactions for account 105929", "o", "e", {})
+    second, missing = planner.plan("get account transactions for account 108596", "o", "e", {})
+
+    assert len(calls) == 1
+    assert first[0]["inputs"]["accountId"] == "105929"
+    assert second[0]["inputs"]["accountId"] == "108596" and missing == []
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import httpx
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.llm as llm
+import core.mcp as mcp
+from core import planner, tokens
+from core.llm_backends import OllamaHTTPBackend
+from core.session_store import InMemorySessionBackend
+
+TOOL = "tool_get_holdings_accounts_statements"
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken_download(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding_failed", True)
+
+
+def test_planner_prompt_starts_with_static_prefix():
+    first = planner.build_planner_prompt("statements for 106038", "o1", "e1", {})
+    second = planner.build_planner_prompt("cards for 108154", "o2", "e2", {"accountId": "108154"})
+
+    assert first.startswith(planner.PLANNER_INSTRUCTIONS)
+    shared = os.path.commonprefix([first, second])
+    assert "**Tools:**" in shared and "106038" not in shared
+
+
+@pytest.mark.asyncio
+async def test_follow_up_turn_continues_planner_context(monkeypatch):
+    requests = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        account = "<accountId>" if len(requests) == 1 else "106038"
+        plan = {"goal": "g", "fallback_response": "", "tool_chain": [{"tool": TOOL, "inputs": {"accountId": account}}]}
+        return httpx.Response(200, json={"response": json.dumps(plan), "context": [len(requests)] * 3, "done": True})
+
+    backend = OllamaHTTPBackend("gemma3:latest", "http://ollama", "30m", 10)
+    backend._async_client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm, "BACKEND", backend)
+    monkeypatch.setattr(llm, "LLM_CACHE", None)
+    monkeypatch.setattr(mcp, "SESSION_STORE", InMemorySessionBackend())
+    monkeypatch.setattr(planner, "FAST_PLANNER", None)
+
+    async def fake_execute(plan):
+        return {"step1": {"body": []}}
+
+    async def fake_aggregate(tool_outputs, expected_outcome, llm_call, TOOL_CONTRACTS, on_event=None, llm_stream=None, summary_mode="per_step", parallelism=1):
+        return {"summary": "ok", "steps": [], "raw_result": {}, "raw_text": {}}
+
+    monkeypatch.setattr(mcp, "execute_plan_async", fake_execute)
+    monkeypatch.setattr(mcp, "aggregate_async", fake_aggregate)
+
+    first = await mcp.process_user_request_async({"goal": "show statements", "objective": "o", "expected_outcome": "e"}, "ctx1")
+    second = await mcp.process_user_request_async({"goal": "106038", "objective": "", "expected_outcome": ""}, "ctx1")
+
+    assert first["missing"] == ["accountId"] and second["is_final"] is True
+    assert "context" not in requests[0]
+    assert requests[1]["context"] == [1, 1, 1]
+    assert "**Tools:**" not in requests[1]["prompt"] and "106038" in requests[1]["prompt"]
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import httpx
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.llm as llm
+from core import planner, tokens
+from core.json_repair import loads_lenient, repair_json
+from core.llm_backends import OllamaHTTPBackend
+
+TOOL = "tool_get_holdings_accounts_statements"
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding_failed", True)
+    monkeypatch.setattr(llm, "LLM_CACHE", None)
+
+
+def test_repair_closes_truncated_output():
+    truncated = '```json\n{"goal": "g", "fallback_response": "", "tool_chain": [{"tool": "t", "inputs": {"accountId": "1060'
+    assert loads_lenient(truncated)["tool_chain"][0]["inputs"] == {"accountId": "1060"}
+
+
+def test_repair_drops_chatter_and_trailing_commas():
+    assert json.loads(repair_json('Sure! {"a": [1, 2,], "b": {"c": 1,},} Hope this helps')) == {"a": [1, 2], "b": {"c": 1}}
+
+
+def test_planner_requests_plan_schema_format(monkeypatch):
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        plan = {"goal": "g", "fallback_response": "", "tool_chain": [{"tool": TOOL, "inputs": {"accountId": "106038"}}]}
+        return httpx.Response(200, json={"response": json.dumps(plan), "done": True})
+
+    backend = OllamaHTTPBackend("gemma3:latest", "http://ollama", "30m", 10)
+    backend._client = httpx.Client(base_url="http://ollama", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm, "BACKEND", backend)
+
+    result = planner.generate_reasoned_plan("statements", "o", "e", {})
+
+    assert bodies[0]["format"] == planner.PLAN_SCHEMA
+    assert TOOL in bodies[0]["format"]["properties"]["tool_chain"]["items"]["properties"]["tool"]["enum"]
+    assert result["plan"][0]["inputs"] == {"accountId": "106038"}
+
+
+def test_planner_retry_budget_is_bounded(monkeypatch):
+    calls = []
+
+    def garbage(prompt):
+        calls.append(prompt)
+        return "I cannot help with that."
+
+    monkeypatch.setattr(planner, "call_gemma3", garbage)
+    monkeypatch.setattr(planner, "PLANNER_MAX_RETRIES", 2)
+
+    with pytest.raises(ValueError):
+        planner.generate_reasoned_plan("g", "o", "e", {})
+    assert len(calls) == 3
+    # no context came back, so every retry resends the full prompt
+    assert len(set(calls)) == 1
+
+
+def test_planner_retry_continues_failed_output_context(monkeypatch):
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        if len(bodies) == 1:
+            return httpx.Response(200, json={"response": "I think the plan is", "context": [7, 7], "done": True})
+        plan = {"goal": "g", "fallback_response": "", "tool_chain": [{"tool": TOOL, "inputs": {"accountId": "106038"}}]}
+        return httpx.Response(200, json={"response": json.dumps(plan), "context": [8, 8], "done": True})
+
+    backend = OllamaHTTPBackend("gemma3:latest", "http://ollama", "30m", 10)
+    backend._client = httpx.Client(base_url="http://ollama", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm, "BACKEND", backend)
+
+    result = planner.generate_reasoned_plan("statements for 106038", "o", "e", {})
+
+    assert result["plan"][0]["inputs"] == {"accountId": "106038"}
+    assert "**Tools:**" in bodies[0]["prompt"]
+    assert bodies[1]["prompt"] == planner.PLAN_RETRY_PROMPT
+    assert bodies[1]["context"] == [7, 7]
+
+
+@pytest.mark.asyncio
+async def test_planner_retries_once_then_succeeds(monkeypatch):
+    replies = iter(["no json here", json.dumps({"goal": "g", "fallback_response": "", "tool_chain": []})])
+
+    async def flaky(prompt):
+        return next(replies)
+
+    monkeypatch.setattr(planner, "call_gemma3_async", flaky)
+
+    result = await planner.generate_reasoned_plan_async("g", "o", "e", {})
+    assert result["plan"] == []
+
+
+@pytest.mark.parametrize("chain", [
+    ["tool_get_holdings_accounts_cards"],
+    [{"inputs": {}}],
+    [{"tool": "tool_get_holdings_accounts_cards", "inputs": ["x"]}],
+    "tool_get_holdings_accounts_cards",
+])
+def test_malformed_tool_chain_raises_value_error(chain):
+    raw = json.dumps({"goal": "g", "fallback_response": "", "tool_chain": chain})
+    with pytest.raises(ValueError):
+        planner.parse_planner_response(raw, {}, {})
+
+
+@pytest.mark.asyncio
+async def test_planner_retries_on_malformed_tool_chain(monkeypatch):
+    replies = iter([
+        json.dumps({"goal": "g", "fallback_response": "", "tool_chain": ["tool_get_holdings_accounts_cards"]}),
+        json.dumps({"goal": "g", "fallback_response": "", "tool_chain": []}),
+    ])
+    calls = []
+
+    async def flaky(prompt):
+        calls.append(prompt)
+        return next(replies)
+
+    monkeypatch.setattr(planner, "call_gemma3_async", flaky)
+
+    result = await planner.generate_reasoned_plan_async("g", "o", "e", {})
+    assert result["plan"] == []
+    assert len(calls) == 2
@@ -0,0 +1,94 @@
+import os
+import sys
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core import rpc
+from core.mcp import shape_response
+from core.compression import accepted_encodings
+
+FULL = {
+    "plan": [{"tool": "t1", "inputs": {"accountId": "1"}}],
+    "next_action": "respond_with_result",
+    "final_summary": "All good.",
+    "raw_result": {"t1": {"step1": {"body": [{"narrative": "x" * 50}] * 100}}},
+    "raw_text": {"t1": {"step1": "One hundred transactions."}},
+    "is_final": True,
+    "memory_passed": {},
+    "session_id": "s",
+}
+
+
+def test_shape_response_modes():
+    assert shape_response(FULL, "full") is FULL
+
+    steps = shape_response(FULL, "steps")
+    assert "raw_result" not in steps
+    assert steps["raw_text"] == FULL["raw_text"]
+    assert steps["plan"] == FULL["plan"]
+
+    summary = shape_response(FULL, "summary")
+    assert set(summary) == {"next_action", "final_summary", "is_final", "session_id"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_process(params, session_id, on_event=None):
+        return dict(FULL)
+
+    monkeypatch.setattr(rpc, "process_user_request_async", fake_process)
+    return TestClient(main.app)
+
+
+def test_jsonrpc_response_mode_summary(client):
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": "g", "objective": "o", "expected_outcome": "e", "response_mode": "summary"},
+        "id": 1
+    }
+    result = client.post("/mcp", json=payload).json()["result"]
+    assert result["final_summary"] == "All good."
+    assert "raw_result" not in result and "plan" not in result
+
+
+def test_invalid_response_mode_is_invalid_params(client):
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": "g", "objective": "o", "expected_outcome": "e", "response_mode": "tiny"},
+        "id": 2
+    }
+    assert client.post("/mcp", json=payload).json()["error"]["code"] == -32602
+
+
+def test_rest_response_mode_and_gzip(client):
+    body = {"goal": "g", "objective": "o", "expected_outcome": "e"}
+
+    full = client.post("/process", json=body, headers={"Accept-Encoding": "gzip"})
+    assert full.headers["Content-Encoding"] == "gzip"
+    assert "raw_result" in full.json()
+
+    small = client.post("/process", json={**body, "response_mode": "summary"}, headers={"Accept-Encoding": "gzip"})
+    # below the compression threshold → sent as-is
+    assert "Content-Encoding" not in small.headers
+    assert "raw_result" not in small.json()
+
+
+def test_no_compression_without_accept_encoding(client):
+    resp = client.post(
+        "/process",
+        json={"goal": "g", "objective": "o", "expected_outcome": "e"},
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert "Content-Encoding" not in resp.headers
+
+
+def test_accepted_encodings_honours_q_values():
+    assert accepted_encodings("gzip, br;q=0") == {"gzip"}
+    assert accepted_encodings("br;q=0.5, gzip;q=1.0") == {"br", "gzip"}
+    assert accepted_encodings("") == set()
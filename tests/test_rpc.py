@@ -0,0 +1,52 @@
+import os
+import sys
+import json
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import rpc
+from core.serialization import dumps, dumps_str
+
+
+def test_method_table_aliases_share_handler():
+    assert rpc.METHODS["tools/call"] is rpc.METHODS["process"] is rpc.METHODS["call"]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_unknown_method():
+    resp = await rpc.dispatch_rpc({"jsonrpc": "2.0", "method": "nope", "id": 3})
+    assert resp == {"jsonrpc": "2.0", "error": {"code": -32601, "message": "Method not found"}, "id": 3}
+
+
+@pytest.mark.asyncio
+async def test_dispatch_invalid_params():
+    resp = await rpc.dispatch_rpc({"jsonrpc": "2.0", "method": "tools/call", "params": {"goal": "g"}, "id": 4})
+    assert resp["error"]["code"] == -32602
+    assert "data" not in resp["error"]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_handler_exception_is_internal_error(monkeypatch):
+    async def boom(params, on_event=None):
+        raise RuntimeError("kaput")
+
+    monkeypatch.setitem(rpc.METHODS, "boom", boom)
+    resp = await rpc.dispatch_rpc({"jsonrpc": "2.0", "method": "boom", "id": 5})
+    assert resp["error"]["code"] == -32000
+    assert "kaput" in resp["error"]["message"]
+
+
+def test_dumps_round_trips_and_is_compact():
+    obj = {"a": [1, 2.5, None, True], "b": {"c": "naïve"}}
+    out = dumps(obj)
+    assert isinstance(out, bytes)
+    assert b" " not in out.replace("naïve".encode(), b"")
+    assert json.loads(out) == obj
+
+
+def test_dumps_handles_non_str_keys_and_big_ints():
+    assert json.loads(dumps({1: "x"})) == {"1": "x"}
+    big = 2 ** 70
+    assert json.loads(dumps_str({"n": big})) == {"n": big}
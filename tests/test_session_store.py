@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.mcp as mcp
+from core.session_store import (
+    InMemorySessionBackend, SQLiteSessionBackend, SharedMemorySessionBackend,
+    DiskCacheSessionBackend, create_session_backend,
+)
+
+
+def _backends(tmp_path):
+    return [
+        InMemorySessionBackend(),
+        SQLiteSessionBackend(str(tmp_path / "sessions.db")),
+        SharedMemorySessionBackend(str(tmp_path / "shm_sessions.db")),
+        DiskCacheSessionBackend(str(tmp_path / "cache")),
+    ]
+
+
+def test_backends_round_trip(tmp_path):
+    context = {"memory": {"customerId": "100"}, "last_response": {"is_final": False, "missing": ["accountId"]}}
+    for backend in _backends(tmp_path):
+        assert backend.get("s1") is None
+        backend.set("s1", context)
+        assert backend.get("s1") == context
+        backend.delete("s1")
+        assert backend.get("s1") is None
+
+
+def test_backends_expire(tmp_path):
+    for backend in _backends(tmp_path):
+        backend.ttl = 0.05
+        backend.set("s1", {"memory": {}})
+        time.sleep(0.1)
+        assert backend.get("s1") is None
+
+
+def test_memory_backend_sweeps_sessions_that_are_never_resumed():
+    backend = InMemorySessionBackend(ttl=0.05)
+    backend.sweep_interval = 0
+    for i in range(10):
+        backend.set(f"s{i}", {"memory": {}})
+    time.sleep(0.1)
+    backend.set("fresh", {"memory": {}})
+    assert list(backend._store) == ["fresh"]
+
+
+def test_sqlite_backend_indexes_expiry(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+    plan = backend._connect().execute(
+        "EXPLAIN QUERY PLAN DELETE FROM sessions WHERE expires < ?", (time.time(),)
+    ).fetchall()
+    assert any("sessions_expires" in row[-1] for row in plan)
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    # Two instances on one file behave like two uvicorn workers
+    path = str(tmp_path / "sessions.db")
+    worker_a, worker_b = SQLiteSessionBackend(path), SQLiteSessionBackend(path)
+    worker_a.set("s1", {"memory": {"x": 1}})
+    assert worker_b.get("s1") == {"memory": {"x": 1}}
+
+
+def test_create_session_backend_rejects_unknown_kind():
+    assert isinstance(create_session_backend("memory"), InMemorySessionBackend)
+    with pytest.raises(ValueError):
+        create_session_backend("redis")
+
+
+def test_follow_up_turn_resumes_from_backend(monkeypatch, tmp_path):
+    monkeypatch.setattr(mcp, "SESSION_STORE", SQLiteSessionBackend(str(tmp_path / "sessions.db")))
+    seen = []
+
+    def fake_plan(goal, objective, outcome, memory):
+        seen.append((goal, dict(memory)))
+        if "accountId" not in memory:
+            return [], ["accountId"]
+        return [], []
+
+    monkeypatch.setattr(mcp, "plan", fake_plan)
+    monkeypatch.setattr(mcp, "aggregate", lambda **kwargs: {"summary": "ok", "steps": [], "raw_result": {}, "raw_text": ""})
+
+    first = mcp.process_user_request({"goal": "show balance", "objective": "o", "expected_outcome": "e"}, "s1")
+    assert first["is_final"] is False
+    assert mcp.SESSION_STORE.get("s1")["last_response"] == {"next_action": "ask_user", "is_final": False, "missing": ["accountId"]}
+
+    second = mcp.process_user_request({"goal": "ACC-1", "objective": "", "expected_outcome": ""}, "s1")
+    assert second["is_final"] is True
+    assert seen[-1] == ("show balance", {"accountId": "ACC-1"})
@@ -0,0 +1,94 @@
+import os
+import sys
+import asyncio
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.llm as llm
+from core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_prompts_share_one_generation(monkeypatch):
+    calls = []
+
+    async def slow_generate(prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return f"answer to {prompt}", True
+
+    monkeypatch.setattr(llm, "LLM_CACHE", None)
+    monkeypatch.setattr(llm, "LLM_FLIGHTS", SingleFlight())
+    monkeypatch.setattr(llm, "_generate_async", slow_generate)
+
+    results = await asyncio.gather(*[llm.call_gemma3_async("plan") for _ in range(5)], llm.call_gemma3_async("other"))
+
+    assert results == ["answer to plan"] * 5 + ["answer to other"]
+    assert sorted(calls) == ["other", "plan"]
+    assert llm.LLM_FLIGHTS.stats() == {"inflight": 0, "leaders": 2, "coalesced": 4}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_remembered():
+    flights = SingleFlight()
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("ollama down")
+
+    results = await asyncio.gather(flights.do("k", failing), flights.do("k", failing), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(attempts) == 1
+
+    with pytest.raises(RuntimeError):
+        await flights.do("k", failing)
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_one_cancelled_caller_does_not_abort_the_others():
+    flights = SingleFlight()
+    state = {"cancelled": False}
+
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+            return "done"
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    first = asyncio.create_task(flights.do("k", work))
+    second = asyncio.create_task(flights.do("k", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "done"
+    assert state["cancelled"] is False
+
+
+@pytest.mark.asyncio
+async def test_work_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight()
+    state = {"cancelled": False}
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    callers = [asyncio.create_task(flights.do("k", work)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert state["cancelled"] is True
+    assert flights.stats()["inflight"] == 0
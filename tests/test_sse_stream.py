@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core import rpc
+
+
+def parse_sse(content: str):
+    """Split an SSE body into (event, data) tuples; comments are kept as ('comment', text)."""
+    events = []
+    for block in content.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.splitlines():
+            if line.startswith(":"):
+                events.append(("comment", line[1:].strip()))
+            elif line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        if data is not None:
+            events.append((event, data))
+    return events
+
+
+@pytest.fixture
+def staged_pipeline(monkeypatch):
+    async def fake_process(params, session_id, on_event=None):
+        await on_event("plan", {"plan": [{"tool": "t1"}]})
+        await on_event("step_started", {"step": "step1"})
+        await on_event("step_finished", {"step": "step1", "result": {"body": []}})
+        await on_event("step_summary", {"step": "step1", "summary": "nothing"})
+        await on_event("summary", {"summary": "all done"})
+        return {"final_summary": "all done", "is_final": True}
+
+    monkeypatch.setattr(rpc, "process_user_request_async", fake_process)
+
+
+def test_sse_emits_staged_events_before_final_response(staged_pipeline):
+    client = TestClient(main.app)
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": "g", "objective": "o", "expected_outcome": "e"},
+        "id": 7
+    }
+    events = parse_sse(client.post("/mcp/stream", json=payload).content.decode())
+
+    assert [name for name, _ in events] == [
+        "plan", "step_started", "step_finished", "step_summary", "summary", "message"
+    ]
+    assert all(data["id"] == 7 for _, data in events)
+    assert events[-1][1]["result"]["final_summary"] == "all done"
+
+
+def test_sse_sends_heartbeat_while_idle(monkeypatch):
+    async def slow_process(params, session_id, on_event=None):
+        await asyncio.sleep(0.3)
+        return {"final_summary": "late", "is_final": True}
+
+    monkeypatch.setattr(rpc, "process_user_request_async", slow_process)
+    monkeypatch.setattr(main, "MCP_SSE_HEARTBEAT", 0.05)
+    client = TestClient(main.app)
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": "g", "objective": "o", "expected_outcome": "e"},
+        "id": 8
+    }
+    events = parse_sse(client.post("/mcp/stream", json=payload).content.decode())
+
+    assert ("comment", "keep-alive") in events
+    assert events[-1][1]["id"] == 8
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+import core.llm as llm
+from core import rpc
+from core.aggregator import aggregate_async
+from core.llm_backends import OllamaHTTPBackend
+from core.llm_cache import LLMCache
+from test_sse_stream import parse_sse
+
+
+def _ndjson_handler(request):
+    lines = [{"response": "Balance "}, {"response": "is "}, {"response": "100."}, {"response": "", "done": True}]
+    return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+
+
+@pytest.mark.asyncio
+async def test_stream_gemma3_async_yields_fragments_and_caches(monkeypatch, tmp_path):
+    cache = LLMCache(str(tmp_path / "cache"), size_limit=1024 * 1024, ttls={}, default_ttl=60)
+    monkeypatch.setattr(llm, "LLM_CACHE", cache)
+    backend = OllamaHTTPBackend("gemma3:latest", "http://ollama", "30m", 10)
+    backend._async_client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(_ndjson_handler))
+    monkeypatch.setattr(llm, "BACKEND", backend)
+
+    assert [f async for f in llm.stream_gemma3_async("p")] == ["Balance ", "is ", "100."]
+    # second call is answered from the cache in one fragment
+    assert [f async for f in llm.stream_gemma3_async("p")] == ["Balance is 100."]
+
+
+@pytest.mark.asyncio
+async def test_aggregate_async_emits_partial_summary_events():
+    events = []
+
+    async def on_event(stage, data):
+        events.append((stage, data))
+
+    async def llm_call(prompt):
+        return "step text"
+
+    async def llm_stream(prompt):
+        for delta in ["All ", "good"]:
+            yield delta
+
+    result = await aggregate_async([], "outcome", llm_call, {}, on_event=on_event, llm_stream=llm_stream)
+
+    assert events == [
+        ("partial_summary", {"delta": "All "}),
+        ("partial_summary", {"delta": "good"}),
+        ("summary", {"summary": "All good"}),
+    ]
+    assert result["summary"] == "All good"
+
+
+@pytest.fixture
+def streaming_pipeline(monkeypatch):
+    async def fake_process(params, session_id, on_event=None):
+        for delta in ["Hel", "lo"]:
+            await on_event("partial_summary", {"delta": delta})
+        await on_event("summary", {"summary": "Hello"})
+        return {"final_summary": "Hello", "is_final": True}
+
+    monkeypatch.setattr(rpc, "process_user_request_async", fake_process)
+
+
+CALL = {
+    "jsonrpc": "2.0",
+    "method": "tools/call",
+    "params": {"goal": "g", "objective": "o", "expected_outcome": "e"},
+    "id": 5,
+}
+
+
+def test_sse_forwards_partial_summary(streaming_pipeline):
+    events = parse_sse(TestClient(main.app).post("/mcp/stream", json=CALL).content.decode())
+
+    assert [(name, data.get("delta")) for name, data in events[:2]] == [("partial_summary", "Hel"), ("partial_summary", "lo")]
+    assert events[-1][1]["result"]["final_summary"] == "Hello"
+
+
+def test_websocket_sends_partial_summary_notifications(streaming_pipeline):
+    with TestClient(main.app).websocket_connect("/ws/mcp") as ws:
+        ws.send_json(CALL)
+        messages = [ws.receive_json() for _ in range(3)]
+
+    assert messages[0] == {"jsonrpc": "2.0", "method": "partial_summary", "params": {"id": 5, "delta": "Hel"}}
+    assert messages[1]["params"]["delta"] == "lo"
+    assert messages[2]["id"] == 5 and messages[2]["result"]["final_summary"] == "Hello"
@@ -0,0 +1,56 @@
+import os
+import sys
+import pytest
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import planner, tokens
+from core.tool_index import ToolIndex, tokenize
+
+REGISTRY = [
+    {"name": "tool_get_holdings_accounts_cards", "description": "Lists the cards linked to an account.",
+     "parameters": {"properties": {"accountId": {"description": "Account to list cards for."}}, "required": ["accountId"]}},
+    {"name": "tool_get_holdings_accounts_transactions", "description": "Returns account transaction history.",
+     "parameters": {"properties": {"accountId": {"description": "Account whose transactions to fetch."},
+                                   "startDate": {"description": "Earliest booking date."}}, "required": ["accountId"]}},
+    {"name": "tool_get_holdings_accounts_statements", "description": "Fetches statements and balances.",
+     "parameters": {"properties": {"accountId": {"description": "Account for statement retrieval."}}, "required": ["accountId"]}},
+]
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken_download(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", None)
+    monkeypatch.setattr(tokens, "_encoding_failed", True)
+
+
+def test_tokenize_splits_names_and_strips_plurals():
+    assert tokenize("tool_get_holdings_accounts_fundsAuthorisations") == ["holding", "account", "fund", "authorisation"]
+
+
+def test_search_ranks_matching_tools_and_keeps_registry_order():
+    index = ToolIndex(REGISTRY)
+
+    assert [t["name"] for t in index.search("show my card", 1)] == ["tool_get_holdings_accounts_cards"]
+    names = [t["name"] for t in index.search("balances and transactions since startDate", 2)]
+    assert names == ["tool_get_holdings_accounts_transactions", "tool_get_holdings_accounts_statements"]
+
+
+def test_small_registry_is_returned_whole():
+    assert ToolIndex(REGISTRY).search("anything", 5) == REGISTRY
+
+
+def test_planner_prompt_only_carries_the_shortlist(monkeypatch):
+    monkeypatch.setattr(planner, "tool_index", ToolIndex(REGISTRY))
+    monkeypatch.setattr(planner, "PLANNER_TOP_K", 1)
+
+    prompt = planner.build_planner_prompt("list cards", "o", "e", {})
+
+    assert "tool_get_holdings_accounts_cards" in prompt
+    assert "tool_get_holdings_accounts_transactions" not in prompt
+    assert planner.prompt_stats()["max_tokens"] > 0
+
+
+def test_count_tokens_falls_back_to_estimate():
+    assert tokens.count_tokens("x" * 40) == 10
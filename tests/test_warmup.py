@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core import warmup
+from core.llm_backends import OllamaHTTPBackend
+
+
+@pytest.mark.asyncio
+async def test_ready_only_after_every_step_ran():
+    readiness = warmup.Readiness()
+    gate = asyncio.Event()
+
+    async def slow():
+        await gate.wait()
+
+    async def broken():
+        raise RuntimeError("no route to host")
+
+    task = asyncio.create_task(warmup.run_warmup([("models", slow), ("upstream", broken)], readiness, timeout=5))
+    await asyncio.sleep(0.05)
+    assert readiness.status()["status"] == "warming_up"
+    assert readiness.steps == {"models": "pending", "upstream": "failed: no route to host"}
+
+    gate.set()
+    await task
+    assert readiness.ready
+    assert readiness.status()["status"] == "degraded"
+
+
+@pytest.mark.asyncio
+async def test_step_timeout_does_not_block_readiness():
+    readiness = warmup.Readiness()
+
+    async def hangs():
+        await asyncio.sleep(30)
+
+    await warmup.run_warmup([("models", hangs)], readiness, timeout=0.05)
+    assert readiness.ready
+    assert readiness.steps["models"] == "timed out after 0.05s"
+
+
+@pytest.mark.asyncio
+async def test_contracts_step_loads_catalog_and_encoder():
+    await warmup.parse_contracts()
+
+
+@pytest.mark.asyncio
+async def test_http_backend_preloads_with_empty_prompt():
+    seen = []
+
+    def handler(request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "", "done": True})
+
+    backend = OllamaHTTPBackend("gemma3:latest", "http://ollama", "30m", 10)
+    backend._async_client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+    await backend.preload_async()
+
+    assert seen == [{"model": "gemma3:latest", "prompt": "", "stream": False, "keep_alive": "30m"}]
+
+
+def test_health_is_503_until_warm(monkeypatch):
+    readiness = warmup.Readiness()
+    monkeypatch.setattr(warmup, "READINESS", readiness)
+    client = TestClient(main.app)
+
+    resp = client.get("/health")
+    assert resp.status_code == 503
+    assert resp.json()["status"] == "warming_up"
+
+    async def ok():
+        return None
+
+    asyncio.run(warmup.run_warmup([("contracts", ok)], readiness))
+    resp = client.get("/health")
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ok", "initialized": True,
+                           "warmup": {"steps": {"contracts": "ok"}, "seconds": readiness.seconds}}
@@ -0,0 +1,64 @@
+import os
+import sys
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+# Allow imports from project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main
+from core import rpc
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    Stub the pipeline so the goal decides how long a call takes ("slow" vs "fast"),
+    and record peak concurrency.
+    """
+    state = {"running": 0, "peak": 0}
+
+    async def fake_process(params, session_id, on_event=None):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.3 if params["goal"] == "slow" else 0.01)
+        state["running"] -= 1
+        return {"final_summary": params["goal"], "is_final": True}
+
+    monkeypatch.setattr(rpc, "process_user_request_async", fake_process)
+    test_client = TestClient(main.app)
+    test_client.state = state
+    return test_client
+
+
+def call(goal, rpc_id):
+    return {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"goal": goal, "objective": "o", "expected_outcome": "e"},
+        "id": rpc_id,
+    }
+
+
+def test_fast_response_not_blocked_by_slow_one(client):
+    with client.websocket_connect("/ws/mcp") as ws:
+        ws.send_json(call("slow", 1))
+        ws.send_json(call("fast", 2))
+        first = ws.receive_json()
+        second = ws.receive_json()
+
+    assert first["id"] == 2
+    assert second["id"] == 1
+    assert second["result"]["final_summary"] == "slow"
+
+
+def test_inflight_cap_per_connection(client, monkeypatch):
+    monkeypatch.setattr(main, "MCP_WS_MAX_INFLIGHT", 2)
+    with client.websocket_connect("/ws/mcp") as ws:
+        for i in range(5):
+            ws.send_json(call("slow", i))
+        ids = sorted(ws.receive_json()["id"] for _ in range(5))
+
+    assert ids == [0, 1, 2, 3, 4]
+    assert client.state["peak"] == 2
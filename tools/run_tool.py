@@ -1,31 +1,64 @@
 import logging
 from datetime import datetime
 
+import httpx
 import requests
 from dateutil.parser import parse as _flexible_parse
 from jsonschema import validate, ValidationError
 from rapidfuzz import fuzz
 
 
-from config.config import build_auth_headers, TEMENOS_BASE_URL
+from config.config import (
+    build_auth_headers, TEMENOS_BASE_URL, TEMENOS_TIMEOUT, TEMENOS_CONNECT_TIMEOUT,
+    TEMENOS_MAX_CONNECTIONS, TEMENOS_MAX_KEEPALIVE,
+)
 
 logger = logging.getLogger(__name__)
 print("🔎 Loaded tools/run_tool.py from:", __file__)
 logger.warning("🚨 MCP DEBUG: ACTIVE run_tool.py path = %s", __file__)
 
 
+_async_client = None
+
+
+def build_url(endpoint: str, path_params: dict) -> str:
+    formatted = endpoint.format(**path_params)
+
+    # always prefix the single source-of-truth base URL
+    if formatted.lower().startswith("http"):
+        return formatted
+    return f"{TEMENOS_BASE_URL.rstrip('/')}{formatted}"
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Shared keep-alive client so concurrent requests reuse upstream connections.
+    Timeouts and pool size come from TEMENOS_* in config (httpx's own 5s
+    default would fail slow core-banking calls that requests.get waited for).
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(TEMENOS_TIMEOUT or None, connect=TEMENOS_CONNECT_TIMEOUT or None),
+            limits=httpx.Limits(max_connections=TEMENOS_MAX_CONNECTIONS, max_keepalive_connections=TEMENOS_MAX_KEEPALIVE),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the shared client's pooled connections (application shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
 def call_api(endpoint: str, path_params: dict, query_params: dict) -> dict:
     """
     endpoint: a relative path like "/v1.0.0/.../{accountId}/transactions"
               or a full URL starting with http(s).
     """
-    formatted = endpoint.format(**path_params)
-
-    # always prefix the single source-of-truth base URL
-    if formatted.lower().startswith("http"):
-        url = formatted
-    else:
-        url = f"{TEMENOS_BASE_URL.rstrip('/')}{formatted}"
+    url = build_url(endpoint, path_params)
 
     logger.debug(f"🌍 [DEBUG] Calling URL: {url} with params {query_params}")
     headers = build_auth_headers()
@@ -34,6 +67,19 @@ def call_api(endpoint: str, path_params: dict, query_params: dict) -> dict:
     return resp.json()
 
 
+async def call_api_async(endpoint: str, path_params: dict, query_params: dict) -> dict:
+    """Async counterpart of call_api; does not block the event loop while waiting on Temenos."""
+    url = build_url(endpoint, path_params)
+
+    # requests.get omits None params; httpx would send them as empty "key=" filters
+    query_params = {k: v for k, v in query_params.items() if v is not None}
+    logger.debug(f"🌍 [DEBUG] Calling URL (async): {url} with params {query_params}")
+    headers = build_auth_headers()
+    resp = await get_async_client().get(url, params=query_params, headers=headers)
+    resp.raise_for_status()
+    return resp.json()
+
+
 def _parse_date(raw: str, fmt: str = None):
     logger.warning("[DIAGNOSTIC] _parse_date: using fallback-aware version ✅")
     raw_str = str(raw).strip()
@@ -161,12 +207,8 @@ def apply_local_filters(response_data: dict, tool_contract: dict, local_filters:
     return {"body": filtered}
 
 
-def run_tool(
-    tool_contract: dict,
-    inputs: dict,
-    request_schema: dict = None,
-    response_schema: dict = None
-) -> dict:
+def prepare_request(tool_contract: dict, inputs: dict, request_schema: dict = None):
+    """Validate inputs and split them into (path_params, query_params)."""
     # 1) Validate inputs
     if request_schema:
         validate(instance=inputs, schema=request_schema)
@@ -183,10 +225,10 @@ def run_tool(
         if p.get("send_to_api", False)
     }
     query_params = {k: v for k, v in inputs.items() if k in opt_sendable}
+    return path_params, query_params
 
-    # 3) Fetch data
-    raw_resp = call_api(tool_contract["endpoint"], path_params, query_params)
 
+def finalize_response(raw_resp: dict, tool_contract: dict, inputs: dict, response_schema: dict = None) -> dict:
     # 4) Validate response
     if response_schema:
         # validate(instance=raw_resp, schema=response_schema)
@@ -195,3 +237,31 @@ def run_tool(
     # 5) Apply filters
     filtered = apply_local_filters(raw_resp, tool_contract, inputs)
     return filtered if filtered["body"] else raw_resp
+
+
+def run_tool(
+    tool_contract: dict,
+    inputs: dict,
+    request_schema: dict = None,
+    response_schema: dict = None
+) -> dict:
+    path_params, query_params = prepare_request(tool_contract, inputs, request_schema)
+
+    # 3) Fetch data
+    raw_resp = call_api(tool_contract["endpoint"], path_params, query_params)
+
+    return finalize_response(raw_resp, tool_contract, inputs, response_schema)
+
+
+async def run_tool_async(
+    tool_contract: dict,
+    inputs: dict,
+    request_schema: dict = None,
+    response_schema: dict = None
+) -> dict:
+    path_params, query_params = prepare_request(tool_contract, inputs, request_schema)
+
+    # 3) Fetch data without blocking the event loop
+    raw_resp = await call_api_async(tool_contract["endpoint"], path_params, query_params)
+
+    return finalize_response(raw_resp, tool_contract, inputs, response_schema)